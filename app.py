@@ -2,32 +2,44 @@
 # /app.py
 # ------------------------------------------------------------
 import os
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for, send_from_directory, Response, send_file, g
+from flask import Flask, request, jsonify, render_template, session, redirect, url_for, send_from_directory, Response, send_file, g, current_app
 from pymongo import MongoClient
 from flask_cors import CORS
 from pymongo.errors import ConnectionFailure
 from bson.json_util import dumps
 from bson.objectid import ObjectId
-from dotenv import load_dotenv
 import logging
+from utils.startup_profile import startup_profile
 from flask_wtf.csrf import CSRFProtect
 from BunnyCDN.Storage import Storage
 from BunnyCDN.CDN import CDN
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import gridfs
 import json
+import threading
 
 from utils import (
-    lookup_ingredient, 
-    lookup_tag, 
-    lookup_cuisine, 
-    lookup_method, 
-    lookup_dietary, 
-    lookup_mealtype, 
+    lookup_ingredient,
+    lookup_tag,
+    lookup_cuisine,
+    lookup_method,
+    lookup_dietary,
+    lookup_mealtype,
     timeago
 )
+from utils.allergen_impact import allergen_impact
+from utils.audit_pipeline import audit_pipeline
+from utils.business_hierarchy import hierarchy_cache
+from utils.compression import compressor
+from utils.http_cache import cached, response_cache, IMAGE_POLICY
+from utils.ingredient_index import ingredient_index
+from utils.index_registry import apply_indexes, apply_search_keys, verify_indexes, enable_collscan_profiling
+from utils.lazy_loading import LazyBlueprints, lazy_loading_enabled, load_blueprint, parse_lazy_blueprints
+from utils.middleware import StaticFastPath, security_headers
+from utils.static_assets import static_assets
 from config import Config
 from id_service import IDService
 from models import get_db, get_search_db
@@ -36,56 +48,6 @@ from models import get_db, get_search_db
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
-logger.info("Environment variables loaded successfully")
-
-# Initialize Flask app
-app = Flask(__name__, static_folder="static", static_url_path="/static")
-
-# Initialize CORS
-CORS(app)
-
-# Application Configuration
-app.config.from_object(Config)
-app.config['SECRET_KEY'] = Config.SECRET_KEY
-
-# Initialize CSRF protection
-csrf = CSRFProtect(app)
-
-CORS(app, resources={r"/*": {"origins": "*"}})
-
-# MongoDB client initialization
-try:
-    client = MongoClient(Config.MONGO_URI)
-    app.config['MONGO_CLIENT'] = client
-    db = client[Config.MONGO_DBNAME]  # Database reference
-
-    # Test database connection
-    client.admin.command('ping')
-    logger.info("MongoDB connection established successfully")
-except Exception as e:
-    logger.critical(f"Failed to connect to MongoDB: {str(e)}")
-    raise
-
-# Initialize GridFS bucket
-try:
-    fs = gridfs.GridFS(db, collection=Config.GRIDFS_BUCKET_NAME)
-    app.config['fs'] = fs  # Make GridFS available globally
-    logger.info("GridFS initialized successfully")
-except Exception as e:
-    logger.critical(f"Failed to initialize GridFS: {str(e)}")
-    raise
-
-# Initialize IDService
-try:
-    id_service = IDService(db)
-    app.config['ID_SERVICE'] = id_service  # Make IDService available globally
-    logger.info("ID Service initialized successfully")
-except Exception as e:
-    logger.critical(f"Failed to initialize ID Service: {str(e)}")
-    raise
-
 # Define a Custom JSON Encoder
 class JSONEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -95,173 +57,369 @@ class JSONEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super(JSONEncoder, self).default(obj)
 
-# Set the custom JSON encoder
-app.json_encoder = JSONEncoder
-
-# Import blueprints
-from routes.auth_routes import auth
-from routes.allergen_routes import allergens
-from routes.home_routes import home
-from routes.error_routes import error_routes
-from routes.finance_routes import finance
-from routes.common_routes import common
-from routes.google_routes import google_api
-from routes.employment_routes import employment
-from routes.product_routes import products
-from routes.recipeSearch_routes import recipe_search
-from routes.googleTasks_routes import google_tasks
-from routes.notes_routes import notes
-from modules import module_manager
-
-# Register blueprints
-blueprints = [
-    (auth, "auth"),
-    (allergens, "allergens"),
-    (home, "home"),
-    (error_routes, "error_routes"),
-    (finance, "finance_routes"),
-    (common, "common_routes"),
-    (employment, "employment_routes"),
-    (google_api, "google_routes"),
-    (products, "product_routes"),
-    (recipe_search, "recipe_search"),
-    (google_tasks, "google_tasks_routes"),
-    (notes, "notes_routes")
-]
+# ------------------------------------------------------------
+#        Per-process resources (created after fork)
+# ------------------------------------------------------------
+_resources_lock = threading.Lock()
+
+def register_post_fork_hook(app, hook):
+    """
+    Register hook(app) to run in every worker once its resources exist,
+    e.g. to prime caches. Returns hook so it can be used as a decorator.
+    """
+    app.extensions.setdefault('post_fork_hooks', []).append(hook)
+    return hook
+
+def warm_up_connections(app):
+    """
+    Open MONGO_WARMUP_CONNECTIONS pooled connections up front so the first
+    requests a worker serves do not pay for TCP/TLS handshakes.
+    """
+    client = app.config['MONGO_CLIENT']
+    connections = max(1, int(app.config.get('MONGO_WARMUP_CONNECTIONS', 1)))
+    started = datetime.utcnow()
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        list(executor.map(lambda _: client.admin.command('ping'), range(connections)))
+    elapsed_ms = (datetime.utcnow() - started).total_seconds() * 1000
+    logger.info(f"Warmed up {connections} MongoDB connections in {elapsed_ms:.1f} ms (pid {os.getpid()})")
+
+def init_resources(app):
+    """
+    Create the MongoClient, GridFS and IDService for the current process and
+    initialize the services that depend on them.
+    """
+    config = app.config
+
+    # MongoDB client initialization
+    try:
+        with startup_profile.phase("mongo"):
+            client = MongoClient(
+                config['MONGO_URI'],
+                minPoolSize=config.get('MONGO_MIN_POOL_SIZE', 0),
+                maxPoolSize=config.get('MONGO_MAX_POOL_SIZE', 100)
+            )
+            app.config['MONGO_CLIENT'] = client
+            db = client[config['MONGO_DBNAME']]  # Database reference
 
-for bp, name in blueprints:
-    app.register_blueprint(bp)
-    logger.info(f"{name} blueprint initialized successfully")
-
-# Initialize modules
-try:
-    module_manager.init_app(app)
-    logger.info("Module system initialized successfully")
-except Exception as e:
-    logger.critical(f"Failed to initialize module system: {str(e)}")
-    raise
-    
-@app.after_request
-def set_csp_headers(response):
-    response.headers['Content-Security-Policy'] = (
-        "default-src 'self'; "
-        "style-src 'self' 'https://cdnjs.cloudflare.com' 'https://fonts.googleapis.com'; "
-        "font-src 'https://fonts.gstatic.com'; "
-        "script-src 'self';"
-    )
-    return response
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/favicon.ico')
-def favicon():
-    return send_from_directory(
-        os.path.join(app.root_path, 'static'),
-        'favicon.ico',
-        mimetype='image/vnd.microsoft.icon'
-    )
+            # Test database connection and fill the pool
+            warm_up_connections(app)
+        logger.info("MongoDB connection established successfully")
+    except Exception as e:
+        logger.critical(f"Failed to connect to MongoDB: {str(e)}")
+        raise
 
-@app.route('/image/<filename>', methods=['GET'])
-def get_image(filename):
+    # Initialize GridFS bucket
     try:
-        file = fs.find_one({'filename': filename})
-        
-        if file:
-            return send_file(
-                BytesIO(file.read()), 
-                mimetype=file.content_type or 'image/jpeg',
-                download_name=filename
-            )
-        
-        file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-        
-        if os.path.exists(file_path):
-            return send_from_directory(Config.UPLOAD_FOLDER, filename)
-        
-        logger.warning(f"Image not found: {filename}")
-        return "Image not found", 404
+        with startup_profile.phase("gridfs"):
+            app.config['fs'] = gridfs.GridFS(db, collection=config['GRIDFS_BUCKET_NAME'])
+        logger.info("GridFS initialized successfully")
+    except Exception as e:
+        logger.critical(f"Failed to initialize GridFS: {str(e)}")
+        raise
 
+    # Initialize IDService
+    try:
+        with startup_profile.phase("id_service"):
+            app.config['ID_SERVICE'] = IDService(db)
+        logger.info("ID Service initialized successfully")
     except Exception as e:
-        logger.error(f"Error fetching image {filename}: {str(e)}")
-        return str(e), 500
-
-@app.route('/upload', methods=['POST'])
-def upload_image():
-    if 'file' not in request.files:
-        return 'No file part', 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return 'No selected file', 400
-    
-    if not file or not allowed_file(file.filename):
-        return 'Invalid file type', 400
-    
+        logger.critical(f"Failed to initialize ID Service: {str(e)}")
+        raise
+
+    # Initialize audit pipeline
     try:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = secure_filename(f"{timestamp}_{file.filename}")
-        
-        file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        file.save(file_path)
-
-        fs.put(
-            file, 
-            filename=filename, 
-            content_type=file.content_type
-        )
-        
-        logger.info(f"File {filename} successfully uploaded to both disk and GridFS")
-        return jsonify({
-            'status': 'success',
-            'message': 'File successfully uploaded',
-            'filename': filename
-        }), 200
-        
+        audit_pipeline.init_app(app)
+    except Exception as e:
+        logger.critical(f"Failed to initialize audit pipeline: {str(e)}")
+        raise
+
+    # Business hierarchy snapshots are built lazily per business
+    hierarchy_cache.init_app(app)
+
+    # Server-side response cache for @cached endpoints
+    response_cache.init_app(app)
+
+    # Ingredient -> recipe postings maintained on recipe writes
+    ingredient_index.init_app(app)
+    allergen_impact.init_app(app)
+
+    # Deploy runs `python -m utils.index_registry apply|backfill`; INDEX_AUTO_APPLY
+    # repeats it here in every worker for local development
+    try:
+        if config.get('INDEX_AUTO_APPLY'):
+            with startup_profile.phase("indexes"):
+                apply_indexes(db, Config)
+                verify_indexes(db, Config, check_usage=False)
+                # Prefix search runs on the normalized keys; fill in documents written elsewhere
+                apply_search_keys(db, Config)
+                # Postings for recipes written outside the importer
+                for source in (Config.COLLECTION_GLOBAL_RECIPES, Config.COLLECTION_USER_RECIPES):
+                    ingredient_index.index_missing(db, source)
+        if config.get('INDEX_COLLSCAN_PROFILING'):
+            enable_collscan_profiling(db)
     except Exception as e:
-        logger.error(f"Error uploading file: {str(e)}")
-        return jsonify({
-            'status': 'error',
-            'message': f"Error uploading file: {str(e)}"
-        }), 500
+        logger.error(f"Failed to apply indexes: {str(e)}")
+
+    app.config['RESOURCES_PID'] = os.getpid()
+
+def init_worker(app):
+    """
+    Post-fork initialization: give this process its own MongoClient, GridFS
+    and IDService and run the registered post-fork hooks. Does nothing if
+    this process is already initialized.
+
+    Pre-fork servers should call this from their post-fork hook (see
+    gunicorn.conf.py); otherwise it runs on the first request in the worker.
+    """
+    if app.config.get('RESOURCES_PID') == os.getpid():
+        return
+    with _resources_lock:
+        if app.config.get('RESOURCES_PID') == os.getpid():
+            return
+        # A client inherited from the parent must not be used after fork
+        app.config.pop('MONGO_CLIENT', None)
+        init_resources(app)
+        for hook in app.extensions.get('post_fork_hooks', []):
+            try:
+                hook(app)
+            except Exception as e:
+                logger.error(f"Post-fork hook {getattr(hook, '__name__', hook)} failed: {str(e)}")
+    logger.info(f"Worker {os.getpid()} initialized")
+
+# ------------------------------------------------------------
+#                  Blueprints and core routes
+# ------------------------------------------------------------
+# Rarely used blueprints; in lazy loading mode the ones listed in
+# LAZY_BLUEPRINTS are imported on first request instead of at startup
+OPTIONAL_BLUEPRINTS = [
+    ('routes.finance_routes:finance', "finance_routes"),
+    ('routes.employment_routes:employment', "employment_routes"),
+    ('routes.google_routes:google_api', "google_routes"),
+    ('routes.googleTasks_routes:google_tasks', "google_tasks_routes")
+]
+
+def register_blueprints(app):
+    deferred = set()
+    if lazy_loading_enabled(app):
+        app.wsgi_app = LazyBlueprints(app, parse_lazy_blueprints(app.config['LAZY_BLUEPRINTS']))
+        deferred = set(app.wsgi_app.mounts.values())
+        logger.info(f"Deferred blueprints: {', '.join(app.wsgi_app.mounts) or 'none'}")
+
+    # Import blueprints
+    with startup_profile.phase("blueprint_imports"):
+        from routes.auth_routes import auth
+        from routes.allergen_routes import allergens
+        from routes.home_routes import home
+        from routes.error_routes import error_routes
+        from routes.common_routes import common
+        from routes.product_routes import products
+        from routes.recipeSearch_routes import recipe_search
+        from routes.notes_routes import notes
+        from routes.search.export_routes import exports
+        from modules import module_manager
+        optional = [
+            (load_blueprint(target), name)
+            for target, name in OPTIONAL_BLUEPRINTS if target not in deferred
+        ]
+
+    # Register blueprints
+    blueprints = [
+        (auth, "auth"),
+        (allergens, "allergens"),
+        (home, "home"),
+        (error_routes, "error_routes"),
+        (common, "common_routes"),
+        (products, "product_routes"),
+        (recipe_search, "recipe_search"),
+        (notes, "notes_routes"),
+        (exports, "export_routes")
+    ] + optional
+
+    with startup_profile.phase("blueprint_registration"):
+        for bp, name in blueprints:
+            app.register_blueprint(bp)
+            logger.info(f"{name} blueprint initialized successfully")
+
+    # Initialize modules
+    try:
+        with startup_profile.phase("modules"):
+            module_manager.init_app(app)
+        logger.info("Module system initialized successfully")
+    except Exception as e:
+        logger.critical(f"Failed to initialize module system: {str(e)}")
+        raise
 
 def allowed_file(filename):
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def register_core_routes(app):
+    @app.route('/')
+    def index():
+        return render_template('index.html')
+
+    # Normally answered by StaticFastPath; kept so url_for('favicon') resolves
+    @app.route('/favicon.ico')
+    def favicon():
+        return send_from_directory(
+            os.path.join(app.root_path, 'static'),
+            'favicon.ico',
+            mimetype='image/vnd.microsoft.icon'
+        )
+
+    @app.route('/image/<filename>', methods=['GET'])
+    @cached(IMAGE_POLICY)
+    def get_image(filename):
+        try:
+            file = current_app.config['fs'].find_one({'filename': filename})
+
+            if file:
+                # GridFS file ids are unique per upload, so they make a strong ETag
+                return send_file(
+                    BytesIO(file.read()),
+                    mimetype=file.content_type or 'image/jpeg',
+                    download_name=filename,
+                    etag=f"{file._id}-{file.length}",
+                    last_modified=file.upload_date
+                )
 
-@app.errorhandler(404)
-def page_not_found(e):
-    logger.warning("404 error: Page not found")
-    return render_template('errors/404.html'), 404
+            upload_folder = current_app.config['UPLOAD_FOLDER']
+            file_path = os.path.join(upload_folder, filename)
 
-@app.errorhandler(500)
-def internal_server_error(e):
-    logger.error(f"500 error: {str(e)}")
-    return render_template('errors/500.html'), 500
+            if os.path.exists(file_path):
+                return send_from_directory(upload_folder, filename)
 
-@app.before_request
-def before_request():
-    g.start_time = datetime.utcnow()
-    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-    g.request_id = id_service.generate_request_id()
+            logger.warning(f"Image not found: {filename}")
+            return "Image not found", 404
 
+        except Exception as e:
+            logger.error(f"Error fetching image {filename}: {str(e)}")
+            return str(e), 500
 
+    @app.route('/upload', methods=['POST'])
+    def upload_image():
+        if 'file' not in request.files:
+            return 'No file part', 400
 
-@app.teardown_appcontext
-def teardown_db(exception):
-    if hasattr(g, 'mongo_client'):
-        g.mongo_client.close()
+        file = request.files['file']
 
-def create_app(config_object=None):
-    if config_object:
-        app.config.from_object(config_object)
+        if file.filename == '':
+            return 'No selected file', 400
+
+        if not file or not allowed_file(file.filename):
+            return 'Invalid file type', 400
+
+        try:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = secure_filename(f"{timestamp}_{file.filename}")
+
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            file.save(file_path)
+
+            current_app.config['fs'].put(
+                file,
+                filename=filename,
+                content_type=file.content_type
+            )
+
+            logger.info(f"File {filename} successfully uploaded to both disk and GridFS")
+            return jsonify({
+                'status': 'success',
+                'message': 'File successfully uploaded',
+                'filename': filename
+            }), 200
+
+        except Exception as e:
+            logger.error(f"Error uploading file: {str(e)}")
+            return jsonify({
+                'status': 'error',
+                'message': f"Error uploading file: {str(e)}"
+            }), 500
+
+    @app.errorhandler(404)
+    def page_not_found(e):
+        logger.warning("404 error: Page not found")
+        return render_template('errors/404.html'), 404
+
+    @app.errorhandler(500)
+    def internal_server_error(e):
+        logger.error(f"500 error: {str(e)}")
+        return render_template('errors/500.html'), 500
+
+    @app.before_request
+    def before_request():
+        # Workers forked without a post-fork hook initialize on first request
+        if app.config.get('RESOURCES_PID') != os.getpid():
+            init_worker(app)
+        g.start_time = datetime.utcnow()
+        g.request_id = app.config['ID_SERVICE'].generate_request_id()
+
+    @app.teardown_appcontext
+    def teardown_db(exception):
+        if hasattr(g, 'mongo_client'):
+            g.mongo_client.close()
+
+# ------------------------------------------------------------
+#                      Application factory
+# ------------------------------------------------------------
+def create_app(config_object=None, init_resources_now=None):
+    """
+    Build a configured application.
+
+    Args:
+        config_object: Configuration object (defaults to Config)
+        init_resources_now: Create Mongo/GridFS/IDService immediately.
+            Defaults to not PREFORK_SERVER: under a pre-fork server the
+            master only builds the app and each worker calls init_worker().
+    """
+    config_object = config_object or Config
+
+    # Initialize Flask app
+    app = Flask(__name__, static_folder="static", static_url_path="/static")
+
+    # Application Configuration
+    app.config.from_object(config_object)
+    app.config['SECRET_KEY'] = config_object.SECRET_KEY
+
+    # Initialize CSRF protection
+    CSRFProtect(app)
+
+    # One CORS layer configured from CORS_ORIGINS/CORS_METHODS/CORS_ALLOW_HEADERS
+    CORS(app, resources={r"/*": {
+        "origins": app.config['CORS_ORIGINS'],
+        "methods": app.config['CORS_METHODS'],
+        "allow_headers": app.config['CORS_ALLOW_HEADERS']
+    }})
+
+    # CSP and other security headers, built once
+    security_headers.init_app(app)
+
+    # Set the custom JSON encoder
+    app.json_encoder = JSONEncoder
+
+    # gzip/brotli for dynamic responses; hashed, pre-compressed static assets
+    compressor.init_app(app)
+    static_assets.init_app(app)
+
+    # Created once here rather than on every request
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    if init_resources_now is None:
+        init_resources_now = not app.config.get('PREFORK_SERVER', False)
+    if init_resources_now:
+        init_resources(app)
+
+    register_blueprints(app)
+    register_core_routes(app)
+
+    # Outermost layer: static files and the favicon skip the app stack entirely
+    app.wsgi_app = StaticFastPath(app, security_headers.headers, cors_origins=app.config['CORS_ORIGINS'])
     return app
 
+app = create_app()
+
 if __name__ == '__main__':
-    app = create_app(Config)
     app.run(
         host=Config.HOST,
         port=Config.PORT,
@@ -18,6 +18,11 @@ class Config:
     COLLECTION_PRODUCT_LIST = os.getenv('COLLECTION_PRODUCT_LIST', 'product_list')
     COLLECTION_ALLERGENS = os.getenv('COLLECTION_ALLERGENS', 'allergens')
     COLLECTION_USER_NOTES = os.getenv('COLLECTION_USER_NOTES', 'user_notes')
+    COLLECTION_INGREDIENT_INDEX = os.getenv('COLLECTION_INGREDIENT_INDEX', 'ingredient_recipe_index')
+    COLLECTION_ALLERGEN_IMPACT = os.getenv('COLLECTION_ALLERGEN_IMPACT', 'allergen_impact_events')
+    ALLERGEN_IMPACT_TTL_DAYS = int(os.getenv('ALLERGEN_IMPACT_TTL_DAYS', 7))
+    # Server-assigned sequence numbers (one document per sequence)
+    COLLECTION_COUNTERS = os.getenv('COLLECTION_COUNTERS', 'counters')
 
     # Business Onboarding Collections
     COLLECTION_BUSINESSES = os.getenv('COLLECTION_BUSINESSES', 'business_entities')
@@ -61,6 +66,94 @@ class Config:
         'employee': ['read']
     }
 
+    # Token Configuration
+    # JWT_SIGNING_KEYS: 'kid1:secret1,kid2:secret2'; defaults to SECRET_KEY as kid 'default'
+    JWT_SIGNING_KEYS = os.getenv('JWT_SIGNING_KEYS', '')
+    JWT_ACTIVE_KID = os.getenv('JWT_ACTIVE_KID', '')
+    ACCESS_TOKEN_MINUTES = int(os.getenv('ACCESS_TOKEN_MINUTES', 15))
+    REFRESH_TOKEN_DAYS = int(os.getenv('REFRESH_TOKEN_DAYS', 7))
+    TOKEN_REVOCATION_POLL_SECONDS = float(os.getenv('TOKEN_REVOCATION_POLL_SECONDS', 30))
+    COLLECTION_TOKEN_REVOCATIONS = os.getenv('COLLECTION_TOKEN_REVOCATIONS', 'token_revocations')
+
+    # Role Cache
+    # ROLE_REGISTRY_MODE: 'polling' (version marker check) or 'change_stream' (replica sets only)
+    ROLE_REGISTRY_MODE = os.getenv('ROLE_REGISTRY_MODE', 'polling')
+    ROLE_REGISTRY_POLL_SECONDS = float(os.getenv('ROLE_REGISTRY_POLL_SECONDS', 5))
+    # Full reload interval in polling mode, for role writes that bypass the version marker
+    ROLE_REGISTRY_MAX_AGE_SECONDS = float(os.getenv('ROLE_REGISTRY_MAX_AGE_SECONDS', 300))
+
+    # Worker Startup
+    # PREFORK_SERVER: defer Mongo/GridFS/IDService creation until after fork (see gunicorn.conf.py)
+    PREFORK_SERVER = os.getenv('PREFORK_SERVER', 'False').lower() in ['true', '1']
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_WARMUP_CONNECTIONS = int(os.getenv('MONGO_WARMUP_CONNECTIONS', 4))
+
+    # HTTP Response Cache
+    # RESPONSE_CACHE_URL: '' (headers only), 'memory://' (per process, single-worker only:
+    # invalidation does not reach other workers) or 'mongo://[collection]'
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL', '')
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+    COLLECTION_RESPONSE_CACHE = os.getenv('COLLECTION_RESPONSE_CACHE', 'response_cache')
+
+    # Response Compression
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI = os.getenv('COMPRESS_BROTLI', 'True').lower() in ['true', '1']
+
+    # CORS and Static Files
+    CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
+    CORS_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+    CORS_ALLOW_HEADERS = [
+        'Content-Type',
+        'Authorization',
+        'X-Requested-With',
+        'Accept',
+        'Origin',
+        'Access-Control-Request-Method',
+        'Access-Control-Request-Headers'
+    ]
+    STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 3600))
+    # Empty uses the built-in policy in utils/middleware.py
+    CONTENT_SECURITY_POLICY = os.getenv('CONTENT_SECURITY_POLICY', '')
+
+    # Business Hierarchy Cache
+    BUSINESS_HIERARCHY_MAX_AGE = float(os.getenv('BUSINESS_HIERARCHY_MAX_AGE', 60))
+
+    # Lazy Loading
+    # LAZY_BLUEPRINTS: '<url_prefix>=<module>:<blueprint>' pairs deferred when LAZY_LOADING is on;
+    # defaults to the rarely used OPTIONAL_BLUEPRINTS in app.py, set it to '' to defer nothing
+    LAZY_LOADING = os.getenv('LAZY_LOADING', 'False').lower() in ['true', '1']
+    LAZY_BLUEPRINTS = os.getenv('LAZY_BLUEPRINTS', '/finance=routes.finance_routes:finance,'
+                                '/employment=routes.employment_routes:employment,'
+                                '/google=routes.google_routes:google_api,'
+                                '/google_tasks=routes.googleTasks_routes:google_tasks')
+    PRINT_CONFIG = os.getenv('PRINT_CONFIG', 'True').lower() in ['true', '1']
+
+    # Password Hashing
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', 2))
+    PASSWORD_POOL_MAX_PENDING = int(os.getenv('PASSWORD_POOL_MAX_PENDING', 64))
+    PASSWORD_POOL_TIMEOUT = float(os.getenv('PASSWORD_POOL_TIMEOUT', 10.0))
+
+    # Audit Pipeline
+    COLLECTION_AUDIT_LOGS = os.getenv('COLLECTION_AUDIT_LOGS', 'audit_logs')
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 200))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0))
+    AUDIT_SPOOL_PATH = os.getenv('AUDIT_SPOOL_PATH', 'logs/audit_spool.jsonl')
+
+    # Rate Limiting ('memory://' per process, 'mongo://' shared across workers)
+    RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL', 'memory://')
+    COLLECTION_RATE_LIMITS = os.getenv('COLLECTION_RATE_LIMITS', 'rate_limits')
+
+    # Index Management
+    # Indexes, search_keys and ingredient postings are applied at deploy time with
+    # `python -m utils.index_registry apply|backfill`; true also runs them in every
+    # worker at startup (local development)
+    INDEX_AUTO_APPLY = os.getenv('INDEX_AUTO_APPLY', 'False').lower() in ['true', '1']
+    INDEX_COLLSCAN_PROFILING = os.getenv('INDEX_COLLSCAN_PROFILING', 'False').lower() in ['true', '1']
+
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
@@ -77,55 +170,48 @@ class Config:
     ]
 
     # Debugging statements for confirmation
-    print(f"Loaded Configuration:")
-    print(f"- MONGO_URI: {MONGO_URI}")
-    print(f"- MONGO_DBNAME: {MONGO_DBNAME}")
-    print(f"- COLLECTION_TAGS: {COLLECTION_TAGS}")
-    print(f"- COLLECTION_GLOBAL_RECIPES: {COLLECTION_GLOBAL_RECIPES}")
-    print(f"- COLLECTION_USER_RECIPES: {COLLECTION_USER_RECIPES}")
-    print(f"- COLLECTION_USERS: {COLLECTION_USERS}")
-    print(f"- COLLECTION_PRODUCT_LIST: {COLLECTION_PRODUCT_LIST}")
-    print(f"- COLLECTION_ALLERGENS: {COLLECTION_ALLERGENS}")
-    print(f"- COLLECTION_USER_NOTES: {COLLECTION_USER_NOTES}")
-    if MONGO_SEARCH_DBNAME:
-        print(f"- MONGO_SEARCH_DBNAME (Deprecated): {MONGO_SEARCH_DBNAME}")
-
-    # Business Collections Debug Output
-    print(f"- COLLECTION_BUSINESSES: {COLLECTION_BUSINESSES}")
-    print(f"- COLLECTION_BUSINESS_CONFIG: {COLLECTION_BUSINESS_CONFIG}")
-    print(f"- COLLECTION_BUSINESS_USERS: {COLLECTION_BUSINESS_USERS}")
-    print(f"- COLLECTION_BUSINESS_ROLES: {COLLECTION_BUSINESS_ROLES}")
-    print(f"- COLLECTION_BUSINESS_PERMISSIONS: {COLLECTION_BUSINESS_PERMISSIONS}")
-
-    print(f"- SECRET_KEY: {'Set' if SECRET_KEY else 'Not Set'}")
-    print(f"- UPLOAD_FOLDER: {UPLOAD_FOLDER}")
-    print(f"- MAX_FILE_SIZE: {MAX_FILE_SIZE}")
-    print(f"- ALLOWED_EXTENSIONS: {ALLOWED_EXTENSIONS}")
-    print(f"- GOOGLE_CLIENT_ID: {'Set' if GOOGLE_CLIENT_ID else 'Not Set'}")
-    print(f"- GOOGLE_CLIENT_SECRET: {'Set' if GOOGLE_CLIENT_SECRET else 'Not Set'}")
-    print(f"- GOOGLE_REDIRECT_URI: {GOOGLE_REDIRECT_URI}")
-    print(f"- GOOGLE_API_KEY: {'Set' if GOOGLE_API_KEY else 'Not Set'}")
+    if PRINT_CONFIG:
+        print(f"Loaded Configuration:")
+        print(f"- MONGO_URI: {MONGO_URI}")
+        print(f"- MONGO_DBNAME: {MONGO_DBNAME}")
+        print(f"- COLLECTION_TAGS: {COLLECTION_TAGS}")
+        print(f"- COLLECTION_GLOBAL_RECIPES: {COLLECTION_GLOBAL_RECIPES}")
+        print(f"- COLLECTION_USER_RECIPES: {COLLECTION_USER_RECIPES}")
+        print(f"- COLLECTION_USERS: {COLLECTION_USERS}")
+        print(f"- COLLECTION_PRODUCT_LIST: {COLLECTION_PRODUCT_LIST}")
+        print(f"- COLLECTION_ALLERGENS: {COLLECTION_ALLERGENS}")
+        print(f"- COLLECTION_USER_NOTES: {COLLECTION_USER_NOTES}")
+        print(f"- COLLECTION_INGREDIENT_INDEX: {COLLECTION_INGREDIENT_INDEX}")
+        print(f"- COLLECTION_ALLERGEN_IMPACT: {COLLECTION_ALLERGEN_IMPACT}")
+        if MONGO_SEARCH_DBNAME:
+            print(f"- MONGO_SEARCH_DBNAME (Deprecated): {MONGO_SEARCH_DBNAME}")
+
+        # Business Collections Debug Output
+        print(f"- COLLECTION_BUSINESSES: {COLLECTION_BUSINESSES}")
+        print(f"- COLLECTION_BUSINESS_CONFIG: {COLLECTION_BUSINESS_CONFIG}")
+        print(f"- COLLECTION_BUSINESS_USERS: {COLLECTION_BUSINESS_USERS}")
+        print(f"- COLLECTION_BUSINESS_ROLES: {COLLECTION_BUSINESS_ROLES}")
+        print(f"- COLLECTION_BUSINESS_PERMISSIONS: {COLLECTION_BUSINESS_PERMISSIONS}")
+
+        print(f"- SECRET_KEY: {'Set' if SECRET_KEY else 'Not Set'}")
+        print(f"- UPLOAD_FOLDER: {UPLOAD_FOLDER}")
+        print(f"- MAX_FILE_SIZE: {MAX_FILE_SIZE}")
+        print(f"- ALLOWED_EXTENSIONS: {ALLOWED_EXTENSIONS}")
+        print(f"- GOOGLE_CLIENT_ID: {'Set' if GOOGLE_CLIENT_ID else 'Not Set'}")
+        print(f"- GOOGLE_CLIENT_SECRET: {'Set' if GOOGLE_CLIENT_SECRET else 'Not Set'}")
+        print(f"- GOOGLE_REDIRECT_URI: {GOOGLE_REDIRECT_URI}")
+        print(f"- GOOGLE_API_KEY: {'Set' if GOOGLE_API_KEY else 'Not Set'}")
 
     @classmethod
     def init_business_collections(cls, db):
         """Initialize business-related collections with indexes and default data"""
-        # Businesses collection indexes
-        db[cls.COLLECTION_BUSINESSES].create_index([("business_id", 1)], unique=True)
-        db[cls.COLLECTION_BUSINESSES].create_index([("admin_user_id", 1)])
-        db[cls.COLLECTION_BUSINESSES].create_index([("venues.venue_id", 1)])
-        db[cls.COLLECTION_BUSINESSES].create_index([("venues.work_areas.work_area_id", 1)])
-
-        # Business users collection indexes
-        db[cls.COLLECTION_BUSINESS_USERS].create_index([ 
-            ("business_id", 1), 
-            ("user_id", 1) 
-        ], unique=True)
-
-        # Business roles collection indexes
-        db[cls.COLLECTION_BUSINESS_ROLES].create_index([ 
-            ("business_id", 1), 
-            ("role_name", 1) 
-        ], unique=True)
+        # Business collection indexes are declared in utils/index_registry.py
+        from utils.index_registry import apply_indexes
+        apply_indexes(db, cls, collections=[
+            cls.COLLECTION_BUSINESSES,
+            cls.COLLECTION_BUSINESS_USERS,
+            cls.COLLECTION_BUSINESS_ROLES
+        ])
 
         # Insert default roles if they don't exist
         for role_name, permissions in cls.DEFAULT_BUSINESS_ROLES.items():
@@ -0,0 +1,23 @@
+# ------------------------------------------------------------
+# /gunicorn.conf.py
+# ------------------------------------------------------------
+# gunicorn -c gunicorn.conf.py app:app
+#
+# The app is built once in the master (preload_app) with PREFORK_SERVER=true,
+# so no MongoClient exists before fork. Each worker then creates its own
+# client, GridFS and IDService and warms its connection pool before it
+# accepts requests.
+import os
+
+os.environ.setdefault('PREFORK_SERVER', 'true')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+def post_fork(server, worker):
+    from app import app, init_worker
+    init_worker(app)
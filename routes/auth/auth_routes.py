@@ -3,10 +3,11 @@
 # ------------------------------------------------------------
 from flask import Blueprint, request, jsonify, current_app, g, session
 from functools import wraps
-import jwt
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
+from config import Config
+
 # Import additional utilities (preserved from original)
 from utils.validation_utils import validate_request_data
 from utils.security_utils import generate_random_string
@@ -16,10 +17,15 @@ from utils.time_utils import generate_timestamp
 from utils.rate_limiter import RateLimiter
 
 # Import our updated authentication utilities
-from utils.auth.auth_utils import validate_payroll_id, check_password
+from utils.auth.auth_utils import validate_payroll_id, check_password, rehash_password_on_login
+from utils.auth.password_pool import password_pool, PasswordPoolBusy, PasswordTooLong
+from utils.auth.token_service import token_service, TokenError, ACCESS_TOKEN, REFRESH_TOKEN
+
+# Audit events are queued and written off the request path
+from utils.audit_pipeline import audit_pipeline
 
-# Import AuditLogger for audit events
-from utils.audit_logger import AuditLogger
+# Venue and work-area ids from the token resolve against in-memory snapshots
+from utils.business_hierarchy import hierarchy_cache
 
 logger = logging.getLogger(__name__)
 
@@ -32,15 +38,28 @@ login_limiter = RateLimiter(
     block_seconds=900    # 15 minutes
 )
 
+def _business_users():
+    """Business users collection on this worker's MongoClient."""
+    return current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME][Config.COLLECTION_BUSINESS_USERS]
+
+@auth.record_once
+def init_auth_services(state):
+    """Bind the login limiter, password pool and token service to the app config."""
+    login_limiter.init_app(state.app)
+    password_pool.init_app(state.app)
+    token_service.init_app(state.app)
+
 class AuthError(Exception):
     """Custom exception for authentication errors"""
     def __init__(self, message, status_code=401):
         self.message = message
         self.status_code = status_code
 
-def create_session_token(user):
+def build_token_claims(user):
     """
-    Create a JWT token containing essential user data.
+    Build the access token claims from a business_users document.
+    The token carries everything /auth/verify-token returns, so verification
+    needs no database round trip.
     Uses the updated user document structure:
       - payroll_id: stored at top-level
       - work_email: stored as 'work_email'
@@ -49,47 +68,49 @@ def create_session_token(user):
       - venue_id: stored at top-level
       - work_area_id: stored at top-level
     """
+    return {
+        'payroll_id': user['payroll_id'],
+        'email_work': user['work_email'],
+        'name_first': user['first_name'],
+        'name_preferred': user.get('preferred_name'),
+        'role': user['role'],
+        'permissions': user.get('permissions', []),
+        'business_id': user['company_id'],
+        'venue_id': user['venue_id'],
+        'work_area_id': user['work_area_id']
+    }
+
+def create_session_token(user):
+    """
+    Create a short-lived access token and a refresh token for the user.
+
+    Returns:
+        Dict with 'token', 'refresh_token' and 'expires_in' (seconds)
+    """
     try:
-        payload = {
-            'payroll_id': user['payroll_id'],
-            'email_work': user['work_email'],
-            'role': user['role'],
-            'business_id': user['company_id'],
-            'venue_id': user['venue_id'],
-            'work_area_id': user['work_area_id'],
-            'exp': datetime.utcnow() + timedelta(hours=8),
-            'iat': datetime.utcnow()
-        }
-        return jwt.encode(
-            payload, 
-            current_app.config['SECRET_KEY'], 
-            algorithm='HS256'
-        )
+        return token_service.issue_pair(build_token_claims(user))
     except Exception as e:
         logger.error(f"Token creation failed: {str(e)}")
         raise AuthError("Failed to create authentication token")
 
-def verify_token(token):
+def verify_token(token, expected_type=ACCESS_TOKEN):
     """
-    Verify and decode JWT token.
+    Verify and decode a JWT token (signature, expiry, type and revocation).
+    No database access is needed.
     """
     try:
-        return jwt.decode(
-            token, 
-            current_app.config['SECRET_KEY'], 
-            algorithms=['HS256']
-        )
-    except jwt.ExpiredSignatureError:
-        raise AuthError("Token has expired")
-    except jwt.InvalidTokenError:
-        raise AuthError("Invalid token")
+        return token_service.verify(token, expected_type=expected_type)
+    except TokenError as e:
+        raise AuthError(e.message)
 
 def login_required(f):
     """
     Decorator to protect routes requiring authentication.
     Checks the Authorization header for a valid JWT token,
     verifies that the user exists and is active, and populates
-    Flask's global 'g' with token payload and full user document.
+    Flask's global 'g' with token payload and full user document,
+    plus g.venue and g.work_area resolved from the business hierarchy
+    snapshot (None when the ids do not belong to the business).
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -102,7 +123,7 @@ def login_required(f):
             payload = verify_token(token)
             
             # Verify that the user exists and is active using updated fields
-            user = current_app.mongo.db.business_users.find_one({
+            user = _business_users().find_one({
                 "payroll_id": payload['payroll_id'],
                 "status": {"$ne": "inactive"}
             })
@@ -112,6 +133,18 @@ def login_required(f):
             
             g.user = payload
             g.current_user = user  # Store full user document for route handlers
+            g.business_id = payload.get('business_id')
+            g.venue_id = payload.get('venue_id')
+            try:
+                context = hierarchy_cache.resolve(
+                    current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME],
+                    g.business_id, g.venue_id, payload.get('work_area_id')
+                )
+            except Exception as e:
+                logger.warning(f"Could not resolve business hierarchy for {g.business_id}: {str(e)}")
+                context = {'venue': None, 'work_area': None}
+            g.venue = context['venue']
+            g.work_area = context['work_area']
             return f(*args, **kwargs)
             
         except AuthError as e:
@@ -146,9 +179,11 @@ def login():
       - Retrieves the user from 'business_users' collection.
       - Verifies the plaintext password against the stored hash.
       - Clears rate limiting on successful login.
+      - Re-hashes the password in the background if the bcrypt cost changed.
+      - Returns 503 with Retry-After when the password pool is saturated.
       - Creates a JWT token containing essential user data.
       - Updates the last login timestamp.
-      - Logs the successful login event.
+      - Queues the successful login audit event (written in the background).
       - Returns the token and a subset of user data.
     """
     try:
@@ -180,7 +215,7 @@ def login():
             }), 400
 
         # Find user in MongoDB using the updated document structure
-        user = current_app.mongo.db.business_users.find_one({
+        user = _business_users().find_one({
             "payroll_id": payroll_id,
             "status": {"$ne": "inactive"}
         })
@@ -205,11 +240,14 @@ def login():
         # Clear rate limiting on successful login
         login_limiter.clear_attempts(payroll_id)
 
-        # Create session token (JWT)
-        token = create_session_token(user)
+        # Upgrade the stored hash in the background if BCRYPT_LOG_ROUNDS changed
+        rehash_password_on_login(_business_users(), user, password)
+
+        # Create access and refresh tokens (JWT)
+        tokens = create_session_token(user)
 
         # Update last login timestamp
-        current_app.mongo.db.business_users.update_one(
+        _business_users().update_one(
             {"_id": user["_id"]},
             {
                 "$set": {
@@ -219,7 +257,7 @@ def login():
         )
 
         # Log successful login
-        AuditLogger.log_event(
+        audit_pipeline.log_event(
             'user_login',
             payroll_id,
             user.get('company_id', 'N/A'),
@@ -242,7 +280,9 @@ def login():
 
         return jsonify({
             "success": True,
-            "token": token,
+            "token": tokens['token'],
+            "refresh_token": tokens['refresh_token'],
+            "expires_in": tokens['expires_in'],
             "user": user_data
         })
 
@@ -251,6 +291,19 @@ def login():
             "success": False,
             "message": e.message
         }), e.status_code
+    except PasswordTooLong as e:
+        return jsonify({
+            "success": False,
+            "message": e.message
+        }), 400
+    except PasswordPoolBusy as e:
+        logger.warning(f"Login rejected, password pool saturated: {password_pool.metrics()}")
+        response = jsonify({
+            "success": False,
+            "message": "Login service is busy. Please try again shortly."
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
         return jsonify({
@@ -266,7 +319,9 @@ def verify_token_route():
     Expects the Authorization header in the format:
        Bearer <token>
        
-    On success, returns the user data extracted from the token and database.
+    On success, returns the user data carried in the token. Deactivated users
+    lose access when their short-lived access token expires and the refresh
+    is refused, so no database lookup is needed here.
     """
     try:
         auth_header = request.headers.get('Authorization')
@@ -276,26 +331,72 @@ def verify_token_route():
         token = auth_header.replace('Bearer ', '')
         payload = verify_token(token)
 
-        # Verify that the user still exists and is active
-        user = current_app.mongo.db.business_users.find_one({
+        return jsonify({
+            "success": True,
+            "valid": True,
+            "user": {
+                "payroll_id": payload['payroll_id'],
+                "email_work": payload.get('email_work'),
+                "name_first": payload.get('name_first'),
+                "name_preferred": payload.get('name_preferred'),
+                "role": payload.get('role'),
+                "permissions": payload.get('permissions', [])
+            }
+        })
+
+    except AuthError as e:
+        return jsonify({
+            "success": False,
+            "message": e.message
+        }), e.status_code
+    except Exception as e:
+        logger.error(f"Token verification error: {str(e)}")
+        return jsonify({
+            "success": False,
+            "message": "Token verification failed"
+        }), 401
+
+@auth.route("/auth/refresh", methods=['POST'])
+def refresh_token_route():
+    """
+    Exchange a refresh token for a new access/refresh token pair.
+    
+    Expected JSON payload:
+      {
+         "refresh_token": "<refresh_token>"
+      }
+    
+    Refresh tokens are single use: the presented token is revoked and a new
+    one is returned. The user record is re-checked here so deactivated
+    accounts stop receiving access tokens.
+    """
+    try:
+        data = request.get_json() or {}
+        refresh_token = data.get('refresh_token')
+        if not refresh_token:
+            raise AuthError("No refresh token provided", 400)
+
+        payload = verify_token(refresh_token, expected_type=REFRESH_TOKEN)
+        try:
+            # Atomic across workers: a replayed token fails here
+            token_service.claim(payload)
+        except TokenError as e:
+            raise AuthError(e.message)
+
+        user = _business_users().find_one({
             "payroll_id": payload['payroll_id'],
             "status": {"$ne": "inactive"}
         })
-
         if not user:
             raise AuthError("User account is no longer active")
 
+        tokens = create_session_token(user)
+
         return jsonify({
             "success": True,
-            "valid": True,
-            "user": {
-                "payroll_id": user['payroll_id'],
-                "email_work": user['work_email'],
-                "name_first": user['first_name'],
-                "name_preferred": user.get('preferred_name'),
-                "role": user['role'],
-                "permissions": user.get('permissions', [])
-            }
+            "token": tokens['token'],
+            "refresh_token": tokens['refresh_token'],
+            "expires_in": tokens['expires_in']
         })
 
     except AuthError as e:
@@ -304,10 +405,10 @@ def verify_token_route():
             "message": e.message
         }), e.status_code
     except Exception as e:
-        logger.error(f"Token verification error: {str(e)}")
+        logger.error(f"Token refresh error: {str(e)}")
         return jsonify({
             "success": False,
-            "message": "Token verification failed"
+            "message": "Token refresh failed"
         }), 401
 
 @auth.route("/auth/logout", methods=['POST'])
@@ -316,10 +417,11 @@ def logout():
     """
     Handle user logout with audit logging.
     Requires a valid token via the login_required decorator.
+    Revokes the access token and the optional 'refresh_token' in the body.
     """
     try:
         # Log logout event using data stored in g.user and g.current_user
-        AuditLogger.log_event(
+        audit_pipeline.log_event(
             'user_logout',
             g.user['payroll_id'],
             g.current_user.get('company_id', 'N/A'),
@@ -327,6 +429,15 @@ def logout():
             ip_address=request.remote_addr
         )
         
+        # Revoke the access token and, if supplied, the refresh token
+        token_service.revoke(g.user)
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            try:
+                token_service.revoke(token_service.verify(refresh_token, expected_type=REFRESH_TOKEN))
+            except TokenError:
+                pass
+
         # Clear session
         session.clear()
         
@@ -8,57 +8,19 @@ from datetime import datetime
 from functools import wraps
 
 # Import helper functions from our models
-from models.role_model import find_all_roles, find_role_by_name, update_role
-from models.user_model import assign_role_to_user, find_user_in_business, update_user_override
+from models.role_model import update_role
+from models.user_model import find_user_in_business, update_user_override
+from utils.auth.role_registry import role_registry
+from utils.auth import role_assignment
+from utils.auth.role_assignment import RoleAssignmentError
+from utils.auth.permissions import PermissionCheckError, get_effective_permissions, permission_matrix
 
 permission_manager = Blueprint('permission_manager', __name__, url_prefix='/permissions')
 
-def get_effective_permissions(role_permissions, user_overrides, venue_id=None):
-    """
-    Merges the base role permissions with user-specific overrides and venue-specific overrides.
-    Each permission object should have:
-        - "permissionName" (the name of the permission)
-        - "global" (True/False)
-        - Optional flags: "requiresHrApproval", "requiresSecondaryApproval", "requiresCoSign", "requestPermission"
-        - Optional "venueOverrides": a dict mapping venue IDs to overrides.
-    If user_overrides is provided (a dict where keys are permissionName), then those values override the role.
-    """
-    effective = {}
-
-    for perm in role_permissions:
-        name = perm.get("permissionName")
-        # Start with the base global value and flags
-        effective[name] = {
-            "value": perm.get("global", False),
-            "requiresHrApproval": perm.get("requiresHrApproval", False),
-            "requiresSecondaryApproval": perm.get("requiresSecondaryApproval", False),
-            "requiresCoSign": perm.get("requiresCoSign", False),
-            "requestPermission": perm.get("requestPermission", False),
-        }
-        # If venue_id is specified and an override exists, apply it.
-        venue_overrides = perm.get("venueOverrides", {})
-        if venue_id and venue_overrides and isinstance(venue_overrides, dict):
-            if venue_id in venue_overrides:
-                v_override = venue_overrides[venue_id]
-                effective[name]["value"] = v_override.get("value", effective[name]["value"])
-                effective[name]["requiresHrApproval"] = v_override.get("requiresHrApproval", effective[name]["requiresHrApproval"])
-                effective[name]["requiresSecondaryApproval"] = v_override.get("requiresSecondaryApproval", effective[name]["requiresSecondaryApproval"])
-                effective[name]["requiresCoSign"] = v_override.get("requiresCoSign", effective[name]["requiresCoSign"])
-                effective[name]["requestPermission"] = v_override.get("requestPermission", effective[name]["requestPermission"])
-    
-    # Apply user overrides, which have final priority.
-    if user_overrides and isinstance(user_overrides, dict):
-        for perm_name, override in user_overrides.items():
-            if perm_name in effective:
-                effective[perm_name]["value"] = override.get("value", effective[perm_name]["value"])
-                effective[perm_name]["requiresHrApproval"] = override.get("requiresHrApproval", effective[perm_name]["requiresHrApproval"])
-                effective[perm_name]["requiresSecondaryApproval"] = override.get("requiresSecondaryApproval", effective[perm_name]["requiresSecondaryApproval"])
-                effective[perm_name]["requiresCoSign"] = override.get("requiresCoSign", effective[perm_name]["requiresCoSign"])
-                effective[perm_name]["requestPermission"] = override.get("requestPermission", effective[perm_name]["requestPermission"])
-            else:
-                effective[perm_name] = override
-
-    return effective
+@permission_manager.record_once
+def init_role_registry(state):
+    """Configure the role cache once; roles are loaded on first use in each worker."""
+    role_registry.init_app(state.app)
 
 def require_permission(permission_name, venue_id=None):
     """
@@ -91,7 +53,7 @@ def require_permission(permission_name, venue_id=None):
                 return jsonify({"success": False, "error": "User not assigned to business"}), 403
 
             # Retrieve role information
-            role_doc = find_role_by_name(db, user_doc.get("role_name"))
+            role_doc = role_registry.get(business_id, user_doc.get("role_name"), db)
             if not role_doc:
                 return jsonify({"success": False, "error": "Role not found"}), 403
 
@@ -125,7 +87,7 @@ def list_roles():
     """
     try:
         db = current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME]
-        roles = find_all_roles(db)
+        roles = role_registry.all(db)
         roles_list = [{
             "role_name": role["role_name"],
             "permissions": role.get("permissions", []),
@@ -161,19 +123,61 @@ def assign_role():
 
         if not (payroll_id and business_id and role_name):
             return jsonify({"success": False, "error": "Missing required fields"}), 400
+        if not isinstance(overrides, dict):
+            return jsonify({"success": False, "error": "'overrides' must be an object"}), 400
 
-        success = assign_role_to_user(
-            current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME],
+        db = current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME]
+        success = role_assignment.assign_role(
+            db[Config.COLLECTION_BUSINESS_USERS],
             payroll_id,
             business_id,
             role_name,
-            override_data=overrides
+            overrides
         )
         if success:
             return jsonify({"success": True, "message": f"Role {role_name} assigned to user {payroll_id}"}), 200
         else:
-            return jsonify({"success": False, "error": "Assignment failed"}), 500
+            return jsonify({"success": False, "error": "User not assigned to business"}), 404
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@permission_manager.route('/assign/bulk', methods=['POST'])
+def assign_roles_bulk():
+    """
+    Assign roles to many users in one request (e.g. onboarding a venue).
+    Rows are applied by utils.auth.role_assignment with the same update as
+    /assign; roles are validated against the business's cached roles and all
+    writes go out in a single unordered bulk_write.
+    Expected JSON payload:
+    {
+      "business_id": "<business_id>",          // (Optional) default for every row
+      "assignments": [
+          {"payroll_id": "<payroll_id>", "role_name": "<role_name>",
+           "business_id": "<business_id>", "overrides": {...}},
+          ...
+      ]
+    }
+    Response "results" has one entry per input row, in order, with a
+    "status" of "assigned", "invalid", "not_found", "duplicate" or "failed".
+    """
+    try:
+        data = request.get_json() or {}
+        db = current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME]
+        counts, results = role_assignment.assign_roles_bulk(
+            db[Config.COLLECTION_BUSINESS_USERS],
+            data.get("assignments"),
+            lambda business_id, role_name: role_registry.get(business_id, role_name, db),
+            default_business_id=data.get("business_id")
+        )
+        return jsonify({
+            "success": True,
+            "summary": counts,
+            "results": results
+        }), 200
 
+    except RoleAssignmentError as e:
+        return jsonify({"success": False, "error": e.message}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -204,7 +208,7 @@ def check_permission():
         if not user_doc:
             return jsonify({"success": False, "error": "User not assigned to business"}), 404
 
-        role_doc = find_role_by_name(db, user_doc.get("role_name"))
+        role_doc = role_registry.get(business_id, user_doc.get("role_name"), db)
         if not role_doc:
             return jsonify({"success": False, "error": "Role not found"}), 404
 
@@ -224,6 +228,57 @@ def check_permission():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@permission_manager.route('/check/batch', methods=['POST'])
+def check_permissions_batch():
+    """
+    Check many permissions across many venues in a single request.
+    The user and role are resolved once and the effective permissions are
+    computed once per venue.
+    Expected JSON payload:
+    {
+       "payroll_id": "<payroll_id>",
+       "business_id": "<business_id>",
+       "permissions": ["<permissionName>", ...],   // (Optional) defaults to every effective permission
+       "venues": ["<venue_id>", ...]              // (Optional) venue-specific overrides
+    }
+    Response "matrix" is keyed by venue_id ("global" when no venue applies),
+    then by permission name, with "allowed" and the "effective" flags.
+    """
+    try:
+        data = request.get_json() or {}
+        payroll_id = data.get("payroll_id")
+        business_id = data.get("business_id")
+
+        if not (payroll_id and business_id):
+            return jsonify({"success": False, "error": "Missing required fields"}), 400
+
+        db = current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME]
+        user_doc = find_user_in_business(db, payroll_id, business_id)
+        if not user_doc:
+            return jsonify({"success": False, "error": "User not assigned to business"}), 404
+
+        role_doc = role_registry.get(business_id, user_doc.get("role_name"), db)
+        if not role_doc:
+            return jsonify({"success": False, "error": "Role not found"}), 404
+
+        matrix = permission_matrix(
+            role_doc.get("permissions", []),
+            user_doc.get("overrides", {}),
+            permission_names=data.get("permissions"),
+            venues=data.get("venues")
+        )
+
+        return jsonify({
+            "success": True,
+            "role_name": user_doc.get("role_name"),
+            "matrix": matrix
+        }), 200
+
+    except PermissionCheckError as e:
+        return jsonify({"success": False, "error": e.message}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @permission_manager.route('/roles/<role_name>', methods=['PUT'])
 def update_role_permissions(role_name):
     """
@@ -240,7 +295,7 @@ def update_role_permissions(role_name):
             return jsonify({"success": False, "error": "Missing 'permissions' in request body"}), 400
 
         db = current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME]
-        updated_role = update_role(db, role_name, {"permissions": updated_permissions})
+        updated_role = role_registry.update_role(db, role_name, {"permissions": updated_permissions}, update_role)
         if updated_role:
             return jsonify({"success": True, "updated_role": updated_role}), 200
         else:
@@ -6,6 +6,7 @@ It imports blueprints from the following modules:
   - allergens_routes.py (exposing `allergens_bp`)
   - recipe_routes.py (exposing `recipe_search`)
   - product_routes.py (exposing `products`)
+  - export_routes.py (exposing `exports`)
 
 Usage:
     from routes.search import register_search_routes
@@ -23,6 +24,7 @@ def register_search_routes(app: Flask) -> None:
         - allergens_bp: Handles endpoints related to allergen searches.
         - recipe_search: Manages endpoints for recipe searches.
         - products: Provides endpoints for product searches.
+        - exports: Streams NDJSON/CSV exports of search collections.
 
     Args:
         app (Flask): The Flask application instance.
@@ -35,6 +37,7 @@ def register_search_routes(app: Flask) -> None:
         from .allergens_routes import allergens_bp  # Expected blueprint for allergens
         from .recipe_routes import recipe_search     # Blueprint for recipe search
         from .product_routes import products          # Blueprint for product routes
+        from .export_routes import exports            # Blueprint for streaming exports
     except ImportError as imp_err:
         logging.error(f"Error importing search routes blueprints: {imp_err}")
         raise
@@ -43,6 +46,7 @@ def register_search_routes(app: Flask) -> None:
         app.register_blueprint(allergens_bp)
         app.register_blueprint(recipe_search)
         app.register_blueprint(products)
+        app.register_blueprint(exports)
         logging.info("Search routes blueprints registered successfully.")
     except Exception as reg_err:
         logging.error(f"Error registering search routes blueprints: {reg_err}")
@@ -0,0 +1,53 @@
+from datetime import datetime
+import logging
+
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
+
+from config import Config
+from routes.auth.auth_routes import login_required
+from utils.export_stream import EXPORT_FORMATS, EXPORT_SPECS, ExportError, stream_export
+from utils.query_compiler import QueryCompileError
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Define the exports Blueprint
+exports = Blueprint('exports', __name__)
+
+@exports.route('/api/export/<dataset>', methods=['GET'])
+@login_required
+def export_dataset(dataset):
+    """
+    Stream a whole collection as NDJSON (default) or CSV.
+
+    Query parameters:
+        format: 'ndjson' or 'csv'
+        fields: Comma separated projection (defaults to the dataset's columns)
+        batch_size: Documents fetched per cursor batch (default 1000)
+        limit: Maximum number of documents
+        after: Resume after this _id
+        plus the search filters of the dataset (e.g. cuisine, supplier, severity)
+    """
+    spec = EXPORT_SPECS.get(dataset)
+    if spec is None:
+        return jsonify({
+            'error': f"Unknown dataset: {dataset}",
+            'datasets': sorted(EXPORT_SPECS)
+        }), 404
+
+    try:
+        db = current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME]
+        collection = db[getattr(Config, spec.collection_setting)]
+        # user_recipes is limited to the caller's own and business-shared recipes
+        export_format, chunks = stream_export(collection, spec, request.args, viewer=g.user)
+    except (ExportError, QueryCompileError) as e:
+        return jsonify({'error': e.message, 'code': e.error_code}), 400
+    except Exception as e:
+        logger.error(f"Error starting {dataset} export: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+    filename = f"{dataset}-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
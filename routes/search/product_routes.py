@@ -4,6 +4,7 @@ from bson import ObjectId
 import re
 import logging
 from config import Config
+from utils.http_cache import cached, PRODUCT_POLICY, PRODUCTS_NAMESPACE
 
 # Initialize logging
 logger = logging.getLogger(__name__)
@@ -69,6 +70,7 @@ def search_products():
         return jsonify({'error': 'Internal server error'}), 500
 
 @products.route('/api/products/details/<product_id>', methods=['GET'])
+@cached(PRODUCT_POLICY, namespace=PRODUCTS_NAMESPACE)
 def get_product_details(product_id):
     """
     Get detailed information for a specific product by ID.
@@ -111,6 +113,7 @@ def bulk_product_lookup():
         return jsonify({'error': 'Internal server error'}), 500
 
 @products.route('/api/products/categories', methods=['GET'])
+@cached(PRODUCT_POLICY, namespace=PRODUCTS_NAMESPACE)
 def get_product_categories():
     """
     Get all unique product categories/types.
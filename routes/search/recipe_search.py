@@ -1,59 +1,56 @@
-from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from flask import Blueprint, request, jsonify, current_app
 from bson.json_util import dumps
 from bson.objectid import ObjectId
 from config import Config
+from utils.query_compiler import compile_query, RECIPE_SEARCH_FIELDS
+from utils.federated_search import federated_recipe_search, SearchCursorError
+from utils.http_cache import cached, SEARCH_POLICY, RECIPES_NAMESPACE
+from utils.prep_list import build_prep_list, PrepListError
+from utils.ingredient_index import ingredient_index, LOOKUP_MODES
+from utils.allergen_impact import allergen_impact
+from routes.auth.auth_routes import verify_token, AuthError
 
 # Initialize the Blueprint
 recipe_search = Blueprint('recipe_search', __name__)
 
-# Database connection setup using environment variables
-client = MongoClient(Config.MONGO_URI)
-db = client[Config.MONGO_DBNAME]  # Using the MongoDB database name from config.py
+def get_db():
+    """
+    Database of the current worker's MongoClient (created after fork by
+    init_resources, never at import time).
+    """
+    if 'MONGO_CLIENT' not in current_app.config:
+        raise RuntimeError("Database client not configured. Ensure MONGO_CLIENT is set in app configuration.")
+    return current_app.config['MONGO_CLIENT'][Config.MONGO_DBNAME]
 
 def lookup_globalRecipe(db, globalRecipe_name):
     """
-    Look up a recipe in the global_recipes collection using partial matches.
+    Look up a recipe in the global_recipes collection by title prefix
+    (served by the search_keys index, see utils/query_compiler.py).
     """
-    query = {'title': {'$regex': globalRecipe_name, '$options': 'i'}}
-    return list(db[Config.COLLECTION_GLOBAL_RECIPES].find(query))
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, {'title': globalRecipe_name})
+    return list(compiled.find(db[Config.COLLECTION_GLOBAL_RECIPES]))
 
 def lookup_userRecipe(db, userRecipe_name):
     """
-    Look up a recipe in the user_recipes collection using partial matches.
+    Look up a recipe in the user_recipes collection by title prefix
+    (served by the search_keys index, see utils/query_compiler.py).
     """
-    query = {'title': {'$regex': userRecipe_name, '$options': 'i'}}
-    return list(db[Config.COLLECTION_USER_RECIPES].find(query))
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, {'title': userRecipe_name})
+    return list(compiled.find(db[Config.COLLECTION_USER_RECIPES]))
 
 @recipe_search.route('/api/global_recipes', methods=['GET'])
+@cached(SEARCH_POLICY, namespace=RECIPES_NAMESPACE)
 def get_global_recipes():
     """
     Search for recipes in the global_recipes collection based on query parameters.
     """
-    search_query = request.args.get('search_query', '')
-    ingredient = request.args.get('ingredient', '')
-    cuisine = request.args.get('cuisine', '')
-    method = request.args.get('method', '')
-    dietary = request.args.get('dietary', '')
-
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
 
-    query = {}
-
-    if search_query:
-        query["title"] = {"$regex": search_query, "$options": "i"}
-    if ingredient:
-        query["ingredients"] = {"$regex": ingredient, "$options": "i"}
-    if cuisine:
-        query["cuisine"] = {"$regex": cuisine, "$options": "i"}
-    if method:
-        query["cookery_method"] = {"$regex": method, "$options": "i"}
-    if dietary:
-        query["dietary"] = {"$regex": dietary, "$options": "i"}
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, request.args)
 
     try:
-        recipes = db[Config.COLLECTION_GLOBAL_RECIPES].find(query).skip((page - 1) * limit).limit(limit)
+        recipes = compiled.find(get_db()[Config.COLLECTION_GLOBAL_RECIPES]).skip((page - 1) * limit).limit(limit)
         return dumps(list(recipes))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -63,30 +60,129 @@ def get_user_recipes():
     """
     Search for recipes in the user_recipes collection based on query parameters.
     """
-    search_query = request.args.get('search_query', '')
-    ingredient = request.args.get('ingredient', '')
-    cuisine = request.args.get('cuisine', '')
-    method = request.args.get('method', '')
-    dietary = request.args.get('dietary', '')
-
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
 
-    query = {}
-
-    if search_query:
-        query["title"] = {"$regex": search_query, "$options": "i"}
-    if ingredient:
-        query["ingredients"] = {"$regex": ingredient, "$options": "i"}
-    if cuisine:
-        query["cuisine"] = {"$regex": cuisine, "$options": "i"}
-    if method:
-        query["cookery_method"] = {"$regex": method, "$options": "i"}
-    if dietary:
-        query["dietary"] = {"$regex": dietary, "$options": "i"}
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, request.args)
 
     try:
-        recipes = db[Config.COLLECTION_USER_RECIPES].find(query).skip((page - 1) * limit).limit(limit)
+        recipes = compiled.find(get_db()[Config.COLLECTION_USER_RECIPES]).skip((page - 1) * limit).limit(limit)
         return dumps(list(recipes))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+def get_search_viewer():
+    """
+    Return the token payload of the caller, or None for anonymous searches.
+    An invalid token is treated as anonymous so global results still load.
+    """
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None
+    try:
+        return verify_token(auth_header.replace('Bearer ', ''))
+    except AuthError:
+        return None
+
+@recipe_search.route('/api/recipes/search', methods=['GET'])
+def search_all_recipes():
+    """
+    Search global_recipes and user_recipes in one call.
+    User recipes are only included for an authenticated caller and limited to
+    the caller's own recipes and those shared with their business.
+    Pass the returned 'next_cursor' as 'cursor' to fetch the next page.
+    """
+    limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    cursor = request.args.get('cursor')
+
+    try:
+        page = federated_recipe_search(
+            get_db(),
+            Config,
+            request.args,
+            viewer=get_search_viewer(),
+            limit=limit,
+            cursor=cursor
+        )
+        return current_app.response_class(dumps(page), mimetype='application/json')
+    except SearchCursorError as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@recipe_search.route('/api/recipes/prep-list', methods=['POST'])
+def get_prep_list():
+    """
+    Scale a batch of recipes by portions and aggregate the ingredients into
+    one order list per supplier.
+
+    Body: {"items": [{"recipe_id": "...", "portions": 40}, {"title": "...", "portions": 12}]}
+    """
+    data = request.get_json(silent=True) or {}
+
+    try:
+        prep = build_prep_list(get_db(), data.get('items'), Config.COLLECTION_GLOBAL_RECIPES)
+        return jsonify(prep)
+    except PrepListError as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@recipe_search.route('/api/recipes/by-ingredient', methods=['GET'])
+def get_recipes_by_ingredient():
+    """
+    List the recipes that use an ingredient, with counts and recipe summaries,
+    from the ingredient -> recipe index.
+
+    Query parameters: ingredient, source (global_recipes|user_recipes),
+    mode (exact|tokens), limit
+    """
+    ingredient = request.args.get('ingredient', '').strip()
+    if not ingredient:
+        return jsonify({"error": "ingredient is required"}), 400
+    source = request.args.get('source', Config.COLLECTION_GLOBAL_RECIPES)
+    if source not in (Config.COLLECTION_GLOBAL_RECIPES, Config.COLLECTION_USER_RECIPES):
+        return jsonify({"error": f"Unknown source: {source}"}), 400
+    mode = request.args.get('mode', 'exact')
+    if mode not in LOOKUP_MODES:
+        return jsonify({"error": f"mode must be one of: {', '.join(LOOKUP_MODES)}"}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        return jsonify(ingredient_index.lookup(get_db(), ingredient, source, mode, limit))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@recipe_search.route('/api/recipes/allergen-impact', methods=['GET'])
+def get_allergen_impact():
+    """
+    List the recipes exposed to an allergen ingredient.
+    """
+    ingredient = request.args.get('ingredient', '').strip()
+    if not ingredient:
+        return jsonify({"error": "ingredient is required"}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        return jsonify(allergen_impact.impact(get_db(), ingredient, limit))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@recipe_search.route('/api/recipes/allergen-impact/changes', methods=['GET'])
+def get_allergen_impact_changes():
+    """
+    Published allergen impact deltas in sequence order. Pass the last seen
+    delta 'seq' as 'after' to receive only newer changes.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        deltas = allergen_impact.changes(get_db(), request.args.get('after'), limit)
+        return current_app.response_class(dumps(deltas), mimetype='application/json')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
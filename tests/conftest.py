@@ -0,0 +1,36 @@
+# ------------------------------------------------------------
+# tests/conftest.py
+# ------------------------------------------------------------
+"""
+Shared fixtures. Tests run against mongomock, so no MongoDB server is needed.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# utils/__init__.py resolves its re-exports on first access in lazy mode, so
+# importing one utils submodule does not import every other one
+os.environ.setdefault('LAZY_LOADING', 'true')
+
+import mongomock
+from mongomock.collection import BulkOperationBuilder, Cursor
+
+# mongomock predates two pymongo 4.x APIs used by the code under test:
+# UpdateOne(sort=...) in bulk writes, and Cursor.collation (string comparisons
+# here use the simple binary collation instead of ICU).
+_add_update = BulkOperationBuilder.add_update
+
+def _add_update_without_sort(self, *args, sort=None, **kwargs):
+    return _add_update(self, *args, **kwargs)
+
+BulkOperationBuilder.add_update = _add_update_without_sort
+Cursor.collation = lambda self, collation=None: self
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().test_db
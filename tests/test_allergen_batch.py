@@ -0,0 +1,59 @@
+from bson import ObjectId
+import pytest
+
+from utils.allergen_utils import (
+    MAX_ALLERGEN_BATCH,
+    AllergenError,
+    create_allergens,
+    delete_allergens,
+    update_allergens,
+)
+
+PEANUT = {'ingredient': 'Peanut', 'severity': 'severe', 'reaction_type': 'anaphylactic'}
+SESAME = {'ingredient': 'Sesame', 'severity': 'high', 'reaction_type': 'skin'}
+
+def test_create_reports_every_item(db):
+    batch = create_allergens(db, [PEANUT, {'ingredient': 'Milk'}, 'milk', dict(SESAME, severity='deadly')])
+
+    assert batch['summary'] == {'created': 1, 'invalid': 3}
+    assert [(r['index'], r['status']) for r in batch['results']] == [
+        (0, 'created'), (1, 'invalid'), (2, 'invalid'), (3, 'invalid')]
+    assert batch['results'][1]['error'] == 'Missing required fields: severity, reaction_type'
+    assert batch['results'][2]['error'] == 'Allergen must be an object'
+    created = db.allergens.find_one({'_id': ObjectId(batch['results'][0]['id'])})
+    assert created['ingredient'] == 'Peanut' and created['created_at'] == created['updated_at']
+
+def test_update_reports_invalid_and_missing_ids(db):
+    ids = [r['id'] for r in create_allergens(db, [PEANUT, SESAME])['results']]
+    batch = update_allergens(db, [
+        {'_id': ids[0], 'severity': 'high'},
+        {'id': ids[1], 'reaction_type': 'sneezing'},
+        {'id': str(ObjectId()), 'severity': 'low'},
+        {'id': 'not-an-id', 'severity': 'low'},
+        {'id': ids[1]}
+    ])
+
+    assert batch['summary'] == {'updated': 1, 'invalid': 3, 'not_found': 1}
+    assert [r['status'] for r in batch['results']] == ['updated', 'invalid', 'not_found', 'invalid', 'invalid']
+    assert batch['results'][4]['error'] == 'No fields to update'
+    assert db.allergens.find_one({'_id': ObjectId(ids[0])})['severity'] == 'high'
+    assert db.allergens.find_one({'_id': ObjectId(ids[1])})['reaction_type'] == 'skin'
+
+def test_delete_reports_each_id_once_deleted(db):
+    ids = [r['id'] for r in create_allergens(db, [PEANUT, SESAME])['results']]
+    missing = str(ObjectId())
+    batch = delete_allergens(db, [ids[0], missing, 'bad', ids[1]])
+
+    assert batch['summary'] == {'deleted': 2, 'not_found': 1, 'invalid': 1}
+    assert [(r['index'], r['status']) for r in batch['results']] == [
+        (0, 'deleted'), (1, 'not_found'), (2, 'invalid'), (3, 'deleted')]
+    assert db.allergens.count_documents({}) == 0
+
+@pytest.mark.parametrize('batch, code', [
+    ({'ingredient': 'Peanut'}, 'INVALID_BATCH'),
+    ([PEANUT] * (MAX_ALLERGEN_BATCH + 1), 'BATCH_TOO_LARGE')
+])
+def test_malformed_batches_raise(db, batch, code):
+    with pytest.raises(AllergenError) as exc:
+        create_allergens(db, batch)
+    assert exc.value.error_code == code
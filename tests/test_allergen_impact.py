@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.allergen_impact import GAP_TIMEOUT_SECONDS, AllergenImpactService
+from utils.ingredient_index import ingredient_index
+
+@pytest.fixture
+def indexed_db(db):
+    recipes = [('Satay', ['Roasted Peanuts', 'Chicken']), ('PBJ', ['Peanut Butter', 'Bread']),
+               ('Salad', ['Sesame Seeds'])]
+    db.global_recipes.insert_many([{'title': title, 'ingredients': ingredients} for title, ingredients in recipes])
+    ingredient_index.index_missing(db, 'global_recipes')
+    return db
+
+def test_deltas_track_added_removed_and_affected_recipes(indexed_db):
+    service = AllergenImpactService()
+    allergen = {'_id': 'a1', 'ingredient': 'peanut', 'severity': 'severe'}
+    created = service.record_change(indexed_db, 'create', None, allergen)
+    assert len(created['added']) == 2 and created['removed'] == []
+
+    updated = service.record_change(indexed_db, 'update', allergen, dict(allergen, severity='high'))
+    assert len(updated['affected']) == 2 and updated['changes'] == {'severity': ['severe', 'high']}
+
+    renamed = service.record_change(indexed_db, 'update', allergen, dict(allergen, ingredient='sesame'))
+    assert (len(renamed['added']), len(renamed['removed']), renamed['previous_ingredient']) == (1, 2, 'peanut')
+    assert service.record_change(indexed_db, 'update', allergen, dict(allergen)) is None
+
+def test_sequence_is_shared_across_workers(indexed_db):
+    worker_a, worker_b = AllergenImpactService(), AllergenImpactService()
+    for n, worker in enumerate([worker_a, worker_b, worker_a]):
+        worker.record_change(indexed_db, 'create', None, {'_id': f'a{n}', 'ingredient': 'peanut'})
+    deltas = worker_b.changes(indexed_db)
+    assert [d['seq'] for d in deltas] == [1, 2, 3]
+    assert [d['seq'] for d in worker_a.changes(indexed_db, after=deltas[0]['seq'])] == [2, 3]
+    with pytest.raises(ValueError):
+        worker_a.changes(indexed_db, after='not-a-seq')
+
+def test_changes_wait_for_a_reserved_but_unwritten_delta(indexed_db):
+    service = AllergenImpactService()
+    service.record_change(indexed_db, 'create', None, {'_id': 'a1', 'ingredient': 'peanut'})
+    # Another worker reserved seq 2 and has not inserted it yet
+    service._reserve(indexed_db, 1)
+    service.record_change(indexed_db, 'create', None, {'_id': 'a3', 'ingredient': 'sesame'})
+
+    assert [d['seq'] for d in service.changes(indexed_db)] == [1]
+    assert service.changes(indexed_db, after=1) == []
+
+    stale = datetime.utcnow() - timedelta(seconds=GAP_TIMEOUT_SECONDS + 1)
+    indexed_db.allergen_impact_events.update_one({'seq': 3}, {'$set': {'created_at': stale}})
+    assert [d['seq'] for d in service.changes(indexed_db, after=1)] == [3]
@@ -0,0 +1,82 @@
+import os
+
+from bson import json_util
+
+from utils.audit_pipeline import AuditPipeline
+
+def _pipeline(db, tmp_path):
+    pipeline = AuditPipeline(batch_size=2, flush_interval=0.01, spool_path=str(tmp_path / 'audit_spool.jsonl'))
+    pipeline._get_collection = lambda: db.audit_logs
+    return pipeline
+
+def _dead_pid():
+    pid = 999999
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return pid
+        except PermissionError:
+            pass
+        pid -= 1
+
+def test_replay_moves_spooled_events_into_mongo(db, tmp_path):
+    pipeline = _pipeline(db, tmp_path)
+    pipeline._spool([{'event_type': 'login', 'n': n} for n in range(5)])
+    assert pipeline.replay_spool() == 5
+    assert db.audit_logs.count_documents({}) == 5
+    assert not os.listdir(tmp_path) or os.listdir(tmp_path) == ['audit_spool.jsonl.lock']
+
+def test_replay_adopts_files_left_by_dead_workers(db, tmp_path):
+    pipeline = _pipeline(db, tmp_path)
+    orphan = tmp_path / f'audit_spool.jsonl.replay.{_dead_pid()}'
+    orphan.write_text(json_util.dumps({'event_type': 'orphan'}) + '\n')
+    pipeline._spool([{'event_type': 'login'}])
+    assert pipeline.replay_spool() == 2
+    assert not orphan.exists()
+    assert sorted(d['event_type'] for d in db.audit_logs.find()) == ['login', 'orphan']
+
+def test_failed_replay_returns_events_to_the_spool(db, tmp_path):
+    pipeline = _pipeline(db, tmp_path)
+    pipeline._spool([{'event_type': 'login'}])
+
+    class Unavailable:
+        def insert_many(self, *args, **kwargs):
+            raise ConnectionError('down')
+
+    pipeline._get_collection = Unavailable
+    assert pipeline.replay_spool() == 0
+    pipeline._get_collection = lambda: db.audit_logs
+    assert pipeline.replay_spool() == 1
+
+def test_worker_survives_errors_and_keeps_queued_events(db, tmp_path):
+    pipeline = _pipeline(db, tmp_path)
+    calls = {'n': 0}
+    original = pipeline.replay_spool
+
+    def flaky_replay():
+        calls['n'] += 1
+        if calls['n'] == 1:
+            raise OSError('disk hiccup')
+        return original()
+
+    pipeline.replay_spool = flaky_replay
+    pipeline.log_event('login', 'P1', 'B1', 'first')
+    worker = pipeline._worker
+    for _ in range(200):
+        if calls['n']:
+            break
+        worker.join(0.01)
+    pipeline.log_event('login', 'P1', 'B1', 'second')
+    assert pipeline._worker is worker and worker.is_alive()
+    pipeline.shutdown()
+    assert db.audit_logs.count_documents({}) == 2
+
+def test_init_app_registers_shutdown_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr('utils.audit_pipeline.atexit.register', registered.append)
+    app = type('App', (), {'config': {'MONGO_DBNAME': 'x'}, 'extensions': {}})()
+    pipeline = AuditPipeline()
+    pipeline.init_app(app)
+    pipeline.init_app(app)
+    assert len(registered) == 1
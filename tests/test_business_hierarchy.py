@@ -0,0 +1,47 @@
+import pytest
+
+from utils.business_hierarchy import HierarchyCache
+
+BUSINESS = {
+    'business_id': 'B1', 'name': 'Le Repertoire', 'settings': {'currency': 'AUD', 'tags': ['bistro']},
+    'venues': [
+        {'venue_id': 'V1', 'name': 'City', 'work_areas': [
+            {'work_area_id': 'W1', 'name': 'Kitchen', 'stations': ['grill', 'pass']},
+            {'work_area_id': 'W2', 'name': 'Bar'}
+        ]},
+        {'venue_id': 'V2', 'name': 'Harbour', 'work_areas': [{'work_area_id': 'W3', 'name': 'Kitchen'}]}
+    ]
+}
+
+@pytest.fixture
+def hierarchy_db(db):
+    db.business_entities.insert_one(dict(BUSINESS))
+    return db
+
+def test_resolution_uses_the_snapshot(hierarchy_db):
+    cache = HierarchyCache()
+    assert cache.lookup_venue(hierarchy_db, 'B1', 'V2')['name'] == 'Harbour'
+    hierarchy_db.business_entities.delete_many({})
+    # Served from memory until rebuilt
+    assert cache.lookup_work_area(hierarchy_db, 'B1', 'W3', venue_id='V2')['name'] == 'Kitchen'
+    assert cache.lookup_work_area(hierarchy_db, 'B1', 'W3', venue_id='V1') is None
+    assert cache.resolve(hierarchy_db, 'B1', 'V1', 'W1')['work_area']['name'] == 'Kitchen'
+    assert cache.rebuild(hierarchy_db, 'B1') is None and len(cache) == 0
+
+def test_snapshots_are_deeply_immutable(hierarchy_db):
+    snapshot = HierarchyCache().get(hierarchy_db, 'B1')
+    with pytest.raises(TypeError):
+        snapshot.business['settings']['currency'] = 'USD'
+    with pytest.raises(AttributeError):
+        snapshot.work_areas['W1']['stations'].append('fryer')
+
+    hierarchy = snapshot.to_dict()
+    hierarchy['settings']['tags'].append('wine bar')
+    assert hierarchy['venues'][0]['work_areas'][0]['stations'] == ['grill', 'pass']
+    assert snapshot.business['settings']['tags'] == ('bistro',)
+
+def test_stale_snapshots_are_rebuilt(hierarchy_db):
+    cache = HierarchyCache(max_age_seconds=0)
+    assert cache.lookup_venue(hierarchy_db, 'B1', 'V1')['name'] == 'City'
+    hierarchy_db.business_entities.update_one({'business_id': 'B1'}, {'$set': {'venues.0.name': 'CBD'}})
+    assert cache.lookup_venue(hierarchy_db, 'B1', 'V1')['name'] == 'CBD'
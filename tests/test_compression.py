@@ -0,0 +1,32 @@
+from flask import Flask, jsonify, request
+
+from utils.compression import Compressor
+
+def _app():
+    app = Flask(__name__)
+    Compressor(min_size=16).init_app(app)
+
+    @app.route('/recipes')
+    def recipes():
+        response = jsonify({'titles': ['Omelette'] * 50})
+        response.set_etag('v1')
+        return response.make_conditional(request)
+
+    return app
+
+def test_304_keeps_the_negotiated_etag_suffix():
+    client = _app().test_client()
+    full = client.get('/recipes', headers={'Accept-Encoding': 'gzip'})
+    assert full.headers['Content-Encoding'] == 'gzip'
+    assert full.headers['ETag'] == '"v1-gzip"'
+
+    revalidated = client.get('/recipes', headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"v1-gzip"'})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == '"v1-gzip"'
+    assert 'Accept-Encoding' in revalidated.headers['Vary']
+
+def test_uncompressed_304_keeps_the_bare_etag():
+    client = _app().test_client()
+    revalidated = client.get('/recipes', headers={'Accept-Encoding': 'identity', 'If-None-Match': '"v1"'})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == '"v1"'
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from utils.export_stream import EXPORT_SPECS, ExportError, stream_export
+
+def _export(collection, **args):
+    _, chunks = stream_export(collection, EXPORT_SPECS['global_recipes'], args)
+    return [json.loads(line) for line in ''.join(chunks).splitlines()]
+
+def test_limit_caps_the_export(db):
+    db.recipes.insert_many([{'_id': i, 'title': f'Recipe {i}'} for i in range(5)])
+    assert [doc['_id'] for doc in _export(db.recipes, limit='2', fields='_id,title')] == [0, 1]
+
+@pytest.mark.parametrize('limit', ['-5', '0', 'ten'])
+def test_non_positive_or_malformed_limit_is_rejected(db, limit):
+    with pytest.raises(ExportError) as exc:
+        stream_export(db.recipes, EXPORT_SPECS['global_recipes'], {'limit': limit})
+    assert exc.value.error_code == 'INVALID_LIMIT'
+
+def test_user_recipes_are_scoped_to_the_viewer(db):
+    db.user_recipes.insert_many([
+        {'_id': 1, 'title': 'Mine', 'payroll_id': 'P1', 'business_id': 'B1', 'visibility': 'private'},
+        {'_id': 2, 'title': 'Shared', 'payroll_id': 'P2', 'business_id': 'B1', 'visibility': 'business'},
+        {'_id': 3, 'title': 'Private', 'payroll_id': 'P2', 'business_id': 'B1', 'visibility': 'private'},
+        {'_id': 4, 'title': 'Elsewhere', 'payroll_id': 'P3', 'business_id': 'B2', 'visibility': 'business'}
+    ])
+    spec = EXPORT_SPECS['user_recipes']
+    _, chunks = stream_export(db.user_recipes, spec, {'fields': 'title'},
+                              viewer={'payroll_id': 'P1', 'business_id': 'B1'})
+    assert [json.loads(line)['title'] for line in ''.join(chunks).splitlines()] == ['Mine', 'Shared']
+
+    with pytest.raises(ExportError) as exc:
+        stream_export(db.user_recipes, spec, {})
+    assert exc.value.error_code == 'VIEWER_REQUIRED'
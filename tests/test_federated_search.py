@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from utils.federated_search import (
+    SearchCursorError,
+    decode_cursor,
+    encode_cursor,
+    federated_recipe_search,
+    title_sort_key,
+)
+
+CONFIG = SimpleNamespace(COLLECTION_GLOBAL_RECIPES='global_recipes', COLLECTION_USER_RECIPES='user_recipes')
+VIEWER = {'payroll_id': 'P1', 'business_id': 'B1'}
+
+GLOBAL_TITLES = ['Crème brûlée', 'Cremini risotto', 'Éclair', 'Egg fried rice', 'egg salad',
+                 'Ångström cake', 'Apple pie', 'Mac & cheese', 'Mac-n-cheese', '1-pot pasta', 'Zucchini']
+USER_TITLES = ['Creme caramel', 'Eclair au café', 'Eggs Benedict', 'apple crumble', 'Mac and cheese', 'Ölkuchen']
+
+def _seed(db):
+    for title in GLOBAL_TITLES:
+        db.global_recipes.insert_one({'title': title})
+    for title in USER_TITLES:
+        db.user_recipes.insert_one({'title': title, 'payroll_id': 'P1'})
+
+def _walk(db, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = federated_recipe_search(db, CONFIG, {}, viewer=VIEWER, limit=limit, cursor=cursor)
+        assert len(page['results']) <= limit
+        seen.extend((doc['source'], doc['title']) for doc in page['results'])
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return seen, pages
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 100])
+def test_walking_every_page_returns_each_recipe_once(db, limit):
+    _seed(db)
+    seen, pages = _walk(db, limit)
+    expected = [('global', t) for t in GLOBAL_TITLES] + [('user', t) for t in USER_TITLES]
+    assert sorted(seen) == sorted(expected)
+    assert len(seen) == len(set(seen))
+    assert pages == -(-len(expected) // limit)
+
+def test_recipes_added_behind_the_cursor_do_not_shift_pages(db):
+    _seed(db)
+    first = federated_recipe_search(db, CONFIG, {}, viewer=VIEWER, limit=4)
+    db.global_recipes.insert_one({'title': '0 first'})
+    rest, cursor = [], first['next_cursor']
+    while cursor:
+        page = federated_recipe_search(db, CONFIG, {}, viewer=VIEWER, limit=4, cursor=cursor)
+        rest.extend(doc['title'] for doc in page['results'])
+        cursor = page['next_cursor']
+    returned = [doc['title'] for doc in first['results']] + rest
+    assert sorted(returned) == sorted(GLOBAL_TITLES + USER_TITLES)
+
+def test_anonymous_search_only_returns_global_recipes(db):
+    _seed(db)
+    page = federated_recipe_search(db, CONFIG, {}, limit=100)
+    assert {doc['source'] for doc in page['results']} == {'global'}
+
+def test_title_sort_key_orders_accents_as_ties():
+    titles = ['Egg', 'Éclair', 'Cremini', 'Crème', 'creme', 'Mac-n-cheese', 'Mac & cheese', '1-pot']
+    assert sorted(titles, key=title_sort_key) == \
+        ['1-pot', 'creme', 'Crème', 'Cremini', 'Éclair', 'Egg', 'Mac & cheese', 'Mac-n-cheese']
+
+def test_cursor_round_trip_and_rejects_garbage():
+    doc_id = ObjectId()
+    positions = {'global': ('Éclair', doc_id), 'user': (None, doc_id)}
+    assert decode_cursor(encode_cursor(positions)) == positions
+    with pytest.raises(SearchCursorError):
+        decode_cursor('not-a-cursor')
+    with pytest.raises(SearchCursorError):
+        decode_cursor(encode_cursor({'other': ('x', doc_id)}))
@@ -0,0 +1,37 @@
+from flask import Flask, jsonify
+
+from utils.http_cache import (
+    RECIPES_NAMESPACE,
+    CachePolicy,
+    MemoryResponseCacheBackend,
+    cached,
+    response_cache,
+)
+
+def test_writes_invalidate_their_namespace(monkeypatch):
+    monkeypatch.setattr(response_cache, 'backend', MemoryResponseCacheBackend())
+    app = Flask(__name__)
+    data = {'title': 'Omelette'}
+
+    @app.route('/recipes')
+    @cached(CachePolicy(max_age=60, shared_ttl=60), namespace=RECIPES_NAMESPACE)
+    def recipes():
+        return jsonify(data)
+
+    client = app.test_client()
+    assert client.get('/recipes').headers['X-Cache'] == 'MISS'
+    data['title'] = 'Frittata'
+    hit = client.get('/recipes')
+    assert hit.headers['X-Cache'] == 'HIT' and hit.get_json() == {'title': 'Omelette'}
+
+    assert response_cache.invalidate(RECIPES_NAMESPACE) == 1
+    fresh = client.get('/recipes')
+    assert fresh.headers['X-Cache'] == 'MISS' and fresh.get_json() == {'title': 'Frittata'}
+
+def test_invalidation_failures_do_not_reach_the_writer(monkeypatch):
+    class Broken(MemoryResponseCacheBackend):
+        def invalidate(self, namespace=None):
+            raise ConnectionError('cache down')
+
+    monkeypatch.setattr(response_cache, 'backend', Broken())
+    assert response_cache.invalidate(RECIPES_NAMESPACE) == 0
@@ -0,0 +1,57 @@
+from utils.ingredient_index import INDEXED_AT_FIELD, IngredientIndex, recipe_ingredients
+from utils.recipe_utils import lookup_recipeIngredient
+
+def _seed(db):
+    ids = {}
+    for title, ingredients in [('Omelette', ['Eggs', 'Butter']), ('Carbonara', ['Egg Yolk', 'Pecorino']),
+                               ('Bread', ['Plain Flour', 'Yeast']), ('Cake', ['Self-raising flour', 'Eggs'])]:
+        ids[title] = db.global_recipes.insert_one({'title': title, 'ingredients': ingredients}).inserted_id
+    return ids
+
+def _titles(result):
+    return sorted(recipe['title'] for recipe in result['recipes'])
+
+def test_recipe_ingredients_merges_names_and_lines():
+    recipe = {'ingredients': ['Plain Flour', {'name': 'Sugar'}],
+              'ingredient_lines': [{'name': 'plain flour', 'ingredient': 'Flour Plain 1kg'}]}
+    assert recipe_ingredients(recipe) == {
+        'plain flour': 'Plain Flour', 'sugar': 'Sugar', 'flour plain 1kg': 'Flour Plain 1kg'}
+
+def test_postings_and_lookup_modes(db):
+    index = IngredientIndex()
+    _seed(db)
+    assert index.index_missing(db, 'global_recipes') == {'recipes': 4, 'postings': 8}
+    assert db.global_recipes.count_documents({INDEXED_AT_FIELD: None}) == 0
+
+    exact = index.lookup(db, 'eggs', 'global_recipes', mode='exact')
+    assert exact['count'] == 2 and _titles(exact) == ['Cake', 'Omelette']
+    assert _titles(index.lookup(db, 'flour', 'global_recipes', mode='tokens')) == ['Bread', 'Cake']
+    assert _titles(index.lookup(db, 'egg', 'global_recipes', mode='tokens')) == ['Cake', 'Carbonara', 'Omelette']
+    assert _titles(index.lookup(db, 'pec', 'global_recipes', mode='tokens')) == []
+    assert _titles(index.lookup(db, 'pec', 'global_recipes', mode='prefix')) == ['Carbonara']
+    prefix = index.lookup(db, 'egg', 'global_recipes', mode='prefix')
+    assert _titles(prefix) == ['Cake', 'Carbonara', 'Omelette']
+    assert prefix['ingredients'] == {'Eggs': 2, 'Egg Yolk': 1}
+    assert index.lookup(db, 'egg', 'global_recipes', mode='prefix', limit=1)['count'] == 3
+
+def test_reindexing_replaces_postings_and_is_idempotent(db):
+    index = IngredientIndex()
+    ids = _seed(db)
+    index.index_missing(db, 'global_recipes')
+    assert index.index_missing(db, 'global_recipes') == {'recipes': 0, 'postings': 0}
+
+    db.global_recipes.update_one({'_id': ids['Omelette']}, {'$set': {'ingredients': ['Duck Eggs']}})
+    index.index_recipe(db, 'global_recipes', db.global_recipes.find_one({'_id': ids['Omelette']}))
+    assert _titles(index.lookup(db, 'butter', 'global_recipes')) == []
+    assert _titles(index.lookup(db, 'duck eggs', 'global_recipes')) == ['Omelette']
+    assert db.ingredient_recipe_index.count_documents({'recipe_id': ids['Omelette']}) == 1
+
+    assert index.remove_recipes(db, 'global_recipes', [ids['Omelette']]) == 1
+    assert index.rebuild(db, 'global_recipes') == {'recipes': 4, 'postings': 7}
+
+def test_lookup_recipe_ingredient_falls_back_until_indexed(db):
+    _seed(db)
+    assert sorted(r['title'] for r in lookup_recipeIngredient(db, 'gg')) == ['Cake', 'Carbonara', 'Omelette']
+    IngredientIndex().index_missing(db, 'global_recipes')
+    assert sorted(r['title'] for r in lookup_recipeIngredient(db, 'pecor')) == ['Carbonara']
+    assert lookup_recipeIngredient(db, 'gg') is None
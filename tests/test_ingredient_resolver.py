@@ -0,0 +1,36 @@
+from utils.ingredient_resolver import IngredientResolver, get_ingredient_resolver
+
+PRODUCTS = [{'INGREDIENT': name, 'SUPPLIER': 'Brake'} for name in (
+    'Tomato Paste', 'Chopped Tomatoes', 'Olive Oil', 'Extra Virgin Olive Oil', 'Basil'
+)]
+
+def _names(candidates):
+    return [candidate['INGREDIENT'] for candidate in candidates]
+
+def test_generic_query_does_not_resolve_to_a_more_specific_product():
+    resolver = IngredientResolver(PRODUCTS)
+    assert resolver.best_match('tomato') is None
+    assert resolver.best_match('olive oil')['INGREDIENT'] == 'Olive Oil'
+
+def test_exact_and_singular_forms_outrank_products_with_extra_tokens():
+    resolver = IngredientResolver(PRODUCTS + [{'INGREDIENT': 'Tomatoes'}])
+    ranked = resolver.resolve('tomato', min_score=0)
+    assert _names(ranked)[:2] == ['Tomatoes', 'Tomato Paste']
+    assert ranked[0]['match'] == 'exact'
+    assert ranked[1]['score'] < 0.6
+
+def test_token_order_and_typos_still_match():
+    resolver = IngredientResolver(PRODUCTS)
+    assert resolver.resolve('paste, tomato')[0]['match'] == 'tokens'
+    typo = resolver.best_match('oliv oil')
+    assert (typo['INGREDIENT'], typo['score']) == ('Olive Oil', 0.9)
+
+def test_resolver_cache_is_keyed_by_database(db):
+    other = db.client['other_db']
+    db.product_list.insert_one({'INGREDIENT': 'Basil'})
+    other.product_list.insert_one({'INGREDIENT': 'Olive Oil'})
+
+    resolver = get_ingredient_resolver(db, refresh=True)
+    assert get_ingredient_resolver(other, refresh=True).best_match('olive oil') is not None
+    assert get_ingredient_resolver(db) is resolver
+    assert resolver.best_match('olive oil') is None
@@ -0,0 +1,63 @@
+import sys
+import textwrap
+
+from flask import Flask, url_for
+
+from utils.lazy_loading import LazyBlueprints, lazy_loading_enabled
+
+def _lazy_app(tmp_path, monkeypatch, mounts):
+    (tmp_path / 'lazy_finance_routes.py').write_text(textwrap.dedent('''
+        from flask import Blueprint, current_app, url_for
+
+        finance = Blueprint('finance', __name__, url_prefix='/finance')
+
+        @finance.route('/report')
+        def report():
+            return url_for('index')
+
+        @finance.route('/client')
+        def client():
+            return str(current_app.config.get('MONGO_CLIENT'))
+    '''))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'lazy_finance_routes', raising=False)
+
+    app = Flask(__name__)
+    app.config['LAZY_LOADING'] = True
+
+    @app.route('/')
+    def index():
+        return url_for('finance.report')
+
+    app.wsgi_app = LazyBlueprints(app, mounts)
+    return app
+
+def test_enabled_reads_the_app_config(monkeypatch):
+    monkeypatch.setenv('LAZY_LOADING', 'true')
+    app = Flask(__name__)
+    app.config['LAZY_LOADING'] = False
+    assert lazy_loading_enabled() and not lazy_loading_enabled(app)
+
+def test_url_for_crosses_the_lazy_mount(tmp_path, monkeypatch):
+    app = _lazy_app(tmp_path, monkeypatch, {'/finance': 'lazy_finance_routes:finance'})
+    client = app.test_client()
+    assert 'lazy_finance_routes' not in sys.modules
+
+    # Main app -> deferred blueprint loads it on demand
+    assert client.get('/').get_data(as_text=True) == '/finance/report'
+    # Deferred blueprint -> main app
+    assert client.get('/finance/report').get_data(as_text=True) == '/'
+
+def test_missing_modules_are_not_mounted(tmp_path, monkeypatch):
+    app = _lazy_app(tmp_path, monkeypatch, {'/payroll': 'routes.no_such_routes:payroll'})
+    assert app.wsgi_app.mounts == {}
+    assert app.test_client().get('/payroll/run').status_code == 404
+
+def test_deferred_blueprint_sees_config_set_after_it_loaded(tmp_path, monkeypatch):
+    app = _lazy_app(tmp_path, monkeypatch, {'/finance': 'lazy_finance_routes:finance'})
+    client = app.test_client()
+    assert client.get('/finance/client').get_data(as_text=True) == 'None'
+
+    # e.g. init_worker creating the MongoClient after fork
+    app.config['MONGO_CLIENT'] = 'worker-client'
+    assert client.get('/finance/client').get_data(as_text=True) == 'worker-client'
@@ -0,0 +1,22 @@
+from flask import Flask
+
+from utils.middleware import StaticFastPath
+
+def _client(tmp_path, origins):
+    (tmp_path / 'site.css').write_text('body {}')
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    app.wsgi_app = StaticFastPath(app, cors_origins=origins)
+    return app.test_client()
+
+def test_configured_origin_is_echoed_on_static_files(tmp_path):
+    client = _client(tmp_path, ['https://app.example.com', 'https://admin.example.com'])
+    allowed = client.get('/static/site.css', headers={'Origin': 'https://admin.example.com'})
+    assert allowed.headers['Access-Control-Allow-Origin'] == 'https://admin.example.com'
+    assert 'Origin' in allowed.headers['Vary']
+
+    other = client.get('/static/site.css', headers={'Origin': 'https://evil.example.com'})
+    assert 'Access-Control-Allow-Origin' not in other.headers
+
+def test_wildcard_origin(tmp_path):
+    response = _client(tmp_path, ['*']).get('/static/site.css', headers={'Origin': 'https://any.example.com'})
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
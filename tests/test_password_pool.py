@@ -0,0 +1,64 @@
+import pytest
+from flask import Flask
+
+from utils.auth import auth_utils
+from utils.auth.password_pool import (
+    MAX_PASSWORD_BYTES,
+    PasswordPool,
+    PasswordTooLong,
+    bcrypt_check,
+    bcrypt_cost,
+    bcrypt_hash
+)
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PasswordPool(max_workers=0)
+    monkeypatch.setattr(auth_utils, 'password_pool', pool)
+    return pool
+
+def test_hash_and_check_round_trip(pool):
+    hashed = pool.hash('correct horse', 4)
+    assert bcrypt_cost(hashed) == 4
+    assert pool.check(hashed, 'correct horse')
+    assert not pool.check(hashed, 'wrong horse')
+    assert not bcrypt_check('not-a-bcrypt-hash', 'correct horse')
+    assert pool.metrics()['completed'] == 3 and pool.metrics()['pending'] == 0
+
+def test_passwords_over_72_bytes_are_rejected_before_admission(pool):
+    hashed = bcrypt_hash('x' * MAX_PASSWORD_BYTES, 4)
+    assert pool.check(hashed, 'x' * MAX_PASSWORD_BYTES)
+    # 37 two-byte characters: under 72 characters but 74 bytes
+    for password in ('x' * (MAX_PASSWORD_BYTES + 1), 'é' * 37):
+        with pytest.raises(PasswordTooLong):
+            pool.hash(password, 4)
+        with pytest.raises(PasswordTooLong):
+            pool.check(hashed, password)
+    assert pool.metrics()['submitted'] == 1
+
+def test_login_upgrades_the_hash_when_the_cost_changes(pool, db):
+    app = Flask(__name__)
+    app.config['BCRYPT_LOG_ROUNDS'] = 5
+    db.business_users.insert_one({'payroll_id': 'DK-000001', 'password': bcrypt_hash('secret', 4)})
+    user = db.business_users.find_one({'payroll_id': 'DK-000001'})
+
+    with app.app_context():
+        assert auth_utils.rehash_password_on_login(db.business_users, user, 'secret')
+        upgraded = db.business_users.find_one({'payroll_id': 'DK-000001'})
+        assert bcrypt_cost(upgraded['password']) == 5
+        assert bcrypt_check(upgraded['password'], 'secret')
+        # Already at the configured cost: nothing to do
+        assert not auth_utils.rehash_password_on_login(db.business_users, upgraded, 'secret')
+    assert pool.metrics()['rehashed'] == 1
+
+def test_rehash_is_not_stored_over_a_concurrent_password_change(pool, db):
+    app = Flask(__name__)
+    app.config['BCRYPT_LOG_ROUNDS'] = 5
+    db.business_users.insert_one({'payroll_id': 'DK-000002', 'password': bcrypt_hash('old', 4)})
+    user = db.business_users.find_one({'payroll_id': 'DK-000002'})
+    changed = bcrypt_hash('new', 4)
+    db.business_users.update_one({'_id': user['_id']}, {'$set': {'password': changed}})
+
+    with app.app_context():
+        auth_utils.rehash_password_on_login(db.business_users, user, 'old')
+    assert db.business_users.find_one({'_id': user['_id']})['password'] == changed
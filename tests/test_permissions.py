@@ -0,0 +1,44 @@
+import pytest
+
+from utils.auth.permissions import MAX_MATRIX_VENUES, PermissionCheckError, permission_matrix
+
+ROLE_PERMISSIONS = [
+    {'permissionName': 'viewRota', 'global': True},
+    {'permissionName': 'editRota', 'global': False,
+     'venueOverrides': {'v1': {'value': True, 'requiresCoSign': True}}},
+    {'permissionName': 'runPayroll', 'global': True, 'requiresHrApproval': True}
+]
+
+def test_batch_mixes_allowed_and_denied_rows_per_venue():
+    overrides = {'runPayroll': {'value': False}}
+    matrix = permission_matrix(ROLE_PERMISSIONS, overrides,
+                               permission_names=['viewRota', 'editRota', 'runPayroll', 'deleteVenue'],
+                               venues=['v1', 'v2', 'v1'])
+
+    assert list(matrix) == ['v1', 'v2']
+    allowed = {venue: {name: row['allowed'] for name, row in rows.items()} for venue, rows in matrix.items()}
+    assert allowed == {
+        'v1': {'viewRota': True, 'editRota': True, 'runPayroll': False, 'deleteVenue': False},
+        'v2': {'viewRota': True, 'editRota': False, 'runPayroll': False, 'deleteVenue': False}
+    }
+    assert matrix['v1']['editRota']['effective']['requiresCoSign']
+    assert matrix['v2']['deleteVenue']['effective'] == {}
+
+def test_defaults_to_every_global_permission():
+    matrix = permission_matrix(ROLE_PERMISSIONS, None)
+    assert list(matrix) == ['global']
+    assert {name: row['allowed'] for name, row in matrix['global'].items()} == {
+        'viewRota': True, 'editRota': False, 'runPayroll': True
+    }
+
+@pytest.mark.parametrize('names, venues, error_code', [
+    ('viewRota', None, 'INVALID_PERMISSIONS'),
+    ([{'name': 'viewRota'}], None, 'INVALID_PERMISSIONS'),
+    (None, 'v1', 'INVALID_VENUES'),
+    (None, [['v1']], 'INVALID_VENUES'),
+    (None, [f'v{i}' for i in range(MAX_MATRIX_VENUES + 1)], 'TOO_MANY_VENUES')
+])
+def test_malformed_input_is_rejected(names, venues, error_code):
+    with pytest.raises(PermissionCheckError) as exc:
+        permission_matrix(ROLE_PERMISSIONS, {}, permission_names=names, venues=venues)
+    assert exc.value.error_code == error_code
@@ -0,0 +1,63 @@
+import pytest
+
+from utils.unit_utils import CostingTable, get_costing_table
+from utils.prep_list import MAX_PORTIONS, PrepListError, build_prep_list
+
+PRODUCTS = [
+    {'INGREDIENT': 'Flour', 'SUPPLIER': 'Bidfood', 'PU': '10kg', 'PUC': 12.5},
+    {'INGREDIENT': 'Milk', 'SUPPLIER': 'PFD', 'PU': '2L', 'PUC': 3, 'WASTAGE': 'n/a'},
+    {'INGREDIENT': 'Egg', 'SUPPLIER': 'PFD', 'PU': '30ea', 'PUC': 9, 'YIELD': 'inf'}
+]
+
+@pytest.fixture
+def recipes(db):
+    crepes = db.global_recipes.insert_one({'title': 'Crepes', 'portions': 10, 'ingredient_lines': [
+        {'ingredient': 'Flour', 'quantity': 500, 'unit': 'g'},
+        {'ingredient': 'Milk', 'quantity': 1, 'unit': 'L'},
+        {'ingredient': 'Egg', 'quantity': 4, 'unit': 'ea'}
+    ]}).inserted_id
+    db.global_recipes.insert_one({'title': 'Custard', 'portions': 4, 'ingredient_lines': [
+        {'ingredient': 'Milk', 'quantity': 500, 'unit': 'ml'},
+        {'ingredient': 'Egg', 'quantity': 'six', 'unit': 'ea'}
+    ]})
+    return crepes
+
+def _item(prep, supplier, ingredient):
+    return next(item for item in prep['suppliers'][supplier]['items'] if item['INGREDIENT'] == ingredient)
+
+def test_lines_are_scaled_summed_and_packed(db, recipes):
+    table = CostingTable(PRODUCTS)
+    prep = build_prep_list(db, [{'recipe_id': str(recipes), 'portions': 50},
+                                {'title': 'Custard', 'portions': 8}], table=table)
+
+    flour = _item(prep, 'Bidfood', 'Flour')
+    assert (flour['quantity'], flour['unit'], flour['packs'], flour['cost']) == (2500.0, 'g', 1, 12.5)
+    milk = _item(prep, 'PFD', 'Milk')
+    assert (milk['quantity'], milk['packs'], milk['recipes']) == (6000.0, 3, ['Crepes', 'Custard'])
+    # Unparseable YIELD/WASTAGE fall back to 1 and 0
+    assert _item(prep, 'PFD', 'Egg')['quantity'] == 20.0
+    assert prep['suppliers']['PFD']['total_cost'] == 18.0
+    assert prep['total_cost'] == 30.5
+    assert prep['unresolved'] == [{'recipe': 'Custard', 'ingredient': 'Egg', 'reason': 'invalid quantity'}]
+
+@pytest.mark.parametrize('portions', ['inf', 'nan', 1e308, MAX_PORTIONS + 1, 0, -3])
+def test_out_of_range_portions_are_reported_as_invalid(db, recipes, portions):
+    prep = build_prep_list(db, [{'title': 'Crepes', 'portions': 10}, {'title': 'Crepes', 'portions': portions}],
+                           table=CostingTable(PRODUCTS))
+    assert [entry['index'] for entry in prep['invalid']] == [1]
+    assert prep['recipes'][0]['portions'] == 10
+
+def test_malformed_request_raises(db):
+    with pytest.raises(PrepListError) as exc:
+        build_prep_list(db, [], table=CostingTable(PRODUCTS))
+    assert exc.value.error_code == 'INVALID_ITEMS'
+
+def test_costing_table_cache_is_keyed_by_database(db):
+    other = db.client['other_db']
+    db.product_list.insert_one(dict(PRODUCTS[0]))
+    other.product_list.insert_many([dict(product) for product in PRODUCTS])
+
+    first = get_costing_table(db, refresh=True)
+    assert first.names == ['Flour']
+    assert get_costing_table(other, refresh=True).names == ['Flour', 'Milk', 'Egg']
+    assert get_costing_table(db) is first
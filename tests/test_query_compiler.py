@@ -0,0 +1,35 @@
+from utils.query_compiler import (
+    ALLERGEN_SEARCH_FIELDS,
+    RECIPE_SEARCH_FIELDS,
+    backfill_search_keys,
+    compile_query,
+    search_key,
+    search_keys,
+)
+
+def test_prefix_compiles_to_case_sensitive_anchored_regex_on_search_key():
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, {'query': '  Crème (Brûlée) '})
+    assert compiled.filter == {'search_keys.title': {'$regex': r'^creme\ \(brulee\)'}}
+    assert compiled.collation is None
+
+def test_search_keys_normalize_scalar_and_array_fields():
+    keys = search_keys({'title': 'Crème  Brûlée', 'ingredients': ['Éggs', 'Double CREAM', None]},
+                       RECIPE_SEARCH_FIELDS)
+    assert keys == {'title': 'creme brulee', 'ingredients': ['eggs', 'double cream']}
+    assert search_key('STRASSE') == search_key('straße')
+
+def test_backfilled_documents_match_prefix_search(db):
+    db.recipes.insert_many([{'title': 'Crème brûlée'}, {'title': 'CREMINI risotto'}, {'title': 'Egg'}])
+    assert backfill_search_keys(db.recipes, RECIPE_SEARCH_FIELDS) == 3
+    assert backfill_search_keys(db.recipes, RECIPE_SEARCH_FIELDS) == 0
+
+    def titles(query):
+        return sorted(doc['title'] for doc in compile_query(RECIPE_SEARCH_FIELDS, {'query': query}).find(db.recipes))
+
+    assert titles('crem') == ['CREMINI risotto', 'Crème brûlée']
+    assert titles('CRÈME') == ['Crème brûlée']
+    assert titles('.*') == []
+
+def test_enum_filters_are_unchanged():
+    compiled = compile_query(ALLERGEN_SEARCH_FIELDS, {'severity': 'HIGH', 'reaction_type': 'unknown'})
+    assert compiled.filter == {'severity': 'high', 'reaction_type': {'$in': []}}
@@ -0,0 +1,72 @@
+import pytest
+
+from utils.rate_limiter import MemoryRateLimitBackend, MongoRateLimitBackend, RateLimiter
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr('utils.rate_limiter.time.time', clock)
+    return clock
+
+@pytest.fixture(params=['memory', 'mongo'])
+def limiter(request, db):
+    if request.param == 'memory':
+        backend = MemoryRateLimitBackend()
+    else:
+        backend = MongoRateLimitBackend(lambda: db.rate_limits)
+    return RateLimiter(max_attempts=3, window_seconds=100, block_seconds=50, backend=backend)
+
+def test_key_is_blocked_once_the_limit_is_reached(limiter, clock):
+    for _ in range(2):
+        limiter.record_attempt('DK-1')
+    assert not limiter.is_blocked('DK-1')
+    limiter.record_attempt('DK-1')
+    assert limiter.is_blocked('DK-1')
+
+    clock.now += 49
+    assert limiter.is_blocked('DK-1')
+    clock.now += 2
+    assert not limiter.is_blocked('DK-1')
+
+def test_failures_expire_with_the_sliding_window(limiter, clock):
+    limiter.record_attempt('DK-1')
+    limiter.record_attempt('DK-1')
+    assert limiter.attempts('DK-1') == 2
+
+    # Halfway through the next window the previous one counts for half
+    clock.now += 150
+    assert limiter.attempts('DK-1') == pytest.approx(1.0)
+    limiter.record_attempt('DK-1')
+    assert not limiter.is_blocked('DK-1')
+
+    # The first window no longer counts; the third failure now counts for half
+    clock.now += 100
+    assert limiter.attempts('DK-1') == pytest.approx(0.5)
+    clock.now += 100
+    assert limiter.attempts('DK-1') == 0
+
+def test_keys_are_isolated(limiter, clock):
+    for _ in range(3):
+        limiter.record_attempt('DK-1')
+    limiter.record_attempt('DK-10')
+    assert limiter.is_blocked('DK-1') and not limiter.is_blocked('DK-10')
+    assert limiter.attempts('DK-10') == 1
+
+    # Clearing a key leaves keys that share its prefix alone
+    limiter.clear_attempts('DK-1')
+    assert not limiter.is_blocked('DK-1') and limiter.attempts('DK-1') == 0
+    assert limiter.attempts('DK-10') == 1
+
+def test_success_clears_the_failures(limiter, clock):
+    limiter.record_attempt('DK-1')
+    limiter.record_attempt('DK-1')
+    limiter.record_attempt('DK-1', success=True)
+    limiter.record_attempt('DK-1')
+    assert limiter.attempts('DK-1') == 1 and not limiter.is_blocked('DK-1')
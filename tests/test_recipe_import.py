@@ -0,0 +1,74 @@
+import io
+import json
+
+import pytest
+
+from utils.ingredient_resolver import get_ingredient_resolver
+from utils.recipe_import import RecipeImporter, iter_records, parse_ingredient_line
+
+@pytest.fixture
+def import_db(db):
+    db.product_list.insert_many([
+        {'INGREDIENT': 'Plain Flour', 'SUPPLIER': 'Bidfood'},
+        {'INGREDIENT': 'Eggs', 'SUPPLIER': 'PFD'}
+    ])
+    db.cuisine.insert_one({'name': 'French'})
+    get_ingredient_resolver(db, refresh=True)
+    return db
+
+def _ndjson(*records):
+    return io.StringIO('\n'.join(r if isinstance(r, str) else json.dumps(r) for r in records))
+
+@pytest.mark.parametrize('line, expected', [
+    ('500g plain flour', {'name': 'plain flour', 'quantity': 500.0, 'unit': 'g'}),
+    ('1/2 cup milk', {'name': 'milk', 'quantity': 0.5, 'unit': 'cup'}),
+    ('2 eggs', {'name': 'eggs', 'quantity': 2.0, 'unit': 'ea'}),
+    ('salt', {'name': 'salt', 'quantity': None, 'unit': None}),
+    ({'ingredient': 'Butter', 'qty': '25', 'unit': 'g'}, {'name': 'Butter', 'quantity': 25.0, 'unit': 'g'})
+])
+def test_parse_ingredient_line(line, expected):
+    assert parse_ingredient_line(line) == expected
+
+def test_csv_cells_and_json_arrays_parse_to_records():
+    csv_rows = list(iter_records(io.StringIO('title,ingredients,portions\nCrepes,"[""2 eggs""]",4\n'), 'csv'))
+    assert csv_rows == [{'title': 'Crepes', 'ingredients': ['2 eggs'], 'portions': '4'}]
+    assert list(iter_records(io.StringIO('[{"title": "A"}, {"title": "B"}]'), 'json')) == [
+        {'title': 'A'}, {'title': 'B'}]
+
+def test_upserts_are_idempotent_and_resolve_ingredients(import_db):
+    records = [
+        {'source_id': 'r1', 'title': 'Crepes', 'cuisine': 'French', 'portions': 4,
+         'ingredients': ['250g plain flour', '2 eggs']},
+        {'title': 'Toast', 'ingredients': 'bread|butter'}
+    ]
+    first = RecipeImporter(import_db, workers=0).run(_ndjson(*records), 'ndjson')
+    assert (first.rows, first.inserted, first.updated, first.invalid) == (2, 2, 0, 0)
+
+    second = RecipeImporter(import_db, workers=0).run(_ndjson(*records), 'ndjson')
+    assert (second.inserted, second.updated) == (0, 2)
+    assert import_db.global_recipes.count_documents({}) == 2
+
+    crepes = import_db.global_recipes.find_one({'source_id': 'r1'})
+    assert crepes['cuisine'] == ['French']
+    assert [line['ingredient'] for line in crepes['ingredient_lines']] == ['Plain Flour', 'Eggs']
+    assert crepes['ingredients'] == ['Plain Flour', 'Eggs']
+
+def test_errors_are_mapped_to_input_rows(import_db):
+    report = RecipeImporter(import_db, batch_size=2, workers=0).run(_ndjson(
+        {'title': 'Crepes', 'ingredients': ['2 eggs']},
+        '{not json',
+        {'title': '', 'ingredients': ['2 eggs']},
+        {'title': 'Scones', 'portions': 'many', 'ingredients': ['flour']},
+        {'title': 'Pancakes', 'ingredients': ['3 zorks of flour']}
+    ), 'ndjson')
+
+    assert (report.rows, report.inserted, report.invalid) == (5, 2, 3)
+    assert [error['row'] for error in report.errors] == [2, 3, 4]
+    assert report.errors[0]['error'].startswith('line 2:')
+    assert report.errors[1]['error'] == 'Recipe title is required'
+
+def test_dry_run_writes_nothing(import_db):
+    report = RecipeImporter(import_db, workers=0, dry_run=True).run(
+        _ndjson({'title': 'Crepes', 'ingredients': ['2 eggs']}), 'ndjson')
+    assert report.rows == 1 and report.inserted == 0
+    assert import_db.global_recipes.count_documents({}) == 0
@@ -0,0 +1,80 @@
+import pytest
+
+from utils.auth.role_assignment import (
+    MAX_BULK_ASSIGNMENTS,
+    RoleAssignmentError,
+    assign_role,
+    assign_roles_bulk
+)
+
+ROLES = {('b1', 'manager'), ('b1', 'staff')}
+
+def _find_role(business_id, role_name):
+    return {'role_name': role_name} if (business_id, role_name) in ROLES else None
+
+@pytest.fixture
+def users(db):
+    db.business_users.insert_many([
+        {'payroll_id': 'p1', 'business_id': 'b1', 'role_name': 'staff'},
+        {'payroll_id': 'p2', 'business_id': 'b1', 'role_name': 'staff'},
+        {'payroll_id': 'p3', 'business_id': 'b1', 'role_name': 'staff'}
+    ])
+    return db.business_users
+
+def _statuses(results):
+    return [result['status'] for result in results]
+
+def test_single_and_bulk_assignments_write_the_same_fields(users):
+    assert assign_role(users, 'p1', 'b1', 'manager', {'payroll': {'value': True}})
+    assign_roles_bulk(users, [{'payroll_id': 'p2', 'role_name': 'manager',
+                               'overrides': {'payroll': {'value': True}}}], _find_role, 'b1')
+
+    single, bulk = (users.find_one({'payroll_id': p}, {'_id': 0, 'updated_at': 0}) for p in ('p1', 'p2'))
+    assert single == dict(bulk, payroll_id='p1')
+    assert not assign_role(users, 'missing', 'b1', 'manager')
+
+def test_invalid_rows_are_reported_without_blocking_the_rest(users):
+    counts, results = assign_roles_bulk(users, [
+        {'payroll_id': 'p1', 'role_name': 'manager'},
+        {'payroll_id': 'p2'},
+        {'payroll_id': 'p2', 'role_name': 'owner'},
+        {'payroll_id': 'p3', 'role_name': 'manager', 'business_id': 'b2'},
+        {'payroll_id': 'p3', 'role_name': 'manager', 'overrides': ['payroll']},
+        'not an object',
+        {'payroll_id': 'p1', 'role_name': 'staff'}
+    ], _find_role, 'b1')
+
+    assert _statuses(results) == ['assigned', 'invalid', 'invalid', 'invalid', 'invalid', 'invalid', 'duplicate']
+    assert results[2]['error'] == 'Unknown role: owner'
+    assert counts == {'assigned': 1, 'invalid': 5, 'duplicate': 1}
+    assert users.find_one({'payroll_id': 'p1'})['role_name'] == 'manager'
+    assert users.find_one({'payroll_id': 'p3'})['role_name'] == 'staff'
+
+def test_missing_users_are_not_found(users):
+    counts, results = assign_roles_bulk(users, [
+        {'payroll_id': 'p1', 'role_name': 'manager'},
+        {'payroll_id': 'ghost', 'role_name': 'manager'}
+    ], _find_role, 'b1')
+    assert _statuses(results) == ['assigned', 'not_found']
+    assert users.count_documents({'payroll_id': 'ghost'}) == 0
+
+def test_write_errors_fail_only_their_rows(db):
+    users = db.business_users
+    users.insert_many([{'payroll_id': p, 'business_id': 'b1'} for p in ('p1', 'p2', 'p3')])
+    # A single holder per role, so the second 'manager' write is rejected
+    users.create_index('role_name', unique=True, sparse=True)
+
+    counts, results = assign_roles_bulk(users, [
+        {'payroll_id': 'p1', 'role_name': 'manager'},
+        {'payroll_id': 'p2', 'role_name': 'manager'},
+        {'payroll_id': 'p3', 'role_name': 'staff'}
+    ], _find_role, 'b1')
+    assert _statuses(results) == ['assigned', 'failed', 'assigned']
+    assert counts == {'assigned': 2, 'failed': 1}
+    assert 'role_name' not in users.find_one({'payroll_id': 'p2'})
+    assert users.find_one({'payroll_id': 'p3'})['role_name'] == 'staff'
+
+@pytest.mark.parametrize('assignments', [None, [], {'payroll_id': 'p1'}, [{}] * (MAX_BULK_ASSIGNMENTS + 1)])
+def test_malformed_requests_raise(users, assignments):
+    with pytest.raises(RoleAssignmentError):
+        assign_roles_bulk(users, assignments, _find_role)
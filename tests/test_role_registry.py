@@ -0,0 +1,58 @@
+import threading
+import time
+
+from utils.auth.role_registry import RoleRegistry
+
+def test_polling_reloads_roles_written_without_update_role(db):
+    registry = RoleRegistry(poll_seconds=0, max_age=3600)
+    db.business_roles.insert_one({'role_name': 'staff'})
+    assert registry.names(db) == frozenset({'staff'})
+
+    db.business_roles.insert_one({'role_name': 'manager'})
+    assert registry.names(db) == frozenset({'staff'})
+    registry.max_age = 0
+    assert registry.names(db) == frozenset({'staff', 'manager'})
+
+def test_watch_retries_instead_of_exiting(db, monkeypatch):
+    registry = RoleRegistry(mode='change_stream', poll_seconds=0)
+    calls = {'watch': 0}
+    done = threading.Event()
+
+    class Roles:
+        def watch(self):
+            calls['watch'] += 1
+            if calls['watch'] >= 3:
+                done.set()
+            raise ConnectionError('mongo unreachable')
+
+    registry._get_db = lambda: {'business_roles': Roles()}
+    monkeypatch.setattr('utils.auth.role_registry.time.sleep', lambda seconds: None)
+    registry._ensure_watcher()
+    assert done.wait(2)
+    assert registry._watcher.is_alive()
+
+def test_dead_watcher_is_restarted(monkeypatch):
+    registry = RoleRegistry(mode='change_stream')
+    started = []
+    monkeypatch.setattr(registry, '_watch', lambda: started.append(time.monotonic()))
+    registry._ensure_watcher()
+    registry._watcher.join(1)
+    registry._ensure_watcher()
+    registry._watcher.join(1)
+    assert len(started) == 2
+
+def test_roles_with_the_same_name_stay_separate_per_business(db):
+    registry = RoleRegistry(poll_seconds=3600)
+    db.business_roles.insert_many([
+        {'business_id': 'b1', 'role_name': 'manager', 'permissions': [{'permissionName': 'payroll', 'global': True}]},
+        {'business_id': 'b2', 'role_name': 'manager', 'permissions': []},
+        {'role_name': 'staff', 'permissions': []}
+    ])
+
+    assert registry.get('b1', 'manager', db)['permissions'][0]['permissionName'] == 'payroll'
+    assert registry.get('b2', 'manager', db)['permissions'] == []
+    assert registry.get('b3', 'manager', db) is None
+    # Shared roles (no business_id) are visible to every business
+    assert registry.get('b3', 'staff', db)['role_name'] == 'staff'
+    assert registry.names(db, 'b2') == frozenset({'manager', 'staff'})
+    assert registry.names(db, 'b3') == frozenset({'staff'})
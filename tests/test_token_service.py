@@ -0,0 +1,45 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.auth.token_service import REFRESH_TOKEN, TokenError, TokenService
+
+def _service(db):
+    service = TokenService({'k1': 'test-signing-secret-0123456789abcdef'}, 'k1')
+    service._get_collection = lambda: db.token_revocations
+    # No background poller in tests
+    service._poller_pid = 0
+    service._ensure_poller = lambda: None
+    return service
+
+def test_refresh_token_can_only_be_claimed_once_across_workers(db):
+    worker_a, worker_b = _service(db), _service(db)
+    payload = worker_a.verify(worker_a.issue_refresh_token('P1'), expected_type=REFRESH_TOKEN)
+    worker_a.claim(payload)
+    with pytest.raises(TokenError) as error:
+        worker_b.claim(payload)
+    assert error.value.error_code == 'TOKEN_REVOKED'
+    assert worker_b.is_revoked(payload['jti'])
+
+def test_revoked_refresh_token_cannot_be_claimed(db):
+    service = _service(db)
+    payload = service.verify(service.issue_refresh_token('P1'), expected_type=REFRESH_TOKEN)
+    service.revoke(payload)
+    with pytest.raises(TokenError):
+        _service(db).claim(payload)
+
+def test_sync_keeps_revocations_until_expiry_on_non_utc_hosts(db, monkeypatch):
+    monkeypatch.setenv('TZ', 'Pacific/Auckland')
+    time.tzset()
+    try:
+        # pymongo hands back naive UTC datetimes
+        expires = datetime.utcnow() + timedelta(hours=2)
+        db.token_revocations.insert_one({'_id': 'jti-1', 'expires_at': expires, 'revoked_at': datetime.utcnow()})
+        service = _service(db)
+        assert service.sync_revocations() == 1
+        assert service.is_revoked('jti-1')
+        assert abs(service._revoked['jti-1'] - (time.time() + 7200)) < 5
+    finally:
+        monkeypatch.delenv('TZ')
+        time.tzset()
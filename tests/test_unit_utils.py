@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from utils.unit_utils import (
+    CostingTable,
+    UnitConversionError,
+    convert_quantity,
+    cost_lines_loop,
+    load_costing_table,
+    parse_unit,
+)
+
+PRODUCTS = [
+    {'INGREDIENT': 'Tomato', 'SUPPLIER': 'Harris Farm', 'PU': '5kg', 'PUC': 20.0, 'YIELD': 0.8},
+    {'INGREDIENT': 'Olive Oil', 'SUPPLIER': 'Bidfood', 'PU': '4L', 'PUC': 40.0, 'WASTAGE': 0.2},
+    {'INGREDIENT': 'Egg', 'SUPPLIER': 'PFD', 'PU': 'box', 'PUC': 9, 'RU': 'ea', 'RUC': 0.5},
+    {'INGREDIENT': 'Basil', 'SUPPLIER': 'PFD', 'PU': 'kg', 'PUC': 30.0, 'YIELD': 'n/a', 'WASTAGE': 'inf'}
+]
+
+def test_parse_and_convert_units():
+    assert parse_unit('5kg') == (0, 5000.0)
+    assert parse_unit('2 x tbsp') == (1, 40.0)
+    assert convert_quantity(1.5, 'kg', 'g') == 1500.0
+    with pytest.raises(UnitConversionError):
+        convert_quantity(1, 'kg', 'ml')
+
+def test_recipe_costing_applies_yield_wastage_and_unit_fallback():
+    table = CostingTable(PRODUCTS)
+    costed = table.cost_recipe([('tomato', 400, 'g'), ('Olive Oil', 80, 'ml'), ('Egg', 2, 'ea'),
+                                ('Egg', 100, 'g'), ('Saffron', 1, 'g')])
+    # 400g / 0.8 yield at 0.004/g; 80ml / 0.8 at 0.01/ml; 2 ea at RUC 0.5
+    assert costed['lines'] == [2.0, 1.0, 1.0, None, None]
+    assert costed['total'] == 4.0
+    assert costed['unresolved'] == ['Egg', 'Saffron']
+
+def test_malformed_yield_and_wastage_are_flagged_not_fatal():
+    table = CostingTable(PRODUCTS)
+    assert table.flagged == ['Basil']
+    assert table.cost_recipe([('Basil', 100, 'g')])['lines'] == [3.0]
+
+def test_menu_costing_matches_the_reference_loop(db):
+    db.product_list.insert_many([dict(p) for p in PRODUCTS])
+    table = load_costing_table(db)
+    lines = [('Tomato', 250, 'g'), ('Olive Oil', 1, 'tbsp'), ('Basil', 10, 'g'), ('Egg', 3, 'ea')]
+    menu = table.cost_menu({'Bruschetta': lines[:3], 'Omelette': lines[3:]})
+    expected = cost_lines_loop({p['INGREDIENT'].lower(): p for p in PRODUCTS}, lines)
+    assert menu['Bruschetta']['lines'] == [round(c, 4) for c in expected[:3]]
+    assert math.isclose(menu['Omelette']['total'], expected[3])
@@ -5,184 +5,274 @@
 Utility modules for Le Repertoire application.
 Provides centralized access to all utility functions and classes.
 """
-# ---------------------------------------#
-#     Allergen Management Utilities      #
-# ---------------------------------------#
-from .allergen_utils import (
-    lookup_allergen,
-    get_allergen_by_id,
-    create_allergen,
-    update_allergen,
-    delete_allergen,
-    search_allergens,
-    validate_allergen_data,
-    AllergenError
-)
-# ---------------------------------------#
-#      Recipe and Search Utilities       #
-# ---------------------------------------#    
-from .recipe_utils import (
-    lookup_ingredient,
-    lookup_tag,
-    lookup_cuisine,
-    lookup_method,
-    lookup_dietary,
-    lookup_mealtype,
-    lookup_recipeIngredient,
-    lookup_globalRecipe,
-    lookup_allergen
-)
-# ---------------------------------------#
-#      Time Management Utilities         #
-# ---------------------------------------#    
-from .time_utils import (
-    timeago,
-    generate_timestamp,
-    format_datetime,
-    parse_datetime
-)
-# ---------------------------------------#
-#       Note Management Utilities        #
-# ---------------------------------------#    
-from .notes_utils import (
-    create_user_note,
-    get_user_notes,
-    get_user_note_by_id,
-    update_user_note,
-    delete_user_note
-)
-# ---------------------------------------#
-#     Business Management Utilities      #
-# ---------------------------------------#    
-from .business_utils import (
-    lookup_business,
-    lookup_venue,
-    lookup_work_area,
-    create_business,
-    add_venue_to_business,
-    add_work_area_to_venue,
-    assign_user_to_business,
-    assign_user_to_work_area,
-    get_business_hierarchy,
-    update_business_status,
-    validate_business_structure
-)
-# ---------------------------------------#
-#       Google Integration Utilities     #
-# ---------------------------------------#    
-from .google_utils import (
-    validate_google_token,
-    get_google_service,
-    KeepService  # Import the KeepService class
-)
-# ---------------------------------------#
-#           Security Utilities           #
-# ---------------------------------------#    
-from .security_utils import (
-    generate_random_string,
-    generate_secure_token,
-    generate_id_with_prefix,
-    hash_string,
-    constant_time_compare,
-    generate_session_id,
-    sanitize_input,
-    log_security_event
-)
-# ---------------------------------------#
-#          Validation Utilities          #
-# ---------------------------------------#    
-from .validation_utils import (
-    validate_request_data,
-    validate_id_format,
-    validate_uuid,
-    validate_email,
-    validate_date_format,
-    validate_phone_number,
-    validate_required_fields,
-    validate_field_length,
-    validate_numeric_range,
-    validate_business_data,
-    validate_venue_data,
-    validate_work_area_data
-)
-# ---------------------------------------#
-#           Database Utilities           #
-# ---------------------------------------#    
-from .db_utils import (
-    safe_object_id,
-    format_mongo_doc,
-    create_mongo_query,
-    handle_mongo_error,
-    sanitize_mongo_query,
-    build_aggregation_pipeline,
-    update_timestamp_fields,
-    get_collection_stats,
-    ensure_indexes,
-    bulk_write_operations,
-    get_distinct_values,
-    execute_transaction
-)
-# ---------------------------------------#
-#            Error Handling Utilities    #
-# ---------------------------------------#    
-from .error_utils import (
-    AppError,
-    ValidationError,
-    AuthenticationError,
-    PermissionError,
-    NotFoundError,
-    DatabaseError,
-    handle_error,
-    log_error,
-    format_error_response,
-    validate_or_raise,
-    assert_found,
-    assert_valid,
-    assert_permitted,
-    get_error_context
-)
-# ---------------------------------------#
-#            Logging Utilities           #
-# ---------------------------------------#    
-from .logging_utils import (
-    CustomJSONFormatter,
-    setup_logging,
-    log_event,
-    log_api_request,
-    log_security_event,
-    cleanup_logs,
-    get_log_stats
-)
-# ---------------------------------------#
-#        Request Processing Utilities    #
-# ---------------------------------------#    
-from .request_utils import (
-    get_request_data,
-    validate_request_data,
-    format_response,
-    paginate_results,
-    parse_query_params,
-    validate_content_type,
-    rate_limit,
-    log_request_info,
-    get_client_ip,
-    get_pagination_params,
-    get_sort_params,
-    get_filter_params,
-    validate_request_size
-)
-# ---------------------------------------#
-#      Session Management Utilities      #
-# ---------------------------------------#    
-from .session_utils import SessionManager
-# ---------------------------------------#
-#              Rate Limiting             #
-# ---------------------------------------#
-from .rate_limiter import RateLimiter
-# ---------------------------------------#
-#             Audit Logging              #
-# ---------------------------------------#
-from .audit_logger import AuditLogger
+from .lazy_loading import lazy_loading_enabled, lazy_exports
+
+if lazy_loading_enabled():
+    # Submodules are imported on first access to one of their names
+    __getattr__, __dir__ = lazy_exports(__name__, __file__)
+else:
+    # ---------------------------------------#
+    #     Allergen Management Utilities      #
+    # ---------------------------------------#
+    from .allergen_utils import (
+        lookup_allergen,
+        get_allergen_by_id,
+        create_allergen,
+        update_allergen,
+        delete_allergen,
+        search_allergens,
+        validate_allergen_data,
+        create_allergens,
+        update_allergens,
+        delete_allergens,
+        AllergenError
+    )
+    # ---------------------------------------#
+    #      Recipe and Search Utilities       #
+    # ---------------------------------------#
+    from .recipe_utils import (
+        lookup_ingredient,
+        lookup_tag,
+        lookup_cuisine,
+        lookup_method,
+        lookup_dietary,
+        lookup_mealtype,
+        lookup_recipeIngredient,
+        lookup_globalRecipe,
+        lookup_allergen
+    )
+    # ---------------------------------------#
+    #      Unit Conversion and Costing       #
+    # ---------------------------------------#
+    from .unit_utils import (
+        parse_unit,
+        convert_quantity,
+        CostingTable,
+        load_costing_table,
+        get_costing_table,
+        UnitConversionError
+    )
+    # ---------------------------------------#
+    #        Ingredient -> Recipe Index      #
+    # ---------------------------------------#
+    from .ingredient_index import (
+        IngredientIndex,
+        ingredient_index
+    )
+    from .allergen_impact import (
+        AllergenImpactService,
+        allergen_impact
+    )
+    # ---------------------------------------#
+    #            Batch Prep Lists            #
+    # ---------------------------------------#
+    from .prep_list import (
+        build_prep_list,
+        PrepListError
+    )
+    # ---------------------------------------#
+    #         Ingredient Resolution          #
+    # ---------------------------------------#
+    from .ingredient_resolver import (
+        IngredientResolver,
+        get_ingredient_resolver,
+        normalize_name
+    )
+    # ---------------------------------------#
+    #         Search Query Compiler          #
+    # ---------------------------------------#
+    from .query_compiler import (
+        FieldSpec,
+        CompiledQuery,
+        compile_query,
+        RECIPE_SEARCH_FIELDS,
+        ALLERGEN_SEARCH_FIELDS,
+        PRODUCT_SEARCH_FIELDS,
+        QueryCompileError
+    )
+    # ---------------------------------------#
+    #           Index Management             #
+    # ---------------------------------------#
+    from .index_registry import (
+        IndexSpec,
+        declared_indexes,
+        apply_indexes,
+        verify_indexes,
+        find_collscans
+    )
+    # ---------------------------------------#
+    #           Federated Search             #
+    # ---------------------------------------#
+    from .federated_search import (
+        federated_recipe_search,
+        SearchCursorError
+    )
+    # ---------------------------------------#
+    #             HTTP Caching               #
+    # ---------------------------------------#
+    from .http_cache import (
+        CachePolicy,
+        cached,
+        response_cache
+    )
+    # ---------------------------------------#
+    #      Time Management Utilities         #
+    # ---------------------------------------#
+    from .time_utils import (
+        timeago,
+        generate_timestamp,
+        format_datetime,
+        parse_datetime
+    )
+    # ---------------------------------------#
+    #       Note Management Utilities        #
+    # ---------------------------------------#
+    from .notes_utils import (
+        create_user_note,
+        get_user_notes,
+        get_user_note_by_id,
+        update_user_note,
+        delete_user_note
+    )
+    # ---------------------------------------#
+    #     Business Management Utilities      #
+    # ---------------------------------------#
+    from .business_utils import (
+        lookup_business,
+        lookup_venue,
+        lookup_work_area,
+        create_business,
+        add_venue_to_business,
+        add_work_area_to_venue,
+        assign_user_to_business,
+        assign_user_to_work_area,
+        get_business_hierarchy,
+        update_business_status,
+        validate_business_structure
+    )
+    from .business_hierarchy import (
+        BusinessSnapshot,
+        HierarchyCache,
+        hierarchy_cache
+    )
+    # ---------------------------------------#
+    #       Google Integration Utilities     #
+    # ---------------------------------------#
+    from .google_utils import (
+        validate_google_token,
+        get_google_service,
+        KeepService  # Import the KeepService class
+    )
+    # ---------------------------------------#
+    #           Security Utilities           #
+    # ---------------------------------------#
+    from .security_utils import (
+        generate_random_string,
+        generate_secure_token,
+        generate_id_with_prefix,
+        hash_string,
+        constant_time_compare,
+        generate_session_id,
+        sanitize_input,
+        log_security_event
+    )
+    # ---------------------------------------#
+    #          Validation Utilities          #
+    # ---------------------------------------#
+    from .validation_utils import (
+        validate_request_data,
+        validate_id_format,
+        validate_uuid,
+        validate_email,
+        validate_date_format,
+        validate_phone_number,
+        validate_required_fields,
+        validate_field_length,
+        validate_numeric_range,
+        validate_business_data,
+        validate_venue_data,
+        validate_work_area_data
+    )
+    # ---------------------------------------#
+    #           Database Utilities           #
+    # ---------------------------------------#
+    from .db_utils import (
+        safe_object_id,
+        format_mongo_doc,
+        create_mongo_query,
+        handle_mongo_error,
+        sanitize_mongo_query,
+        build_aggregation_pipeline,
+        update_timestamp_fields,
+        get_collection_stats,
+        ensure_indexes,
+        bulk_write_operations,
+        get_distinct_values,
+        execute_transaction
+    )
+    # ---------------------------------------#
+    #            Error Handling Utilities    #
+    # ---------------------------------------#
+    from .error_utils import (
+        AppError,
+        ValidationError,
+        AuthenticationError,
+        PermissionError,
+        NotFoundError,
+        DatabaseError,
+        handle_error,
+        log_error,
+        format_error_response,
+        validate_or_raise,
+        assert_found,
+        assert_valid,
+        assert_permitted,
+        get_error_context
+    )
+    # ---------------------------------------#
+    #            Logging Utilities           #
+    # ---------------------------------------#
+    from .logging_utils import (
+        CustomJSONFormatter,
+        setup_logging,
+        log_event,
+        log_api_request,
+        log_security_event,
+        cleanup_logs,
+        get_log_stats
+    )
+    # ---------------------------------------#
+    #        Request Processing Utilities    #
+    # ---------------------------------------#
+    from .request_utils import (
+        get_request_data,
+        validate_request_data,
+        format_response,
+        paginate_results,
+        parse_query_params,
+        validate_content_type,
+        rate_limit,
+        log_request_info,
+        get_client_ip,
+        get_pagination_params,
+        get_sort_params,
+        get_filter_params,
+        validate_request_size
+    )
+    # ---------------------------------------#
+    #      Session Management Utilities      #
+    # ---------------------------------------#
+    from .session_utils import SessionManager
+    # ---------------------------------------#
+    #              Rate Limiting             #
+    # ---------------------------------------#
+    from .rate_limiter import RateLimiter
+    # ---------------------------------------#
+    #             Audit Logging              #
+    # ---------------------------------------#
+    from .audit_logger import AuditLogger
+    from .audit_pipeline import AuditPipeline, audit_pipeline
+
 
 __all__ = [
     # ---------------------------------------#
@@ -190,7 +280,8 @@ __all__ = [
     # ---------------------------------------#
     'lookup_allergen', 'get_allergen_by_id', 'create_allergen',
     'update_allergen', 'delete_allergen', 'search_allergens',
-    'validate_allergen_data', 'AllergenError',
+    'validate_allergen_data', 'create_allergens', 'update_allergens',
+    'delete_allergens', 'AllergenError',
     
     # ---------------------------------------#
     #            Recipe Utils                #
@@ -199,6 +290,49 @@ __all__ = [
     'lookup_dietary', 'lookup_mealtype', 'lookup_recipeIngredient',
     'lookup_globalRecipe', 'lookup_allergen',
     
+    # ---------------------------------------#
+    #              Unit Utils                #
+    # ---------------------------------------#
+    'parse_unit', 'convert_quantity', 'CostingTable', 'load_costing_table', 'get_costing_table',
+    'UnitConversionError',
+    
+    # ---------------------------------------#
+    #            Batch Prep Lists            #
+    # ---------------------------------------#
+    'build_prep_list', 'PrepListError',
+    
+    # ---------------------------------------#
+    #        Ingredient -> Recipe Index      #
+    # ---------------------------------------#
+    'IngredientIndex', 'ingredient_index', 'AllergenImpactService', 'allergen_impact',
+    
+    # ---------------------------------------#
+    #          Ingredient Resolver           #
+    # ---------------------------------------#
+    'IngredientResolver', 'get_ingredient_resolver', 'normalize_name',
+    
+    # ---------------------------------------#
+    #          Query Compiler                #
+    # ---------------------------------------#
+    'FieldSpec', 'CompiledQuery', 'compile_query', 'RECIPE_SEARCH_FIELDS',
+    'ALLERGEN_SEARCH_FIELDS', 'PRODUCT_SEARCH_FIELDS', 'QueryCompileError',
+    
+    # ---------------------------------------#
+    #            Index Registry              #
+    # ---------------------------------------#
+    'IndexSpec', 'declared_indexes', 'apply_indexes', 'verify_indexes',
+    'find_collscans',
+    
+    # ---------------------------------------#
+    #           Federated Search             #
+    # ---------------------------------------#
+    'federated_recipe_search', 'SearchCursorError',
+
+    # ---------------------------------------#
+    #             HTTP Caching               #
+    # ---------------------------------------#
+    'CachePolicy', 'cached', 'response_cache',
+    
     # ---------------------------------------#
     #              Time Utils                #
     # ---------------------------------------#
@@ -216,7 +350,7 @@ __all__ = [
     'lookup_business', 'lookup_venue', 'lookup_work_area', 'create_business',
     'add_venue_to_business', 'add_work_area_to_venue', 'assign_user_to_business',
     'assign_user_to_work_area', 'get_business_hierarchy', 'update_business_status',
-    'validate_business_structure',
+    'validate_business_structure', 'BusinessSnapshot', 'HierarchyCache', 'hierarchy_cache',
     
     # ---------------------------------------#
     #             Google Utils               #
@@ -281,5 +415,5 @@ __all__ = [
     # ---------------------------------------#
     #             Audit Logger               #
     # ---------------------------------------#
-    'AuditLogger'
+    'AuditLogger', 'AuditPipeline', 'audit_pipeline'
 ]
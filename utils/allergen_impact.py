@@ -0,0 +1,230 @@
+#-------------------------------------------------------------------------------#
+#                          utils/allergen_impact.py                             #
+#-------------------------------------------------------------------------------#
+"""
+Allergen impact service.
+
+create_allergen/update_allergen/delete_allergen report every write here.
+For each write the service looks up the affected recipes in the ingredient
+-> recipe index (utils/ingredient_index.py; token match, so 'peanut' also
+hits 'roasted peanuts') and publishes a delta:
+
+    {allergen_id, op, ingredient, previous_ingredient, changes,
+     added, removed, affected, count, created_at}
+
+  - added:    recipes that now carry the allergen (create, or renamed to them)
+  - removed:  recipes that no longer carry it (delete, or renamed away)
+  - affected: recipes whose allergen details changed (severity, reaction, ...)
+
+Deltas are appended to COLLECTION_ALLERGEN_IMPACT (an outbox with a TTL) so
+downstream caches and menus can poll with changes(after=<last seq>), and are
+passed to in-process subscribers registered with subscribe().
+
+Every delta gets a 'seq' from a counter document ($inc in COLLECTION_COUNTERS),
+so the order does not depend on client-side ObjectIds from several workers.
+A sequence number is reserved before its delta is inserted, so a poll can see
+seq N+1 before N lands; changes() stops at such a gap until it is older than
+GAP_TIMEOUT_SECONDS (a writer that died after reserving).
+
+Usage:
+    allergen_impact.subscribe(lambda delta: menu_cache.drop(delta['added'] + delta['affected']))
+    allergen_impact.impact(db, 'peanut')        # current exposure, no write
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import logging
+import time
+
+from pymongo import ReturnDocument
+
+from .ingredient_index import ingredient_index
+
+logger = logging.getLogger(__name__)
+
+TRACKED_FIELDS = ('ingredient', 'severity', 'reaction_type', 'symptoms', 'notes')
+GAP_TIMEOUT_SECONDS = 30
+
+class AllergenImpactService:
+    """
+    Args:
+        collection_name: Outbox collection for published deltas
+        sources: Recipe collections whose postings are checked
+        counter_collection: Collection holding the outbox sequence counter
+    """
+
+    def __init__(self, collection_name: str = 'allergen_impact_events',
+                 sources: tuple = ('global_recipes', 'user_recipes'),
+                 counter_collection: str = 'counters'):
+        self.collection_name = collection_name
+        self.sources = sources
+        self.counter_collection = counter_collection
+        self._subscribers: List[Callable[[Dict], None]] = []
+
+    def init_app(self, app) -> None:
+        config = app.config
+        self.collection_name = config.get('COLLECTION_ALLERGEN_IMPACT', self.collection_name)
+        self.counter_collection = config.get('COLLECTION_COUNTERS', self.counter_collection)
+        self.sources = (config.get('COLLECTION_GLOBAL_RECIPES', self.sources[0]),
+                        config.get('COLLECTION_USER_RECIPES', self.sources[1]))
+        app.extensions['allergen_impact'] = self
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> None:
+        """Call callback(delta) after every published delta."""
+        self._subscribers.append(callback)
+
+    #-------------------------------------------------------------------------------#
+    #                                  Queries                                      #
+    #-------------------------------------------------------------------------------#
+    def _recipe_ids(self, db, ingredient: Optional[str]) -> Set[str]:
+        if not ingredient:
+            return set()
+        ids: Set[str] = set()
+        for source in self.sources:
+            ids.update(f"{source}:{recipe_id}" for recipe_id in
+                       ingredient_index.recipe_ids(db, ingredient, source, mode='tokens'))
+        return ids
+
+    def impact(self, db, ingredient: str, limit: Optional[int] = 50) -> Dict:
+        """Recipes currently exposed to an allergen ingredient, per source."""
+        started = time.perf_counter()
+        result = {source: ingredient_index.lookup(db, ingredient, source, mode='tokens', limit=limit)
+                  for source in self.sources}
+        return {
+            'ingredient': ingredient,
+            'count': sum(r['count'] for r in result.values()),
+            'sources': result,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def changes(self, db, after=None, limit: int = 100) -> List[Dict]:
+        """
+        Published deltas with a seq after `after`, in seq order.
+
+        Stops before a missing sequence number that is younger than
+        GAP_TIMEOUT_SECONDS, so a delta still being inserted by another worker
+        is never skipped; poll again with the last returned seq.
+        """
+        query = {}
+        expected = None
+        if after not in (None, ''):
+            try:
+                expected = int(after) + 1
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid delta seq: {after}")
+            query['seq'] = {'$gte': expected}
+        cutoff = datetime.utcnow() - timedelta(seconds=GAP_TIMEOUT_SECONDS)
+        deltas = []
+        for delta in db[self.collection_name].find(query).sort('seq', 1).limit(limit):
+            if expected is not None and delta['seq'] != expected and delta['created_at'] > cutoff:
+                break
+            expected = delta['seq'] + 1
+            delta['_id'] = str(delta['_id'])
+            deltas.append(delta)
+        return deltas
+
+    def _reserve(self, db, count: int) -> int:
+        """Reserve `count` consecutive sequence numbers; returns the first."""
+        counter = db[self.counter_collection].find_one_and_update(
+            {'_id': self.collection_name},
+            {'$inc': {'seq': count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter['seq'] - count + 1
+
+    #-------------------------------------------------------------------------------#
+    #                                  Writes                                       #
+    #-------------------------------------------------------------------------------#
+    def _delta(self, op: str, before: Optional[Dict], after: Optional[Dict],
+               recipe_ids: Callable[[Optional[str]], Set[str]]) -> Optional[Dict]:
+        before = before or {}
+        after = after or {}
+        changes = {field: [before.get(field), after.get(field)] for field in TRACKED_FIELDS
+                   if before.get(field) != after.get(field)}
+        if not changes:
+            return None
+
+        started = time.perf_counter()
+        old_ids = recipe_ids(before.get('ingredient'))
+        new_ids = recipe_ids(after.get('ingredient'))
+        delta = {
+            'allergen_id': str(after.get('_id') or before.get('_id')),
+            'op': op,
+            'ingredient': after.get('ingredient') or before.get('ingredient'),
+            'previous_ingredient': before.get('ingredient') if 'ingredient' in changes and op == 'update' else None,
+            'changes': changes,
+            'added': sorted(new_ids - old_ids),
+            'removed': sorted(old_ids - new_ids),
+            'affected': sorted(old_ids & new_ids),
+            'created_at': datetime.utcnow()
+        }
+        delta['count'] = len(delta['added']) + len(delta['removed']) + len(delta['affected'])
+        delta['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return delta
+
+    def record_changes(self, db, changes: Iterable[Tuple[str, Optional[Dict], Optional[Dict]]]) -> List[Dict]:
+        """
+        Compute and publish the deltas for a batch of allergen writes.
+
+        Args:
+            db: MongoDB database instance
+            changes: (op, before, after) per write; op is 'create', 'update'
+                or 'delete', before is None for creates and after None for deletes
+
+        Returns:
+            The published deltas (writes that changed no tracked field are skipped)
+        """
+        # Each ingredient is looked up once per batch
+        cache: Dict[Optional[str], Set[str]] = {}
+
+        def recipe_ids(ingredient: Optional[str]) -> Set[str]:
+            if ingredient not in cache:
+                cache[ingredient] = self._recipe_ids(db, ingredient)
+            return cache[ingredient]
+
+        deltas = [delta for delta in (self._delta(op, before, after, recipe_ids)
+                                      for op, before, after in changes) if delta is not None]
+        if not deltas:
+            return []
+
+        first = self._reserve(db, len(deltas))
+        reserved_at = datetime.utcnow()
+        for offset, delta in enumerate(deltas):
+            delta['seq'] = first + offset
+            delta['created_at'] = reserved_at
+        db[self.collection_name].insert_many(deltas, ordered=False)
+        for delta in deltas:
+            delta['_id'] = str(delta['_id'])
+            for callback in self._subscribers:
+                try:
+                    callback(delta)
+                except Exception as e:
+                    logger.error(f"Allergen impact subscriber failed: {str(e)}")
+        logger.info(f"Published {len(deltas)} allergen impact deltas affecting "
+                    f"{sum(d['count'] for d in deltas)} recipes")
+        return deltas
+
+    def record_change(self, db, op: str, before: Optional[Dict], after: Optional[Dict]) -> Optional[Dict]:
+        """
+        Compute and publish the delta for one allergen write.
+
+        Returns:
+            The published delta, or None when nothing tracked changed
+        """
+        deltas = self.record_changes(db, [(op, before, after)])
+        return deltas[0] if deltas else None
+
+    def safe_record_changes(self, db, changes: Iterable[Tuple[str, Optional[Dict], Optional[Dict]]]) -> List[Dict]:
+        """record_changes for write paths: a failure is logged, never raised."""
+        try:
+            return self.record_changes(db, changes)
+        except Exception as e:
+            logger.error(f"Failed to publish allergen impact: {str(e)}")
+            return []
+
+    def safe_record_change(self, db, op: str, before: Optional[Dict], after: Optional[Dict]) -> Optional[Dict]:
+        deltas = self.safe_record_changes(db, [(op, before, after)])
+        return deltas[0] if deltas else None
+
+# Process-wide service registered in app.create_app
+allergen_impact = AllergenImpactService()
@@ -1,13 +1,48 @@
 #-------------------------------------------------------------------------------#
 #                          utils/allergens_utils.py                             #
 #-------------------------------------------------------------------------------#
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 import logging
+import re
 from datetime import datetime
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .allergen_impact import allergen_impact
+from .http_cache import ALLERGENS_NAMESPACE, response_cache
+from .query_compiler import (
+    compile_query,
+    search_key,
+    search_key_path,
+    search_keys,
+    ALLERGEN_SEARCH_FIELDS,
+    ALLERGEN_SEVERITIES,
+    ALLERGEN_REACTION_TYPES,
+    SEARCH_KEYS_FIELD
+)
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_FIELDS = ('ingredient', 'severity', 'reaction_type')
+VALID_SEVERITIES = frozenset(ALLERGEN_SEVERITIES)
+VALID_REACTION_TYPES = frozenset(ALLERGEN_REACTION_TYPES)
+_SEVERITY_ERROR = f"Invalid severity level. Must be one of: {', '.join(ALLERGEN_SEVERITIES)}"
+_REACTION_ERROR = f"Invalid reaction type. Must be one of: {', '.join(ALLERGEN_REACTION_TYPES)}"
+MAX_ALLERGEN_BATCH = 5000
+
+def _after_write(db, changes: List[Tuple]) -> None:
+    """Publish the impact of allergen writes and drop cached allergen responses."""
+    if changes:
+        allergen_impact.safe_record_changes(db, changes)
+        response_cache.invalidate(ALLERGENS_NAMESPACE)
+
+def _search_key_updates(fields: Dict) -> Dict:
+    """'$set' entries refreshing the search keys of the prefix fields being changed."""
+    return {search_key_path(spec): search_key(fields[spec.field])
+            for spec in ALLERGEN_SEARCH_FIELDS if spec.kind == 'prefix' and spec.field in fields}
+
 class AllergenError(Exception):
     """Custom exception for allergen-related errors"""
     def __init__(self, message: str, error_code: str = 'ALLERGEN_ERROR'):
@@ -31,7 +66,7 @@ def lookup_allergen(db, ingredient_name: str) -> Optional[List[Dict]]:
         #-------------------------------------------------------------------------------#
         #              Partial match on ingredient field in allergens collection        #
         #-------------------------------------------------------------------------------#
-        query = {'ingredient': {'$regex': f'{ingredient_name}', '$options': 'i'}}
+        query = {'ingredient': {'$regex': re.escape(ingredient_name), '$options': 'i'}}
         allergens = db.allergens.find(query)
         
         #-------------------------------------------------------------------------------#
@@ -93,9 +128,12 @@ def create_allergen(db, allergen_data: Dict) -> Dict:
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         })
+        allergen_data[SEARCH_KEYS_FIELD] = search_keys(allergen_data, ALLERGEN_SEARCH_FIELDS)
 
-        result = db.allergens.insert_one(allergen_data)
-        return db.allergens.find_one({'_id': result.inserted_id})
+        # insert_one sets _id on allergen_data, which is what was stored
+        db.allergens.insert_one(allergen_data)
+        _after_write(db, [('create', None, allergen_data)])
+        return allergen_data
     except Exception as e:
         logger.error(f"Error creating allergen: {str(e)}")
         raise AllergenError(f"Failed to create allergen: {str(e)}")
@@ -118,11 +156,17 @@ def update_allergen(db, allergen_id: Union[str, ObjectId], update_data: Dict) ->
 
         update_data['updated_at'] = datetime.utcnow()
         
-        result = db.allergens.find_one_and_update(
+        # The previous version is needed to compute the impact delta
+        previous = db.allergens.find_one_and_update(
             {'_id': allergen_id},
-            {'$set': update_data},
-            return_document=True
+            {'$set': dict(update_data, **_search_key_updates(update_data))},
+            return_document=False
         )
+        if previous is None:
+            return None
+        result = dict(previous, **update_data)
+        result[SEARCH_KEYS_FIELD] = search_keys(result, ALLERGEN_SEARCH_FIELDS)
+        _after_write(db, [('update', previous, result)])
         return result
     except Exception as e:
         logger.error(f"Error updating allergen: {str(e)}")
@@ -143,8 +187,11 @@ def delete_allergen(db, allergen_id: Union[str, ObjectId]) -> bool:
         if isinstance(allergen_id, str):
             allergen_id = ObjectId(allergen_id)
 
-        result = db.allergens.delete_one({'_id': allergen_id})
-        return result.deleted_count > 0
+        deleted = db.allergens.find_one_and_delete({'_id': allergen_id})
+        if deleted is None:
+            return False
+        _after_write(db, [('delete', deleted, None)])
+        return True
     except Exception as e:
         logger.error(f"Error deleting allergen: {str(e)}")
         raise AllergenError(f"Failed to delete allergen: {str(e)}")
@@ -160,7 +207,7 @@ def search_allergens(
     
     Args:
         db: MongoDB database instance
-        query: Search query for ingredient name
+        query: Ingredient name prefix
         severity: Filter by severity level
         reaction_type: Filter by reaction type
         
@@ -168,26 +215,23 @@ def search_allergens(
         List of matching allergen documents
     """
     try:
-        search_query = {}
-        
-        if query:
-            search_query['ingredient'] = {'$regex': query, '$options': 'i'}
-        if severity:
-            search_query['severity'] = severity
-        if reaction_type:
-            search_query['reaction_type'] = reaction_type
-
-        return list(db.allergens.find(search_query))
+        compiled = compile_query(ALLERGEN_SEARCH_FIELDS, {
+            'query': query,
+            'severity': severity,
+            'reaction_type': reaction_type
+        })
+        return list(compiled.find(db.allergens))
     except Exception as e:
         logger.error(f"Error searching allergens: {str(e)}")
         raise AllergenError(f"Failed to search allergens: {str(e)}")
 
-def validate_allergen_data(allergen_data: Dict) -> tuple[bool, Optional[str]]:
+def validate_allergen_data(allergen_data: Dict, partial: bool = False) -> tuple[bool, Optional[str]]:
     """
     Validate allergen data
     
     Args:
         allergen_data: Allergen data to validate
+        partial: Only validate the fields present (updates)
         
     Returns:
         tuple of (is_valid, error_message)
@@ -196,26 +240,178 @@ def validate_allergen_data(allergen_data: Dict) -> tuple[bool, Optional[str]]:
         #--------------------------------------------------#
         #                  Required fields                 #
         #--------------------------------------------------#
-        required_fields = ['ingredient', 'severity', 'reaction_type']
-        missing_fields = [f for f in required_fields if f not in allergen_data]
-        if missing_fields:
-            return False, f"Missing required fields: {', '.join(missing_fields)}"
+        if not partial:
+            missing_fields = [f for f in REQUIRED_FIELDS if f not in allergen_data]
+            if missing_fields:
+                return False, f"Missing required fields: {', '.join(missing_fields)}"
 
         #--------------------------------------------------#
         #              Validate severity levels            #
         #--------------------------------------------------#
-        valid_severities = ['low', 'medium', 'high', 'severe']
-        if allergen_data['severity'] not in valid_severities:
-            return False, f"Invalid severity level. Must be one of: {', '.join(valid_severities)}"
+        if 'severity' in allergen_data and allergen_data['severity'] not in VALID_SEVERITIES:
+            return False, _SEVERITY_ERROR
 
         #--------------------------------------------------#
         #           Validate reaction types                #
         #--------------------------------------------------#
-        valid_reactions = ['digestive', 'skin', 'respiratory', 'anaphylactic']
-        if allergen_data['reaction_type'] not in valid_reactions:
-            return False, f"Invalid reaction type. Must be one of: {', '.join(valid_reactions)}"
+        if 'reaction_type' in allergen_data and allergen_data['reaction_type'] not in VALID_REACTION_TYPES:
+            return False, _REACTION_ERROR
 
         return True, None
     except Exception as e:
         logger.error(f"Error validating allergen data: {str(e)}")
         return False, f"Validation error: {str(e)}"
+
+#-------------------------------------------------------------------------------#
+#                               Batch operations                                #
+#-------------------------------------------------------------------------------#
+def _batch_result(results: List[Dict]) -> Dict:
+    summary: Dict[str, int] = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return {'summary': summary, 'results': results}
+
+def _check_batch_size(items) -> None:
+    if not isinstance(items, (list, tuple)):
+        raise AllergenError("Batch must be a list", 'INVALID_BATCH')
+    if len(items) > MAX_ALLERGEN_BATCH:
+        raise AllergenError(f"At most {MAX_ALLERGEN_BATCH} allergens per batch", 'BATCH_TOO_LARGE')
+
+def _parse_object_id(value) -> Optional[ObjectId]:
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+def _bulk_write(db, operations: List, positions: List[int], results: List[Dict]) -> None:
+    """Unordered bulk write; write errors are mapped back onto their batch rows."""
+    if not operations:
+        return
+    try:
+        db.allergens.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get('writeErrors', []):
+            result = results[positions[error['index']]]
+            result['status'] = 'failed'
+            result['error'] = error.get('errmsg', 'Write failed')
+
+def create_allergens(db, items: List[Dict]) -> Dict:
+    """
+    Validate and insert a batch of allergens with one unordered bulk write.
+
+    Ids are assigned client-side, so nothing is read back.
+
+    Args:
+        db: MongoDB database instance
+        items: Allergen documents
+
+    Returns:
+        Dict with 'summary' counts and per-item 'results'
+        ({'index', 'status': created|invalid|failed, 'id' | 'error'})
+    """
+    _check_batch_size(items)
+    now = datetime.utcnow()
+    results: List[Dict] = []
+    operations, positions, created = [], [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'status': 'invalid', 'error': 'Allergen must be an object'})
+            continue
+        is_valid, error = validate_allergen_data(item)
+        if not is_valid:
+            results.append({'index': index, 'status': 'invalid', 'error': error})
+            continue
+        document = dict(item, _id=ObjectId(), created_at=now, updated_at=now)
+        document[SEARCH_KEYS_FIELD] = search_keys(document, ALLERGEN_SEARCH_FIELDS)
+        positions.append(len(results))
+        results.append({'index': index, 'status': 'created', 'id': str(document['_id'])})
+        operations.append(InsertOne(document))
+        created.append(document)
+
+    _bulk_write(db, operations, positions, results)
+    _after_write(db, [
+        ('create', None, document) for document, position in zip(created, positions)
+        if results[position]['status'] == 'created'
+    ])
+    return _batch_result(results)
+
+def update_allergens(db, updates: List[Dict]) -> Dict:
+    """
+    Validate and apply a batch of partial updates with one unordered bulk write.
+
+    Args:
+        db: MongoDB database instance
+        updates: Items of {'_id' or 'id': ..., <fields to set>}
+
+    Returns:
+        Dict with 'summary' counts and per-item 'results'
+        (status: updated|invalid|not_found|failed)
+    """
+    _check_batch_size(updates)
+    now = datetime.utcnow()
+    results: List[Dict] = []
+    pending: List[Tuple[int, ObjectId, Dict]] = []
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'status': 'invalid', 'error': 'Update must be an object'})
+            continue
+        allergen_id = _parse_object_id(item.get('_id', item.get('id')))
+        if allergen_id is None:
+            results.append({'index': index, 'status': 'invalid', 'error': 'Invalid or missing allergen id'})
+            continue
+        fields = {k: v for k, v in item.items() if k not in ('_id', 'id', 'created_at')}
+        is_valid, error = validate_allergen_data(fields, partial=True)
+        if not is_valid or not fields:
+            results.append({'index': index, 'status': 'invalid', 'error': error or 'No fields to update'})
+            continue
+        fields['updated_at'] = now
+        pending.append((len(results), allergen_id, fields))
+        results.append({'index': index, 'status': 'updated', 'id': str(allergen_id)})
+
+    # One read of the current versions serves both not_found detection and the impact delta
+    previous = {doc['_id']: doc for doc in db.allergens.find(
+        {'_id': {'$in': [allergen_id for _, allergen_id, _ in pending]}})} if pending else {}
+    operations, positions, changes = [], [], []
+    for position, allergen_id, fields in pending:
+        if allergen_id not in previous:
+            results[position].update(status='not_found')
+            continue
+        positions.append(position)
+        operations.append(UpdateOne({'_id': allergen_id}, {'$set': dict(fields, **_search_key_updates(fields))}))
+        changes.append(('update', previous[allergen_id], dict(previous[allergen_id], **fields)))
+
+    _bulk_write(db, operations, positions, results)
+    _after_write(db, [
+        change for change, position in zip(changes, positions) if results[position]['status'] == 'updated'
+    ])
+    return _batch_result(results)
+
+def delete_allergens(db, allergen_ids: Iterable[Union[str, ObjectId]]) -> Dict:
+    """
+    Delete a batch of allergens with one delete_many.
+
+    Returns:
+        Dict with 'summary' counts and per-item 'results'
+        (status: deleted|invalid|not_found)
+    """
+    allergen_ids = list(allergen_ids)
+    _check_batch_size(allergen_ids)
+    results: List[Dict] = []
+    wanted: Dict[ObjectId, int] = {}
+    for index, value in enumerate(allergen_ids):
+        allergen_id = _parse_object_id(value)
+        if allergen_id is None:
+            results.append({'index': index, 'status': 'invalid', 'error': 'Invalid allergen id'})
+            continue
+        wanted.setdefault(allergen_id, len(results))
+        results.append({'index': index, 'status': 'not_found', 'id': str(allergen_id)})
+
+    if wanted:
+        existing = list(db.allergens.find({'_id': {'$in': list(wanted)}}))
+        db.allergens.delete_many({'_id': {'$in': [doc['_id'] for doc in existing]}})
+        for doc in existing:
+            results[wanted[doc['_id']]]['status'] = 'deleted'
+        _after_write(db, [('delete', doc, None) for doc in existing])
+    return _batch_result(results)
@@ -0,0 +1,311 @@
+#-------------------------------------------------------------------------------#
+#                          utils/audit_pipeline.py                              #
+#-------------------------------------------------------------------------------#
+"""
+Off-request audit log pipeline.
+
+Request handlers enqueue audit events in memory and return immediately; a
+background worker drains the queue and writes events to Mongo in batches
+with insert_many. The queue is bounded: when it is full (Mongo slow or down
+during a login storm) events go straight to a local spool file rather than
+blocking the request. The spool is replayed on the next successful flush and
+the queue is flushed on shutdown.
+
+Every worker process shares the spool file, so appends and the hand-off to
+replay are serialized across processes with an fcntl lock on
+'<spool>.lock', and each process replays from its own '<spool>.replay.<pid>'.
+
+Usage:
+    audit_pipeline.init_app(app)
+    audit_pipeline.log_event('user_login', payroll_id, business_id, 'Successful login',
+                             ip_address=request.remote_addr)
+"""
+from typing import Callable, Dict, List, Optional
+from contextlib import contextmanager
+from datetime import datetime
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+
+from bson import json_util
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX development hosts
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class AuditPipeline:
+    """
+    Bounded in-memory queue with a batching background writer.
+
+    Args:
+        max_queue_size: Events held in memory before spilling to the spool file
+        batch_size: Maximum events written per insert_many
+        flush_interval: Seconds the worker waits to fill a batch
+        spool_path: JSON-lines file used when Mongo is unavailable or the queue is full
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        spool_path: str = 'logs/audit_spool.jsonl'
+    ):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self._get_collection: Optional[Callable] = None
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._atexit_registered = False
+        self.stats = {'enqueued': 0, 'written': 0, 'spooled': 0, 'replayed': 0, 'failed_batches': 0}
+
+    def init_app(self, app) -> None:
+        """Bind the pipeline to the application's audit collection."""
+        config = app.config
+        self.max_queue_size = int(config.get('AUDIT_QUEUE_SIZE', self.max_queue_size))
+        self.batch_size = int(config.get('AUDIT_BATCH_SIZE', self.batch_size))
+        self.flush_interval = float(config.get('AUDIT_FLUSH_INTERVAL', self.flush_interval))
+        self.spool_path = config.get('AUDIT_SPOOL_PATH', self.spool_path)
+        db_name = config.get('MONGO_DBNAME')
+        collection_name = config.get('COLLECTION_AUDIT_LOGS', 'audit_logs')
+        self._get_collection = lambda: app.config['MONGO_CLIENT'][db_name][collection_name]
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+        app.extensions['audit_pipeline'] = self
+        logger.info("Audit pipeline initialized")
+
+    #-------------------------------------------------------------------------------#
+    #                                Producer side                                  #
+    #-------------------------------------------------------------------------------#
+    def _ensure_worker(self) -> None:
+        """Start the worker lazily, and again in each forked worker process."""
+        if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._pid != os.getpid() or self._queue is None:
+                # Keep the queue of a worker thread that died in this process
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name='audit-pipeline', daemon=True)
+            self._worker.start()
+
+    def enqueue(self, event: Dict) -> bool:
+        """
+        Queue an event without blocking.
+
+        Returns:
+            True if queued, False if the queue was full and the event was spooled
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(event)
+            self.stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            logger.warning("Audit queue full, spooling event to disk")
+            self._spool([event])
+            return False
+
+    def log_event(
+        self,
+        event_type: str,
+        user_id: str,
+        business_id: str,
+        details: str,
+        ip_address: Optional[str] = None,
+        **extra
+    ) -> bool:
+        """Drop-in, non-blocking replacement for AuditLogger.log_event."""
+        event = {
+            'event_type': event_type,
+            'user_id': user_id,
+            'business_id': business_id,
+            'details': details,
+            'ip_address': ip_address,
+            'timestamp': datetime.utcnow()
+        }
+        event.update(extra)
+        return self.enqueue(event)
+
+    #-------------------------------------------------------------------------------#
+    #                                Consumer side                                  #
+    #-------------------------------------------------------------------------------#
+    def _drain(self, block: bool) -> List[Dict]:
+        batch: List[Dict] = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch: List[Dict]) -> bool:
+        if not batch:
+            return True
+        if self._get_collection is None:
+            self._spool(batch)
+            return False
+        try:
+            self._get_collection().insert_many(batch, ordered=False)
+            self.stats['written'] += len(batch)
+            return True
+        except Exception as e:
+            self.stats['failed_batches'] += 1
+            logger.error(f"Audit batch write failed, spooling {len(batch)} events: {str(e)}")
+            self._spool(batch)
+            return False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                batch = self._drain(block=True)
+                if batch and self._write(batch):
+                    self.replay_spool()
+            except Exception as e:
+                logger.error(f"Audit pipeline iteration failed: {str(e)}")
+                self._stop.wait(self.flush_interval)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Audit pipeline final flush failed: {str(e)}")
+
+    def flush(self) -> None:
+        """Write everything currently queued."""
+        if self._queue is None:
+            return
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self._write(batch)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the worker and flush remaining events (registered with atexit)."""
+        if self._worker is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._worker.join(timeout)
+        self.flush()
+
+    #-------------------------------------------------------------------------------#
+    #                                    Spool                                      #
+    #-------------------------------------------------------------------------------#
+    @contextmanager
+    def _locked_spool(self):
+        """Hold the spool lock for this thread and, through fcntl, for other processes."""
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(self.spool_path) or '.', exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(f'{self.spool_path}.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _spool(self, events: List[Dict]) -> None:
+        try:
+            with self._locked_spool():
+                with open(self.spool_path, 'a', encoding='utf-8') as spool:
+                    for event in events:
+                        event.pop('_id', None)
+                        spool.write(json_util.dumps(event) + '\n')
+            self.stats['spooled'] += len(events)
+        except OSError as e:
+            logger.critical(f"Failed to spool {len(events)} audit events: {str(e)}")
+
+    def replay_spool(self) -> int:
+        """
+        Move spooled events into Mongo once it is reachable again.
+
+        Returns:
+            Number of events replayed
+        """
+        if self._get_collection is None:
+            return 0
+        replay_path = f'{self.spool_path}.replay.{os.getpid()}'
+        if not os.path.exists(replay_path):
+            if not os.path.exists(self.spool_path) and not self._orphaned_replays():
+                return 0
+            with self._locked_spool():
+                # Files left by workers that died mid-replay are adopted as well
+                for orphan in self._orphaned_replays():
+                    self._append_file(orphan, replay_path)
+                if os.path.exists(self.spool_path):
+                    if os.path.exists(replay_path):
+                        self._append_file(self.spool_path, replay_path)
+                    else:
+                        os.replace(self.spool_path, replay_path)
+            if not os.path.exists(replay_path):
+                return 0
+
+        # Failed batches go back to the shared spool, so the file is done either way
+        replayed = 0
+        with open(replay_path, 'r', encoding='utf-8') as spool:
+            batch: List[Dict] = []
+            for line in spool:
+                if line.strip():
+                    batch.append(json_util.loads(line))
+                if len(batch) >= self.batch_size:
+                    replayed += len(batch) if self._write(batch) else 0
+                    batch = []
+            if batch:
+                replayed += len(batch) if self._write(batch) else 0
+        os.remove(replay_path)
+        self.stats['replayed'] += replayed
+        if replayed:
+            logger.info(f"Replayed {replayed} spooled audit events")
+        return replayed
+
+    def _orphaned_replays(self) -> List[str]:
+        orphans = []
+        for path in glob.glob(f'{glob.escape(self.spool_path)}.replay.*'):
+            try:
+                pid = int(path.rsplit('.', 1)[1])
+            except ValueError:
+                continue
+            if pid != os.getpid() and not _pid_alive(pid):
+                orphans.append(path)
+        return orphans
+
+    @staticmethod
+    def _append_file(source: str, target: str) -> None:
+        with open(source, 'r', encoding='utf-8') as src, open(target, 'a', encoding='utf-8') as dst:
+            for line in src:
+                dst.write(line)
+        os.remove(source)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# Process-wide pipeline used by the route handlers
+audit_pipeline = AuditPipeline()
@@ -1,6 +1,6 @@
 import re
 from flask import current_app
-from extensions import bcrypt  # Direct import from root-level extensions.py
+from utils.auth.password_pool import password_pool, bcrypt_cost
 
 def validate_payroll_id(payroll_id: str) -> bool:
     """
@@ -25,18 +25,24 @@ def validate_payroll_id(payroll_id: str) -> bool:
 def hash_password(plain_text_password: str) -> str:
     """
     Hash a plaintext password using bcrypt.
+    The work runs in the bounded password pool, off the request thread.
     
     Returns:
         A string containing the hashed password.
+
+    Raises:
+        PasswordTooLong: If the password is longer than bcrypt's 72 bytes.
+        PasswordPoolBusy: If the pool is at capacity.
     """
-    return bcrypt.generate_password_hash(
+    return password_pool.hash(
         plain_text_password,
-        rounds=current_app.config["BCRYPT_LOG_ROUNDS"]
-    ).decode("utf-8")
+        current_app.config["BCRYPT_LOG_ROUNDS"]
+    )
 
 def check_password(hashed_password: str, plain_text_password: str) -> bool:
     """
     Verify a plaintext password against the stored hash.
+    The work runs in the bounded password pool, off the request thread.
     
     Args:
         hashed_password: The hashed password from the database.
@@ -44,5 +50,40 @@ def check_password(hashed_password: str, plain_text_password: str) -> bool:
     
     Returns:
         True if the password matches, False otherwise.
+
+    Raises:
+        PasswordTooLong: If the password is longer than bcrypt's 72 bytes.
+        PasswordPoolBusy: If the pool is at capacity.
+    """
+    return password_pool.check(hashed_password, plain_text_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash was created with a different cost than
+    the configured BCRYPT_LOG_ROUNDS.
+    """
+    return bcrypt_cost(hashed_password) != current_app.config["BCRYPT_LOG_ROUNDS"]
+
+def rehash_password_on_login(users_collection, user: dict, plain_text_password: str) -> bool:
     """
-    return bcrypt.check_password_hash(hashed_password, plain_text_password)
+    Transparently upgrade a user's hash after a successful login when the
+    configured cost changed. The new hash is computed in the background and
+    only written if the stored hash is still the one that was verified.
+
+    Returns:
+        True if a rehash was scheduled, False otherwise.
+    """
+    if not password_needs_rehash(user['password']):
+        return False
+
+    def store(new_hash: str) -> None:
+        users_collection.update_one(
+            {"_id": user["_id"], "password": user["password"]},
+            {"$set": {"password": new_hash}}
+        )
+
+    return password_pool.rehash_async(
+        plain_text_password,
+        current_app.config["BCRYPT_LOG_ROUNDS"],
+        store
+    ) is not None
@@ -0,0 +1,218 @@
+#-------------------------------------------------------------------------------#
+#                        utils/auth/password_pool.py                            #
+#-------------------------------------------------------------------------------#
+"""
+Bounded process pool for bcrypt hashing and verification.
+
+bcrypt is deliberately CPU-bound. Running it in the request thread during a
+shift-change login storm starves the workers serving search traffic, so the
+work is handed to a small dedicated process pool instead. Admission control
+caps the number of in-flight operations: once the cap is reached new logins
+are rejected with PasswordPoolBusy (HTTP 503) rather than queueing without
+bound.
+
+The pool is created lazily and re-created after fork, so pre-fork servers get
+one pool per worker process. Pool processes are started from a forkserver
+(spawn where unavailable) rather than forked from the threaded web worker,
+whose locks may be held by other threads at fork time.
+
+bcrypt only accepts passwords of up to 72 bytes; longer ones are rejected with
+PasswordTooLong (HTTP 400) before they are admitted to the pool.
+"""
+from typing import Dict, Optional
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import bcrypt as _bcrypt
+
+logger = logging.getLogger(__name__)
+
+MAX_PASSWORD_BYTES = 72
+
+class PasswordTooLong(Exception):
+    """Raised for passwords bcrypt cannot process; the request should fail with 400."""
+    def __init__(self, message: str = f"Password must be at most {MAX_PASSWORD_BYTES} bytes",
+                 error_code: str = 'PASSWORD_TOO_LONG'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+class PasswordPoolBusy(Exception):
+    """Raised when the pool is at capacity and the request should be retried later."""
+    def __init__(self, message: str = "Password service busy", retry_after: int = 1):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+#-------------------------------------------------------------------------------#
+#                  Worker functions (executed in the pool)                      #
+#-------------------------------------------------------------------------------#
+def _to_bytes(value) -> bytes:
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+def bcrypt_hash(plain_text_password: str, rounds: int) -> str:
+    return _bcrypt.hashpw(_to_bytes(plain_text_password), _bcrypt.gensalt(rounds)).decode('utf-8')
+
+def bcrypt_check(hashed_password: str, plain_text_password: str) -> bool:
+    try:
+        return _bcrypt.checkpw(_to_bytes(plain_text_password), _to_bytes(hashed_password))
+    except ValueError:
+        # Malformed or non-bcrypt hash
+        return False
+
+def bcrypt_cost(hashed_password: str) -> Optional[int]:
+    """Return the cost factor encoded in a bcrypt hash ('$2b$12$...' -> 12)."""
+    try:
+        return int(str(hashed_password).split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+#-------------------------------------------------------------------------------#
+#                                    Pool                                       #
+#-------------------------------------------------------------------------------#
+def _pool_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Import this module once in the server instead of in every pool process
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+class PasswordPool:
+    """
+    Args:
+        max_workers: Processes in the pool; 0 runs bcrypt inline
+        max_pending: In-flight operations admitted before rejecting
+        timeout: Seconds to wait for a result before giving up
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 64, timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {'submitted': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0, 'rehashed': 0,
+                       'total_seconds': 0.0, 'peak_pending': 0}
+
+    def init_app(self, app) -> None:
+        config = app.config
+        self.max_workers = int(config.get('PASSWORD_POOL_WORKERS', self.max_workers))
+        self.max_pending = int(config.get('PASSWORD_POOL_MAX_PENDING', self.max_pending))
+        self.timeout = float(config.get('PASSWORD_POOL_TIMEOUT', self.timeout))
+        app.extensions['password_pool'] = self
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 0:
+            return None
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         mp_context=_pool_context())
+                    self._pid = os.getpid()
+                    self._pending = 0
+        return self._executor
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats['rejected'] += 1
+                raise PasswordPoolBusy()
+            self._pending += 1
+            self._stats['submitted'] += 1
+            self._stats['peak_pending'] = max(self._stats['peak_pending'], self._pending)
+
+    def _release(self, started: float) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._stats['completed'] += 1
+            self._stats['total_seconds'] += time.perf_counter() - started
+
+    def submit(self, fn, *args) -> Future:
+        """Admit and submit work; the slot is released when the future completes."""
+        executor = self._get_executor()
+        self._admit()
+        started = time.perf_counter()
+        if executor is None:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            try:
+                future = executor.submit(fn, *args)
+            except Exception:
+                self._release(started)
+                raise
+        future.add_done_callback(lambda _: self._release(started))
+        return future
+
+    def _result(self, future: Future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PasswordPoolBusy("Password service timed out")
+
+    @staticmethod
+    def validate(plain_text_password: str) -> None:
+        """Raise PasswordTooLong if bcrypt would reject the password."""
+        if len(_to_bytes(plain_text_password)) > MAX_PASSWORD_BYTES:
+            raise PasswordTooLong()
+
+    def check(self, hashed_password: str, plain_text_password: str) -> bool:
+        self.validate(plain_text_password)
+        return self._result(self.submit(bcrypt_check, hashed_password, plain_text_password))
+
+    def hash(self, plain_text_password: str, rounds: int) -> str:
+        self.validate(plain_text_password)
+        return self._result(self.submit(bcrypt_hash, plain_text_password, rounds))
+
+    def rehash_async(self, plain_text_password: str, rounds: int, on_hashed) -> Optional[Future]:
+        """
+        Re-hash with a new cost in the background and hand the result to
+        on_hashed(new_hash). Skipped silently when the pool is saturated.
+        """
+        try:
+            future = self.submit(bcrypt_hash, plain_text_password, rounds)
+        except PasswordPoolBusy:
+            logger.info("Password pool busy, deferring rehash to a later login")
+            return None
+
+        def _store(done: Future) -> None:
+            try:
+                on_hashed(done.result())
+                with self._lock:
+                    self._stats['rehashed'] += 1
+            except Exception as e:
+                logger.error(f"Password rehash failed: {str(e)}")
+
+        future.add_done_callback(_store)
+        return future
+
+    def metrics(self) -> Dict:
+        """Queue depth and throughput counters for monitoring."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+        stats['max_pending'] = self.max_pending
+        stats['workers'] = self.max_workers
+        stats['avg_seconds'] = stats['total_seconds'] / stats['completed'] if stats['completed'] else 0.0
+        return stats
+
+    def shutdown(self) -> None:
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Process-wide pool used by utils.auth.auth_utils
+password_pool = PasswordPool()
@@ -0,0 +1,110 @@
+#-------------------------------------------------------------------------------#
+#                         utils/auth/permissions.py                             #
+#-------------------------------------------------------------------------------#
+"""
+Effective permission resolution.
+
+A user's permissions are the role's permission objects, adjusted by the
+role's venue overrides for the venue in question and finally by the user's
+own overrides. permission_matrix evaluates that for many permissions across
+many venues with the user and role already loaded, as /permissions/check/batch
+does.
+"""
+from typing import Dict, List, Optional
+
+MAX_MATRIX_VENUES = 200
+
+class PermissionCheckError(Exception):
+    """Custom exception for malformed permission check requests"""
+    def __init__(self, message: str, error_code: str = 'PERMISSION_CHECK_ERROR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+def get_effective_permissions(role_permissions, user_overrides, venue_id=None):
+    """
+    Merges the base role permissions with user-specific overrides and venue-specific overrides.
+    Each permission object should have:
+        - "permissionName" (the name of the permission)
+        - "global" (True/False)
+        - Optional flags: "requiresHrApproval", "requiresSecondaryApproval", "requiresCoSign", "requestPermission"
+        - Optional "venueOverrides": a dict mapping venue IDs to overrides.
+    If user_overrides is provided (a dict where keys are permissionName), then those values override the role.
+    """
+    effective = {}
+
+    for perm in role_permissions:
+        name = perm.get("permissionName")
+        # Start with the base global value and flags
+        effective[name] = {
+            "value": perm.get("global", False),
+            "requiresHrApproval": perm.get("requiresHrApproval", False),
+            "requiresSecondaryApproval": perm.get("requiresSecondaryApproval", False),
+            "requiresCoSign": perm.get("requiresCoSign", False),
+            "requestPermission": perm.get("requestPermission", False),
+        }
+        # If venue_id is specified and an override exists, apply it.
+        venue_overrides = perm.get("venueOverrides", {})
+        if venue_id and venue_overrides and isinstance(venue_overrides, dict):
+            if venue_id in venue_overrides:
+                v_override = venue_overrides[venue_id]
+                effective[name]["value"] = v_override.get("value", effective[name]["value"])
+                effective[name]["requiresHrApproval"] = v_override.get("requiresHrApproval", effective[name]["requiresHrApproval"])
+                effective[name]["requiresSecondaryApproval"] = v_override.get("requiresSecondaryApproval", effective[name]["requiresSecondaryApproval"])
+                effective[name]["requiresCoSign"] = v_override.get("requiresCoSign", effective[name]["requiresCoSign"])
+                effective[name]["requestPermission"] = v_override.get("requestPermission", effective[name]["requestPermission"])
+    
+    # Apply user overrides, which have final priority.
+    if user_overrides and isinstance(user_overrides, dict):
+        for perm_name, override in user_overrides.items():
+            if perm_name in effective:
+                effective[perm_name]["value"] = override.get("value", effective[perm_name]["value"])
+                effective[perm_name]["requiresHrApproval"] = override.get("requiresHrApproval", effective[perm_name]["requiresHrApproval"])
+                effective[perm_name]["requiresSecondaryApproval"] = override.get("requiresSecondaryApproval", effective[perm_name]["requiresSecondaryApproval"])
+                effective[perm_name]["requiresCoSign"] = override.get("requiresCoSign", effective[perm_name]["requiresCoSign"])
+                effective[perm_name]["requestPermission"] = override.get("requestPermission", effective[perm_name]["requestPermission"])
+            else:
+                effective[perm_name] = override
+
+    return effective
+
+def permission_matrix(role_permissions: List[Dict], user_overrides: Optional[Dict],
+                      permission_names: Optional[List[str]] = None,
+                      venues: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Evaluate permissions for every requested venue.
+
+    Args:
+        role_permissions: The role's permission objects
+        user_overrides: The user's overrides keyed by permissionName
+        permission_names: Permissions to report (defaults to every effective permission)
+        venues: Venue ids (defaults to the global permissions only)
+
+    Returns:
+        venue_id ("global" when no venue applies) -> permission name ->
+        {"allowed", "effective"}; unknown permissions are reported as denied
+
+    Raises:
+        PermissionCheckError: If permission_names or venues is not a list of strings
+    """
+    if permission_names is not None and (
+            not isinstance(permission_names, list) or not all(isinstance(n, str) for n in permission_names)):
+        raise PermissionCheckError("'permissions' must be a list of permission names", 'INVALID_PERMISSIONS')
+    venues = venues or [None]
+    if not isinstance(venues, list) or not all(v is None or isinstance(v, str) for v in venues):
+        raise PermissionCheckError("'venues' must be a list of venue ids", 'INVALID_VENUES')
+    if len(venues) > MAX_MATRIX_VENUES:
+        raise PermissionCheckError(f"At most {MAX_MATRIX_VENUES} venues per request", 'TOO_MANY_VENUES')
+
+    matrix = {}
+    for venue_id in dict.fromkeys(venues):
+        effective = get_effective_permissions(role_permissions, user_overrides, venue_id=venue_id)
+        names = permission_names if permission_names is not None else list(effective)
+        matrix[venue_id or "global"] = {
+            name: {
+                "allowed": effective.get(name, {}).get("value", False),
+                "effective": effective.get(name, {})
+            }
+            for name in names
+        }
+    return matrix
@@ -0,0 +1,129 @@
+#-------------------------------------------------------------------------------#
+#                        utils/auth/role_assignment.py                          #
+#-------------------------------------------------------------------------------#
+"""
+Role assignment writes for business_users.
+
+/permissions/assign and /permissions/assign/bulk both build their update with
+role_assignment_update, so a single assignment and a bulk row leave the user
+document in the same shape. The bulk path validates every row locally, tells
+missing users apart with one read and sends the writes as one unordered
+bulk_write; each input row gets a status of "assigned", "invalid",
+"not_found", "duplicate" or "failed".
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+MAX_BULK_ASSIGNMENTS = 1000
+
+class RoleAssignmentError(Exception):
+    """Custom exception for malformed assignment requests"""
+    def __init__(self, message: str, error_code: str = 'ROLE_ASSIGNMENT_ERROR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+def role_assignment_update(role_name: str, overrides: Optional[Dict] = None,
+                           now: Optional[datetime] = None) -> Dict:
+    """The update document that assigns role_name (and its overrides) to a user."""
+    return {'$set': {
+        'role_name': role_name,
+        'overrides': overrides or {},
+        'updated_at': now or datetime.utcnow()
+    }}
+
+def assign_role(users, payroll_id: str, business_id: str, role_name: str,
+                overrides: Optional[Dict] = None) -> bool:
+    """
+    Assign a role to one user.
+
+    Returns:
+        False when the user is not assigned to the business
+    """
+    result = users.update_one({'payroll_id': payroll_id, 'business_id': business_id},
+                              role_assignment_update(role_name, overrides))
+    return result.matched_count > 0
+
+def assign_roles_bulk(users, assignments: List, find_role: Callable,
+                      default_business_id: Optional[str] = None) -> Tuple[Dict[str, int], List[Dict]]:
+    """
+    Assign roles to many users in one round trip.
+
+    Args:
+        users: business_users collection
+        assignments: [{'payroll_id', 'role_name', 'business_id'?, 'overrides'?}, ...]
+        find_role: (business_id, role_name) -> role document or None
+        default_business_id: business_id for rows that do not carry one
+
+    Returns:
+        (status counts, one result per input row in order)
+
+    Raises:
+        RoleAssignmentError: If assignments is not a non-empty list within the limit
+    """
+    if not isinstance(assignments, list) or not assignments:
+        raise RoleAssignmentError("'assignments' must be a non-empty list", 'INVALID_ASSIGNMENTS')
+    if len(assignments) > MAX_BULK_ASSIGNMENTS:
+        raise RoleAssignmentError(f"At most {MAX_BULK_ASSIGNMENTS} assignments per request",
+                                  'TOO_MANY_ASSIGNMENTS')
+
+    # Validate rows locally before touching the database
+    results: List[Dict] = []
+    pending: Dict[Tuple[str, str], Tuple[int, str, Dict]] = {}
+    for row in assignments:
+        row = row if isinstance(row, dict) else {}
+        payroll_id = row.get('payroll_id')
+        business_id = row.get('business_id') or default_business_id
+        role_name = row.get('role_name')
+        overrides = row.get('overrides', {})
+        result = {'payroll_id': payroll_id, 'business_id': business_id, 'role_name': role_name}
+        results.append(result)
+
+        if not (payroll_id and business_id and role_name):
+            result.update(status='invalid', error='Missing required fields')
+        elif find_role(business_id, role_name) is None:
+            result.update(status='invalid', error=f"Unknown role: {role_name}")
+        elif not isinstance(overrides, dict):
+            result.update(status='invalid', error="'overrides' must be an object")
+        elif (payroll_id, business_id) in pending:
+            result.update(status='duplicate', error='User appears more than once in this request')
+        else:
+            pending[(payroll_id, business_id)] = (len(results) - 1, role_name, overrides)
+
+    # One read to tell missing users apart from unchanged ones
+    existing = set()
+    if pending:
+        for doc in users.find(
+            {'$or': [{'payroll_id': p, 'business_id': b} for p, b in pending]},
+            {'payroll_id': 1, 'business_id': 1}
+        ):
+            existing.add((doc.get('payroll_id'), doc.get('business_id')))
+
+    operations = []
+    op_rows = []
+    now = datetime.utcnow()
+    for key, (index, role_name, overrides) in pending.items():
+        if key not in existing:
+            results[index].update(status='not_found', error='User not assigned to business')
+            continue
+        operations.append(UpdateOne(
+            {'payroll_id': key[0], 'business_id': key[1]},
+            role_assignment_update(role_name, overrides, now)
+        ))
+        op_rows.append(index)
+        results[index]['status'] = 'assigned'
+
+    if operations:
+        try:
+            users.bulk_write(operations, ordered=False)
+        except BulkWriteError as bwe:
+            for error in bwe.details.get('writeErrors', []):
+                results[op_rows[error['index']]].update(status='failed', error=error.get('errmsg'))
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return counts, results
@@ -0,0 +1,204 @@
+#-------------------------------------------------------------------------------#
+#                        utils/auth/role_registry.py                            #
+#-------------------------------------------------------------------------------#
+"""
+In-process cache of business_roles.
+
+Roles change a few times a month but are read on every permission check, so
+each worker keeps all role documents in memory and serves lookups from a dict.
+Writes go through RoleRegistry.update_role, which reloads the local copy and
+bumps a shared version marker so other workers notice the change.
+
+Invalidation modes across workers:
+  - 'polling':       at most once per poll interval a worker reads the version
+                     marker (a single _id lookup) and reloads if it moved;
+                     roles written without update_role (scripts, other
+                     services) are picked up by a full reload every max_age
+  - 'change_stream': a background thread watches business_roles and reloads
+                     on every change (requires a replica set). Errors are
+                     retried with backoff and a dead watcher is restarted.
+
+Roles are keyed by (business_id, role_name), matching the unique index on
+business_roles, so two businesses can each define their own 'manager'. Role
+documents without a business_id are shared by every business and are used
+when a business has no role of that name.
+
+`version` increases on every reload so dependent caches can detect staleness.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import copy
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+VERSION_MARKER_ID = 'role_registry_version'
+MAX_WATCH_BACKOFF_SECONDS = 60.0
+
+RoleKey = Tuple[Optional[str], str]
+
+def role_key(business_id, role_name: str) -> RoleKey:
+    """Registry key for a role; business ids are compared as strings."""
+    return (str(business_id) if business_id is not None else None, role_name)
+
+class RoleRegistry:
+    """
+    Args:
+        mode: 'polling' or 'change_stream'
+        poll_seconds: Minimum interval between version marker checks
+        max_age: Seconds after which polling mode reloads even if the marker did not move
+    """
+
+    def __init__(self, mode: str = 'polling', poll_seconds: float = 5.0, max_age: float = 300.0):
+        self.mode = mode
+        self.poll_seconds = poll_seconds
+        self.max_age = max_age
+        self.version = 0
+        self._roles: Dict[RoleKey, Dict] = {}
+        self._shared_version: Optional[int] = None
+        self._loaded = False
+        self._last_check = 0.0
+        self._last_reload = 0.0
+        self._lock = threading.Lock()
+        self._get_db: Optional[Callable] = None
+        self._roles_collection = 'business_roles'
+        self._config_collection = 'business_config'
+        self._watcher: Optional[threading.Thread] = None
+        self._watcher_pid: Optional[int] = None
+
+    def init_app(self, app) -> None:
+        config = app.config
+        self.mode = config.get('ROLE_REGISTRY_MODE', self.mode)
+        self.poll_seconds = float(config.get('ROLE_REGISTRY_POLL_SECONDS', self.poll_seconds))
+        self.max_age = float(config.get('ROLE_REGISTRY_MAX_AGE_SECONDS', self.max_age))
+        self._roles_collection = config.get('COLLECTION_BUSINESS_ROLES', self._roles_collection)
+        self._config_collection = config.get('COLLECTION_BUSINESS_CONFIG', self._config_collection)
+        db_name = config.get('MONGO_DBNAME')
+        self._get_db = lambda: app.config['MONGO_CLIENT'][db_name]
+        app.extensions['role_registry'] = self
+
+    #-------------------------------------------------------------------------------#
+    #                                   Loading                                     #
+    #-------------------------------------------------------------------------------#
+    def _read_shared_version(self, db) -> int:
+        marker = db[self._config_collection].find_one({'_id': VERSION_MARKER_ID}, {'version': 1})
+        return marker.get('version', 0) if marker else 0
+
+    def reload(self, db=None) -> int:
+        """Load every role document; returns the new local version."""
+        db = db if db is not None else self._get_db()
+        shared_version = self._read_shared_version(db)
+        roles = {
+            role_key(role.get('business_id'), role['role_name']): role
+            for role in db[self._roles_collection].find({})
+        }
+        with self._lock:
+            self._roles = roles
+            self._shared_version = shared_version
+            self._loaded = True
+            self._last_check = self._last_reload = time.monotonic()
+            self.version += 1
+        logger.info(f"Role registry loaded {len(roles)} roles (version {self.version})")
+        return self.version
+
+    def _ensure_fresh(self, db=None) -> None:
+        if self._get_db is None and db is None:
+            return
+        if not self._loaded:
+            self.reload(db)
+            return
+        if self.mode == 'change_stream':
+            self._ensure_watcher()
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.poll_seconds:
+            return
+        self._last_check = now
+        db = db if db is not None else self._get_db()
+        if now - self._last_reload >= self.max_age or self._read_shared_version(db) != self._shared_version:
+            self.reload(db)
+
+    def _watcher_running(self) -> bool:
+        return self._watcher is not None and self._watcher_pid == os.getpid() and self._watcher.is_alive()
+
+    def _ensure_watcher(self) -> None:
+        if self._watcher_running():
+            return
+        with self._lock:
+            if self._watcher_running():
+                return
+            if self._watcher is not None and self._watcher_pid == os.getpid():
+                logger.warning("Role change stream watcher died, restarting it")
+            self._watcher_pid = os.getpid()
+            self._watcher = threading.Thread(target=self._watch, name='role-registry', daemon=True)
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        backoff = self.poll_seconds
+        while True:
+            try:
+                with self._get_db()[self._roles_collection].watch() as stream:
+                    # Changes made while the stream was down are covered by this reload
+                    self.reload()
+                    backoff = self.poll_seconds
+                    for _ in stream:
+                        self.reload()
+            except Exception as e:
+                logger.warning(f"Role change stream interrupted, retrying in {backoff:.0f}s: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(max(backoff, 1.0) * 2, MAX_WATCH_BACKOFF_SECONDS)
+
+    #-------------------------------------------------------------------------------#
+    #                                    Reads                                      #
+    #-------------------------------------------------------------------------------#
+    def get(self, business_id, role_name: str, db=None) -> Optional[Dict]:
+        """
+        Cached replacement for find_role_by_name, scoped to a business.
+        Falls back to the shared role of that name when the business has none.
+        """
+        self._ensure_fresh(db)
+        roles = self._roles
+        return roles.get(role_key(business_id, role_name)) or roles.get(role_key(None, role_name))
+
+    def all(self, db=None, business_id=None) -> List[Dict]:
+        """Cached replacement for find_all_roles; optionally only one business's roles."""
+        self._ensure_fresh(db)
+        if business_id is None:
+            return list(self._roles.values())
+        business = role_key(business_id, '')[0]
+        return [role for (owner, _), role in self._roles.items() if owner in (business, None)]
+
+    def names(self, db=None, business_id=None) -> frozenset:
+        """Role names usable by a business (its own plus the shared roles)."""
+        self._ensure_fresh(db)
+        business = role_key(business_id, '')[0]
+        return frozenset(name for owner, name in self._roles if owner in (business, None))
+
+    #-------------------------------------------------------------------------------#
+    #                                    Writes                                     #
+    #-------------------------------------------------------------------------------#
+    def update_role(self, db, role_name: str, update_data: Dict, update_fn: Callable) -> Optional[Dict]:
+        """
+        Write through to the database, bump the shared version marker and
+        reload the local copy.
+
+        Args:
+            db: MongoDB database instance
+            role_name: Role to update
+            update_data: Fields to update
+            update_fn: The persistence function (models.role_model.update_role)
+        """
+        updated = update_fn(db, role_name, copy.deepcopy(update_data))
+        if updated:
+            db[self._config_collection].update_one(
+                {'_id': VERSION_MARKER_ID},
+                {'$inc': {'version': 1}},
+                upsert=True
+            )
+            self.reload(db)
+        return updated
+
+# Process-wide registry used by routes.auth.permissions_manager
+role_registry = RoleRegistry()
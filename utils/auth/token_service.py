@@ -0,0 +1,289 @@
+#-------------------------------------------------------------------------------#
+#                        utils/auth/token_service.py                            #
+#-------------------------------------------------------------------------------#
+"""
+Stateless access/refresh token service.
+
+Access tokens are short-lived and carry every claim the UI needs, so
+verification is a signature check plus an in-memory revocation lookup with
+no database access. Refresh tokens live longer, are single-use (rotated on
+every refresh, see claim()) and are the only point where the user record
+is re-read.
+
+Signing keys are identified by a key ID ('kid' header). New tokens are signed
+with the active key; older keys stay valid for verification until their
+tokens expire, so keys can be rotated without logging everyone out.
+
+Revoked token IDs ('jti') are kept in a dict keyed by jti for O(1) lookups.
+Revocations are also written to a TTL collection and a background poller in
+each worker merges entries revoked by other workers.
+"""
+from typing import Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import threading
+import time
+import uuid
+
+import jwt
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN = 'access'
+REFRESH_TOKEN = 'refresh'
+
+class TokenError(Exception):
+    """Raised for invalid, expired or revoked tokens."""
+    def __init__(self, message: str, error_code: str = 'INVALID_TOKEN'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+def parse_signing_keys(raw: str, fallback_secret: str) -> Dict[str, str]:
+    """
+    Parse JWT_SIGNING_KEYS ('kid1:secret1,kid2:secret2').
+    Falls back to a single 'default' key derived from SECRET_KEY.
+    """
+    keys: Dict[str, str] = {}
+    for item in (raw or '').split(','):
+        if ':' in item:
+            kid, secret = item.split(':', 1)
+            if kid.strip() and secret.strip():
+                keys[kid.strip()] = secret.strip()
+    return keys or {'default': fallback_secret}
+
+def _timestamp(value: datetime) -> float:
+    """POSIX time of a datetime; naive values (as returned by pymongo) are UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+_EPOCH = datetime.fromtimestamp(0, timezone.utc)
+
+class TokenService:
+    """
+    Args:
+        keys: Mapping of key ID to HMAC secret
+        active_kid: Key ID used to sign new tokens
+        access_minutes: Access token lifetime
+        refresh_days: Refresh token lifetime
+    """
+
+    def __init__(
+        self,
+        keys: Optional[Dict[str, str]] = None,
+        active_kid: Optional[str] = None,
+        access_minutes: int = 15,
+        refresh_days: int = 7
+    ):
+        self.keys: Dict[str, str] = dict(keys or {})
+        self.active_kid = active_kid or next(iter(self.keys), None)
+        self.access_ttl = timedelta(minutes=access_minutes)
+        self.refresh_ttl = timedelta(days=refresh_days)
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._get_collection = None
+        self._poll_seconds = 30.0
+        self._poller: Optional[threading.Thread] = None
+        self._poller_pid: Optional[int] = None
+        self._last_sync = _EPOCH
+
+    def init_app(self, app) -> None:
+        config = app.config
+        self.keys = parse_signing_keys(config.get('JWT_SIGNING_KEYS', ''), config['SECRET_KEY'])
+        self.active_kid = config.get('JWT_ACTIVE_KID') or next(iter(self.keys))
+        if self.active_kid not in self.keys:
+            raise TokenError(f"Active signing key '{self.active_kid}' is not configured", 'CONFIG_ERROR')
+        self.access_ttl = timedelta(minutes=int(config.get('ACCESS_TOKEN_MINUTES', 15)))
+        self.refresh_ttl = timedelta(days=int(config.get('REFRESH_TOKEN_DAYS', 7)))
+        self._poll_seconds = float(config.get('TOKEN_REVOCATION_POLL_SECONDS', 30))
+        db_name = config.get('MONGO_DBNAME')
+        collection_name = config.get('COLLECTION_TOKEN_REVOCATIONS', 'token_revocations')
+        self._get_collection = lambda: app.config['MONGO_CLIENT'][db_name][collection_name]
+        app.extensions['token_service'] = self
+
+    #-------------------------------------------------------------------------------#
+    #                                 Key rotation                                  #
+    #-------------------------------------------------------------------------------#
+    def add_key(self, kid: str, secret: str, activate: bool = False) -> None:
+        """Register a signing key; optionally start signing new tokens with it."""
+        with self._lock:
+            self.keys[kid] = secret
+            if activate:
+                self.active_kid = kid
+        logger.info(f"Signing key '{kid}' added{' and activated' if activate else ''}")
+
+    def retire_key(self, kid: str) -> None:
+        """Stop accepting tokens signed with kid (after they have expired)."""
+        if kid == self.active_kid:
+            raise TokenError("Cannot retire the active signing key", 'CONFIG_ERROR')
+        with self._lock:
+            self.keys.pop(kid, None)
+
+    #-------------------------------------------------------------------------------#
+    #                                   Issuing                                     #
+    #-------------------------------------------------------------------------------#
+    def _encode(self, claims: Dict, token_type: str, ttl: timedelta) -> Tuple[str, Dict]:
+        now = datetime.utcnow()
+        payload = dict(claims)
+        payload.update({
+            'typ': token_type,
+            'jti': uuid.uuid4().hex,
+            'iat': now,
+            'exp': now + ttl
+        })
+        token = jwt.encode(
+            payload,
+            self.keys[self.active_kid],
+            algorithm='HS256',
+            headers={'kid': self.active_kid}
+        )
+        return token, payload
+
+    def issue_access_token(self, claims: Dict) -> str:
+        return self._encode(claims, ACCESS_TOKEN, self.access_ttl)[0]
+
+    def issue_refresh_token(self, subject: str) -> str:
+        return self._encode({'payroll_id': subject}, REFRESH_TOKEN, self.refresh_ttl)[0]
+
+    def issue_pair(self, claims: Dict) -> Dict[str, str]:
+        return {
+            'token': self.issue_access_token(claims),
+            'refresh_token': self.issue_refresh_token(claims['payroll_id']),
+            'expires_in': int(self.access_ttl.total_seconds())
+        }
+
+    #-------------------------------------------------------------------------------#
+    #                                Verification                                   #
+    #-------------------------------------------------------------------------------#
+    def verify(self, token: str, expected_type: str = ACCESS_TOKEN) -> Dict:
+        """
+        Verify signature, expiry, type and revocation without touching the database.
+
+        Raises:
+            TokenError: If the token is invalid, expired, of the wrong type or revoked
+        """
+        self._ensure_poller()
+        try:
+            kid = jwt.get_unverified_header(token).get('kid', 'default')
+            secret = self.keys.get(kid)
+            if secret is None:
+                raise TokenError("Unknown signing key")
+            payload = jwt.decode(token, secret, algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            raise TokenError("Token has expired", 'TOKEN_EXPIRED')
+        except jwt.InvalidTokenError:
+            raise TokenError("Invalid token")
+
+        # Tokens issued before typ existed are treated as access tokens
+        if payload.get('typ', ACCESS_TOKEN) != expected_type:
+            raise TokenError("Invalid token type")
+        if payload.get('jti') in self._revoked:
+            raise TokenError("Token has been revoked", 'TOKEN_REVOKED')
+        return payload
+
+    #-------------------------------------------------------------------------------#
+    #                                  Revocation                                   #
+    #-------------------------------------------------------------------------------#
+    @staticmethod
+    def _expiry(payload: Dict) -> float:
+        exp = payload.get('exp')
+        return _timestamp(exp) if isinstance(exp, datetime) else float(exp or time.time())
+
+    def revoke(self, payload: Dict) -> None:
+        """Revoke a verified token payload locally and for every other worker."""
+        jti = payload.get('jti')
+        if not jti:
+            return
+        expires = self._expiry(payload)
+        with self._lock:
+            self._revoked[jti] = expires
+        if self._get_collection is not None:
+            try:
+                self._get_collection().update_one(
+                    {'_id': jti},
+                    {'$set': {'expires_at': datetime.fromtimestamp(expires, timezone.utc),
+                              'revoked_at': datetime.now(timezone.utc)}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Failed to persist token revocation: {str(e)}")
+
+    def claim(self, payload: Dict) -> None:
+        """
+        Consume a verified refresh token exactly once across all workers.
+
+        The jti is inserted into the revocation collection; the unique _id
+        makes a second claim (a replay, concurrent or from another worker)
+        fail before a new pair is issued.
+
+        Raises:
+            TokenError: If the token was already used or revoked
+        """
+        jti = payload.get('jti')
+        if not jti:
+            raise TokenError("Invalid token")
+        expires = self._expiry(payload)
+        if self._get_collection is not None:
+            try:
+                self._get_collection().insert_one({
+                    '_id': jti,
+                    'expires_at': datetime.fromtimestamp(expires, timezone.utc),
+                    'revoked_at': datetime.now(timezone.utc)
+                })
+            except DuplicateKeyError:
+                with self._lock:
+                    self._revoked[jti] = expires
+                raise TokenError("Token has been revoked", 'TOKEN_REVOKED')
+            with self._lock:
+                self._revoked[jti] = expires
+            return
+        with self._lock:
+            if jti in self._revoked:
+                raise TokenError("Token has been revoked", 'TOKEN_REVOKED')
+            self._revoked[jti] = expires
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def sync_revocations(self) -> int:
+        """Merge revocations recorded by other workers and drop expired ones."""
+        if self._get_collection is None:
+            return 0
+        since = self._last_sync
+        self._last_sync = datetime.now(timezone.utc)
+        docs = list(self._get_collection().find({'revoked_at': {'$gte': since}}, {'expires_at': 1}))
+        added = 0
+        now = time.time()
+        with self._lock:
+            for doc in docs:
+                if doc['_id'] not in self._revoked:
+                    added += 1
+                self._revoked[doc['_id']] = _timestamp(doc['expires_at']) if doc.get('expires_at') else now
+            for jti in [j for j, exp in self._revoked.items() if exp < now]:
+                self._revoked.pop(jti, None)
+        return added
+
+    def _ensure_poller(self) -> None:
+        if self._get_collection is None or (self._poller is not None and self._poller_pid == os.getpid()):
+            return
+        with self._lock:
+            if self._poller is not None and self._poller_pid == os.getpid():
+                return
+            self._poller_pid = os.getpid()
+            self._last_sync = _EPOCH
+            self._poller = threading.Thread(target=self._poll, name='token-revocations', daemon=True)
+            self._poller.start()
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                self.sync_revocations()
+            except Exception as e:
+                logger.warning(f"Token revocation sync failed: {str(e)}")
+            time.sleep(self._poll_seconds)
+
+# Process-wide service used by routes.auth.auth_routes
+token_service = TokenService()
@@ -0,0 +1,413 @@
+#-------------------------------------------------------------------------------#
+#                         utils/benchmark_suite.py                              #
+#-------------------------------------------------------------------------------#
+"""
+Reproducible endpoint benchmarks.
+
+Seeds a benchmark database with synthetic global_recipes, product_list,
+allergens, business_roles and business_users documents, then drives the
+search, product, login and permission-guarded endpoints through the Flask
+test client and reports throughput and latency percentiles as JSON.
+
+    python -m utils.benchmark_suite --scale 10k
+    python -m utils.benchmark_suite --scale 100k --backend mongo --requests 2000
+    python -m utils.benchmark_suite --scale 1m --output results.json
+
+Backends:
+  - mongomock: in-process stand-in, no server needed (default)
+  - mongo:     MONGO_URI, database BENCHMARK_DBNAME (dropped and re-seeded)
+
+Data comes from a generator seeded with --seed; request parameters come from
+one generator per client thread (seed + thread index), so two runs with the
+same --seed, --scale and --concurrency issue the same requests per thread.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import Config
+from utils.query_compiler import ALLERGEN_SEVERITIES, ALLERGEN_REACTION_TYPES
+
+logger = logging.getLogger(__name__)
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+BENCHMARK_PASSWORD = 'Benchmark-Password-1'
+BENCHMARK_PERMISSION = 'viewRecipes'
+INSERT_BATCH_SIZE = 5000
+
+# Vocabulary for synthetic documents
+INGREDIENT_WORDS = ['tomato', 'onion', 'garlic', 'basil', 'olive oil', 'butter', 'flour', 'sugar',
+                    'salt', 'pepper', 'chicken', 'beef', 'pork', 'salmon', 'prawn', 'rice', 'potato',
+                    'carrot', 'celery', 'thyme', 'rosemary', 'lemon', 'lime', 'cream', 'milk', 'egg',
+                    'parmesan', 'mozzarella', 'chilli', 'ginger', 'soy sauce', 'honey', 'mushroom']
+TITLE_WORDS = ['roast', 'braised', 'grilled', 'crispy', 'slow cooked', 'spiced', 'smoked', 'glazed',
+               'pan fried', 'steamed', 'baked', 'charred']
+DISHES = ['salad', 'soup', 'risotto', 'curry', 'pie', 'tart', 'stew', 'skewers', 'burger', 'pasta']
+CUISINES = ['italian', 'french', 'thai', 'indian', 'japanese', 'mexican', 'australian', 'greek']
+METHODS = ['bake', 'grill', 'fry', 'roast', 'steam', 'braise', 'poach']
+DIETARY = ['vegetarian', 'vegan', 'gluten free', 'dairy free', 'nut free']
+SUPPLIERS = ['Bidfood', 'PFD', 'Costco', 'Fresh Direct', 'Harris Farm', 'Local Grower']
+CATEGORIES = ['produce', 'dairy', 'meat', 'seafood', 'dry goods', 'beverages', 'frozen']
+WORK_AREA_LETTERS = 'ABCFGHKMORSV'
+
+#-------------------------------------------------------------------------------#
+#                               Data generation                                 #
+#-------------------------------------------------------------------------------#
+def parse_scale(value: str) -> int:
+    value = str(value).lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+def _ingredient_name(rng: random.Random) -> str:
+    return rng.choice(INGREDIENT_WORDS)
+
+def generate_recipes(rng: random.Random, count: int):
+    for i in range(count):
+        ingredients = rng.sample(INGREDIENT_WORDS, rng.randint(3, 9))
+        yield {
+            'title': f"{rng.choice(TITLE_WORDS).title()} {ingredients[0].title()} {rng.choice(DISHES).title()} {i}",
+            'ingredients': ingredients,
+            'cuisine': rng.choice(CUISINES),
+            'cookery_method': rng.choice(METHODS),
+            'dietary': rng.sample(DIETARY, rng.randint(0, 2)),
+            'servings': rng.randint(1, 12)
+        }
+
+def generate_products(rng: random.Random, count: int):
+    for i in range(count):
+        pack = rng.choice([1, 2, 5, 10])
+        yield {
+            'INGREDIENT': f"{_ingredient_name(rng).title()} {rng.choice(['Fresh', 'Organic', 'Premium', 'Bulk'])} {i}",
+            'SUPPLIER': rng.choice(SUPPLIERS),
+            'CATEGORY': rng.choice(CATEGORIES),
+            'PU': f'{pack}kg',
+            'PUC': round(rng.uniform(2, 80), 2),
+            'RU': 'kg',
+            'RUC': round(rng.uniform(1, 40), 2)
+        }
+
+def generate_allergens(rng: random.Random, count: int):
+    for i in range(count):
+        yield {
+            'ingredient': f'{_ingredient_name(rng)} {i}',
+            'severity': rng.choice(ALLERGEN_SEVERITIES),
+            'reaction_type': rng.choice(ALLERGEN_REACTION_TYPES)
+        }
+
+def generate_users(rng: random.Random, count: int, password_hash: str, business_id: str = 'BENCH-BUSINESS'):
+    for i in range(count):
+        yield {
+            'payroll_id': f'D{WORK_AREA_LETTERS[i % len(WORK_AREA_LETTERS)]}-{i:06d}',
+            'user_id': f'U{i:07d}',
+            'business_id': business_id,
+            'company_id': business_id,
+            'venue_id': f'V{i % 20:03d}',
+            'work_area_id': f'W{i % 100:03d}',
+            'work_email': f'staff{i}@example.com',
+            'first_name': f'Staff{i}',
+            'role': 'staff',
+            'role_name': 'staff' if i % 10 else 'manager',
+            'status': 'active',
+            'password': password_hash
+        }
+
+def _insert(collection, documents, batch_size: int = INSERT_BATCH_SIZE) -> int:
+    batch, inserted = [], 0
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+def seed_database(db, scale: int, seed: int = 42, users: Optional[int] = None, rounds: int = 4) -> Dict:
+    """
+    Drop and re-seed the benchmark collections.
+
+    Recipes and products are seeded at `scale`, allergens at scale/10 and
+    users at min(scale/10, 10000) unless given. All users share one bcrypt
+    hash computed at `rounds` so seeding stays fast.
+    """
+    from utils.auth.password_pool import bcrypt_hash
+
+    rng = random.Random(seed)
+    users = users if users is not None else max(1, min(scale // 10, 10000))
+    password_hash = bcrypt_hash(BENCHMARK_PASSWORD, rounds)
+    started = time.perf_counter()
+
+    for name in (Config.COLLECTION_GLOBAL_RECIPES, Config.COLLECTION_PRODUCT_LIST, Config.COLLECTION_ALLERGENS,
+                 Config.COLLECTION_BUSINESS_USERS, Config.COLLECTION_BUSINESS_ROLES, Config.COLLECTION_AUDIT_LOGS):
+        db.drop_collection(name)
+
+    counts = {
+        'global_recipes': _insert(db[Config.COLLECTION_GLOBAL_RECIPES], generate_recipes(rng, scale)),
+        'product_list': _insert(db[Config.COLLECTION_PRODUCT_LIST], generate_products(rng, scale)),
+        'allergens': _insert(db[Config.COLLECTION_ALLERGENS], generate_allergens(rng, max(1, scale // 10))),
+        'business_users': _insert(db[Config.COLLECTION_BUSINESS_USERS], generate_users(rng, users, password_hash))
+    }
+    db[Config.COLLECTION_BUSINESS_ROLES].insert_many([
+        {'role_name': 'staff', 'permissions': [{'permissionName': BENCHMARK_PERMISSION, 'global': True}]},
+        {'role_name': 'manager', 'permissions': [{'permissionName': BENCHMARK_PERMISSION, 'global': True},
+                                                 {'permissionName': 'editRecipes', 'global': True}]}
+    ])
+    counts['business_roles'] = 2
+
+    try:
+        from utils.index_registry import apply_indexes, apply_search_keys
+        apply_search_keys(db, Config)
+        apply_indexes(db, Config, collections=[
+            Config.COLLECTION_GLOBAL_RECIPES, Config.COLLECTION_PRODUCT_LIST, Config.COLLECTION_ALLERGENS,
+            Config.COLLECTION_BUSINESS_USERS, Config.COLLECTION_BUSINESS_ROLES
+        ])
+    except Exception as e:
+        logger.warning(f"Could not apply indexes to benchmark database: {str(e)}")
+
+    return {'documents': counts, 'seed_seconds': time.perf_counter() - started}
+
+#-------------------------------------------------------------------------------#
+#                              Benchmark app                                    #
+#-------------------------------------------------------------------------------#
+@contextmanager
+def benchmark_database(db_name: str):
+    """
+    Point Config.MONGO_DBNAME, which routes read directly, at the benchmark
+    database for the duration of the block and restore it afterwards.
+    """
+    previous = Config.MONGO_DBNAME
+    Config.MONGO_DBNAME = db_name
+    try:
+        yield
+    finally:
+        Config.MONGO_DBNAME = previous
+
+def build_benchmark_app(client, db_name: str):
+    """
+    Minimal app with the blueprints under test bound to the benchmark
+    database, plus a require_permission-guarded route. Requests must run
+    inside benchmark_database(db_name).
+    """
+    from flask import Flask, g, jsonify, request
+    import routes.search.recipe_search as recipe_search_routes
+    from routes.search.product_routes import products
+    from routes.auth.auth_routes import auth
+    from routes.auth.permissions_manager import permission_manager, require_permission
+    from utils.audit_pipeline import audit_pipeline
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(MONGO_CLIENT=client, MONGO_DBNAME=db_name, TESTING=True,
+                      RATELIMIT_STORAGE_URL='memory://', PASSWORD_POOL_MAX_PENDING=1024,
+                      AUDIT_SPOOL_PATH=os.path.join(tempfile.gettempdir(), f'{db_name}_audit_spool.jsonl'))
+    # Login audit events go to the benchmark database, not the app's spool file
+    audit_pipeline.init_app(app)
+
+    for blueprint in (recipe_search_routes.recipe_search, products, auth, permission_manager):
+        app.register_blueprint(blueprint)
+
+    @app.before_request
+    def load_benchmark_user():
+        payroll_id = request.headers.get('X-Benchmark-User')
+        if payroll_id:
+            g.user = {'payroll_id': payroll_id, 'business_id': 'BENCH-BUSINESS'}
+
+    @app.route('/benchmark/guarded')
+    @require_permission(BENCHMARK_PERMISSION)
+    def guarded():
+        return jsonify({'success': True})
+
+    return app
+
+#-------------------------------------------------------------------------------#
+#                                 Workloads                                     #
+#-------------------------------------------------------------------------------#
+def build_workloads(db, seed: int) -> Dict[str, Callable]:
+    """
+    Each workload returns a function(client) issuing one request and
+    returning the status code. Every client thread draws from its own
+    generator, seeded seed + thread index, as random.Random is not meant
+    to be shared between threads.
+    """
+    local = threading.local()
+    thread_index = itertools.count()
+
+    def rng() -> random.Random:
+        if not hasattr(local, 'rng'):
+            local.rng = random.Random(seed + next(thread_index))
+        return local.rng
+
+    product_ids = [str(doc['_id']) for doc in db[Config.COLLECTION_PRODUCT_LIST].find({}, {'_id': 1}).limit(5000)]
+    payroll_ids = [doc['payroll_id'] for doc in db[Config.COLLECTION_BUSINESS_USERS].find({}, {'payroll_id': 1}).limit(5000)]
+
+    def global_recipes(client):
+        params = {'title': rng().choice(TITLE_WORDS).title(), 'limit': 10}
+        if rng().random() < 0.5:
+            params['cuisine'] = rng().choice(CUISINES)
+        return client.get('/api/global_recipes', query_string=params).status_code
+
+    def products_search(client):
+        return client.get('/api/products/search', query_string={'query': _ingredient_name(rng())}).status_code
+
+    def products_bulk(client):
+        ids = rng().sample(product_ids, min(len(product_ids), 25))
+        return client.post('/api/products/bulk', json={'product_ids': ids}).status_code
+
+    def auth_login(client):
+        return client.post('/auth/login', json={'payroll_id': rng().choice(payroll_ids),
+                                                'password': BENCHMARK_PASSWORD}).status_code
+
+    def permission_check(client):
+        return client.get('/benchmark/guarded', headers={'X-Benchmark-User': rng().choice(payroll_ids)}).status_code
+
+    return {
+        'global_recipes': global_recipes,
+        'products_search': products_search,
+        'products_bulk': products_bulk,
+        'auth_login': auth_login,
+        'require_permission': permission_check
+    }
+
+def summarize(latencies_ms: List[float], errors: int, elapsed: float) -> Dict:
+    values = np.asarray(latencies_ms, dtype=float)
+    if values.size == 0:
+        return {'requests': 0, 'errors': errors, 'throughput_rps': 0.0}
+    p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+    return {
+        'requests': int(values.size),
+        'errors': errors,
+        'throughput_rps': values.size / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'mean': float(values.mean()),
+            'p50': float(p50),
+            'p90': float(p90),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(values.max())
+        }
+    }
+
+def run_workload(app, workload: Callable, requests: int, concurrency: int = 1, warmup: int = 20) -> Dict:
+    """Issue `requests` calls (after `warmup`) across `concurrency` threads."""
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client
+
+    for _ in range(warmup):
+        workload(client())
+
+    def timed(_):
+        started = time.perf_counter()
+        status = workload(client())
+        return (time.perf_counter() - started) * 1000, status
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        samples = [timed(i) for i in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(1 for _, status in samples if status >= 400)
+    result = summarize([latency for latency, _ in samples], errors, elapsed)
+    result['status_codes'] = {}
+    for _, status in samples:
+        result['status_codes'][str(status)] = result['status_codes'].get(str(status), 0) + 1
+    return result
+
+def run_benchmarks(
+    scale: int,
+    backend: str = 'mongomock',
+    requests: int = 500,
+    concurrency: int = 1,
+    seed: int = 42,
+    workloads: Optional[List[str]] = None,
+    users: Optional[int] = None
+) -> Dict:
+    if backend == 'mongomock':
+        import mongomock
+        client = mongomock.MongoClient()
+        db_name = 'benchmark'
+    elif backend == 'mongo':
+        from pymongo import MongoClient
+        client = MongoClient(Config.MONGO_URI)
+        db_name = os.getenv('BENCHMARK_DBNAME', 'benchmark')
+        if db_name == Config.MONGO_DBNAME:
+            raise ValueError("BENCHMARK_DBNAME must differ from MONGO_DBNAME; the benchmark drops its collections")
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    db = client[db_name]
+    seeding = seed_database(db, scale, seed=seed, users=users)
+    app = build_benchmark_app(client, db_name)
+    available = build_workloads(db, seed)
+    selected = workloads or list(available)
+
+    results = {}
+    with benchmark_database(db_name):
+        for name in selected:
+            logger.info(f"Running {name} ({requests} requests, concurrency {concurrency})")
+            results[name] = run_workload(app, available[name], requests, concurrency)
+
+    return {
+        'meta': {
+            'scale': scale,
+            'backend': backend,
+            'requests_per_endpoint': requests,
+            'concurrency': concurrency,
+            'seed': seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        },
+        'seeding': seeding,
+        'results': results
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed synthetic data and benchmark key endpoints")
+    parser.add_argument('--scale', default='10k', help="Documents per collection: 1k, 10k, 100k, 1m or a number")
+    parser.add_argument('--backend', choices=['mongomock', 'mongo'], default='mongomock')
+    parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--users', type=int, default=None, help="business_users to seed")
+    parser.add_argument('--workload', action='append', help="Limit to these workloads (repeatable)")
+    parser.add_argument('--output', help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_benchmarks(
+        parse_scale(args.scale),
+        backend=args.backend,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        workloads=args.workload,
+        users=args.users
+    )
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
@@ -0,0 +1,198 @@
+#-------------------------------------------------------------------------------#
+#                        utils/business_hierarchy.py                            #
+#-------------------------------------------------------------------------------#
+"""
+In-memory snapshots of business -> venues -> work_areas.
+
+Every authenticated request carries business_id, venue_id and work_area_id,
+and resolving them against the nested businesses document is a query per
+lookup. A snapshot flattens one business document into id -> node maps once,
+so venue and work-area resolution on hot paths is a dict lookup.
+
+Snapshots are immutable all the way down (dicts become read-only mappings,
+lists become tuples) and are replaced, never mutated: code that writes a
+business calls hierarchy_cache.rebuild(db, business_id) afterwards.
+Snapshots older than max_age_seconds are rebuilt on next access so writes
+made by other workers show up within that bound.
+
+login_required resolves the token's venue_id/work_area_id through
+hierarchy_cache.resolve() into g.venue and g.work_area.
+"""
+from typing import Any, Dict, Mapping, Optional
+from types import MappingProxyType
+import copy
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def _freeze(value: Any) -> Any:
+    """Recursively copy value into read-only mappings and tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return copy.deepcopy(value)
+
+def _thaw(value: Any) -> Any:
+    """Mutable copy of a frozen value."""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    if isinstance(value, frozenset):
+        return {_thaw(item) for item in value}
+    return copy.deepcopy(value)
+
+class BusinessSnapshot:
+    """
+    Read-only view of one business document.
+
+    Attributes:
+        business: The business document without its venues
+        venues: venue_id -> venue document (without work_areas)
+        work_areas: work_area_id -> work area document
+        venue_of: work_area_id -> venue_id
+        work_areas_by_venue: venue_id -> tuple of work_area_ids
+    """
+
+    __slots__ = ('business_id', 'business', 'venues', 'work_areas', 'venue_of',
+                 'work_areas_by_venue', 'built_at')
+
+    def __init__(self, document: Dict):
+        self.business_id = document.get('business_id')
+        self.business = _freeze({k: v for k, v in document.items() if k != 'venues'})
+
+        venues, work_areas, venue_of, by_venue = {}, {}, {}, {}
+        for venue in document.get('venues') or []:
+            venue_id = venue.get('venue_id')
+            if venue_id is None:
+                continue
+            venues[venue_id] = _freeze({k: v for k, v in venue.items() if k != 'work_areas'})
+            area_ids = []
+            for area in venue.get('work_areas') or []:
+                area_id = area.get('work_area_id')
+                if area_id is None:
+                    continue
+                work_areas[area_id] = _freeze(area)
+                venue_of[area_id] = venue_id
+                area_ids.append(area_id)
+            by_venue[venue_id] = tuple(area_ids)
+
+        self.venues = MappingProxyType(venues)
+        self.work_areas = MappingProxyType(work_areas)
+        self.venue_of = MappingProxyType(venue_of)
+        self.work_areas_by_venue = MappingProxyType(by_venue)
+        self.built_at = time.monotonic()
+
+    def venue(self, venue_id: str) -> Optional[Mapping]:
+        return self.venues.get(venue_id)
+
+    def work_area(self, work_area_id: str, venue_id: Optional[str] = None) -> Optional[Mapping]:
+        """Resolve a work area, optionally requiring it to belong to venue_id."""
+        if venue_id is not None and self.venue_of.get(work_area_id) != venue_id:
+            return None
+        return self.work_areas.get(work_area_id)
+
+    def contains(self, venue_id: Optional[str] = None, work_area_id: Optional[str] = None) -> bool:
+        """True when the venue/work area ids from a token belong to this business."""
+        if venue_id is not None and venue_id not in self.venues:
+            return False
+        if work_area_id is not None:
+            owner = self.venue_of.get(work_area_id)
+            if owner is None or (venue_id is not None and owner != venue_id):
+                return False
+        return True
+
+    def to_dict(self) -> Dict:
+        """Nested business -> venues -> work_areas structure (mutable copy)."""
+        hierarchy = _thaw(self.business)
+        hierarchy['venues'] = [
+            dict(_thaw(venue), work_areas=[
+                _thaw(self.work_areas[area_id])
+                for area_id in self.work_areas_by_venue.get(venue_id, ())
+            ])
+            for venue_id, venue in self.venues.items()
+        ]
+        return hierarchy
+
+class HierarchyCache:
+    """
+    Args:
+        collection_name: Businesses collection
+        max_age_seconds: Rebuild snapshots older than this on access
+    """
+
+    def __init__(self, collection_name: str = 'business_entities', max_age_seconds: float = 60.0):
+        self.collection_name = collection_name
+        self.max_age_seconds = max_age_seconds
+        self._snapshots: Dict[str, BusinessSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.collection_name = app.config.get('COLLECTION_BUSINESSES', self.collection_name)
+        self.max_age_seconds = float(app.config.get('BUSINESS_HIERARCHY_MAX_AGE', self.max_age_seconds))
+        app.extensions['business_hierarchy'] = self
+
+    def rebuild(self, db, business_id: str) -> Optional[BusinessSnapshot]:
+        """Load the business document and swap in a fresh snapshot."""
+        document = db[self.collection_name].find_one({'business_id': business_id}, {'_id': 0})
+        with self._lock:
+            if document is None:
+                self._snapshots.pop(business_id, None)
+                return None
+            snapshot = self._snapshots[business_id] = BusinessSnapshot(document)
+        return snapshot
+
+    def invalidate(self, business_id: Optional[str] = None) -> None:
+        with self._lock:
+            if business_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(business_id, None)
+
+    def get(self, db, business_id: str) -> Optional[BusinessSnapshot]:
+        snapshot = self._snapshots.get(business_id)
+        if snapshot is not None and time.monotonic() - snapshot.built_at < self.max_age_seconds:
+            return snapshot
+        return self.rebuild(db, business_id)
+
+    #-------------------------------------------------------------------------------#
+    #                              Hot-path lookups                                 #
+    #-------------------------------------------------------------------------------#
+    def lookup_venue(self, db, business_id: str, venue_id: str) -> Optional[Mapping]:
+        snapshot = self.get(db, business_id)
+        return snapshot.venue(venue_id) if snapshot else None
+
+    def lookup_work_area(self, db, business_id: str, work_area_id: str,
+                         venue_id: Optional[str] = None) -> Optional[Mapping]:
+        snapshot = self.get(db, business_id)
+        return snapshot.work_area(work_area_id, venue_id) if snapshot else None
+
+    def get_business_hierarchy(self, db, business_id: str) -> Optional[Dict]:
+        snapshot = self.get(db, business_id)
+        return snapshot.to_dict() if snapshot else None
+
+    def resolve(self, db, business_id: Optional[str], venue_id: Optional[str] = None,
+                work_area_id: Optional[str] = None) -> Dict[str, Optional[Mapping]]:
+        """
+        Resolve token ids to their nodes: {'business', 'venue', 'work_area'}.
+        A work area is only returned when it belongs to venue_id.
+        """
+        snapshot = self.get(db, business_id) if business_id else None
+        if snapshot is None:
+            return {'business': None, 'venue': None, 'work_area': None}
+        return {
+            'business': snapshot.business,
+            'venue': snapshot.venue(venue_id) if venue_id else None,
+            'work_area': snapshot.work_area(work_area_id, venue_id) if work_area_id else None
+        }
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+# Process-wide cache; writers call hierarchy_cache.rebuild(db, business_id)
+hierarchy_cache = HierarchyCache()
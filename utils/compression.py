@@ -0,0 +1,151 @@
+#-------------------------------------------------------------------------------#
+#                            utils/compression.py                               #
+#-------------------------------------------------------------------------------#
+"""
+gzip/brotli compression for dynamic responses.
+
+Responses are compressed in an after_request hook when
+  - the client accepts br or gzip (br preferred when the brotli package is
+    installed),
+  - the mimetype is text-like (JSON, HTML, CSS, JS, ...),
+  - the body is at least COMPRESS_MIN_SIZE bytes; streamed bodies are
+    compressed incrementally as the generator yields,
+  - the response is not already encoded.
+
+Each encoding is a distinct representation, so strong ETags get an
+'-gzip'/'-br' suffix. The suffix is stripped from If-None-Match before the
+view runs so @cached (utils/http_cache.py) still recognises the client copy
+and answers 304, and put back on the 304's ETag so it names the same
+representation the client holds.
+"""
+from typing import Iterable, Iterator, Optional
+import gzip
+import logging
+import re
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; gzip only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = frozenset([
+    'application/json', 'application/javascript', 'application/x-ndjson', 'application/xml',
+    'image/svg+xml', 'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'text/xml'
+])
+_ETAG_SUFFIX = re.compile(r'-(gzip|br)(?=")')
+_STRIPPED_ENCODING = 'compression.etag_encoding'
+
+def negotiate_encoding(accept_encoding, allow_brotli: bool = True) -> Optional[str]:
+    """Pick 'br' or 'gzip' from a parsed Accept-Encoding header, or None."""
+    if allow_brotli and brotli is not None and accept_encoding['br'] > 0:
+        return 'br'
+    if accept_encoding['gzip'] > 0:
+        return 'gzip'
+    return None
+
+def compress_body(body: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == 'br':
+        # Brotli quality 0-11; 5 is close to gzip -6 in speed with smaller output
+        return brotli.compress(body, quality=min(11, max(0, level - 1)))
+    return gzip.compress(body, compresslevel=level)
+
+def compress_stream(chunks: Iterable, encoding: str, level: int = 6) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk, holding only the compressor state."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(11, max(0, level - 1)))
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+        compress, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+class Compressor:
+    """
+    Args:
+        min_size: Smallest body worth compressing, in bytes
+        level: gzip level (brotli quality is derived from it)
+        allow_brotli: Offer br when the brotli package is installed
+    """
+
+    def __init__(self, min_size: int = 1024, level: int = 6, allow_brotli: bool = True):
+        self.min_size = min_size
+        self.level = level
+        self.allow_brotli = allow_brotli
+
+    def init_app(self, app) -> None:
+        config = app.config
+        self.min_size = int(config.get('COMPRESS_MIN_SIZE', self.min_size))
+        self.level = int(config.get('COMPRESS_LEVEL', self.level))
+        self.allow_brotli = bool(config.get('COMPRESS_BROTLI', self.allow_brotli))
+        app.before_request(self.strip_etag_suffix)
+        app.after_request(self.compress_response)
+        app.extensions['compressor'] = self
+        logger.info(f"Response compression enabled (brotli {'available' if brotli else 'not installed'})")
+
+    @staticmethod
+    def strip_etag_suffix() -> None:
+        header = request.environ.get('HTTP_IF_NONE_MATCH')
+        if header and ('-gzip"' in header or '-br"' in header):
+            match = _ETAG_SUFFIX.search(header)
+            request.environ[_STRIPPED_ENCODING] = match.group(1)
+            request.environ['HTTP_IF_NONE_MATCH'] = _ETAG_SUFFIX.sub('', header)
+
+    def restore_etag_suffix(self, response):
+        """Suffix a 304's ETag with the encoding the client's copy was sent in."""
+        response.vary.add('Accept-Encoding')
+        encoding = request.environ.get(_STRIPPED_ENCODING)
+        etag, weak = response.get_etag()
+        if (etag and encoding and not _ETAG_SUFFIX.search(f'"{etag}"')
+                and encoding == negotiate_encoding(request.accept_encodings, self.allow_brotli)):
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        return response
+
+    def compress_response(self, response):
+        if response.status_code == 304:
+            return self.restore_etag_suffix(response)
+        if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.accept_encodings, self.allow_brotli)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            # Generators (e.g. exports) are compressed as they are produced
+            response.response = compress_stream(response.response, encoding, self.level)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        response.set_data(compress_body(body, encoding, self.level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        return response
+
+# Process-wide compressor registered in app.create_app
+compressor = Compressor()
@@ -0,0 +1,231 @@
+#-------------------------------------------------------------------------------#
+#                            utils/export_stream.py                             #
+#-------------------------------------------------------------------------------#
+"""
+Streaming NDJSON/CSV export of whole collections.
+
+Documents are read from a server-side cursor in batches of batch_size and
+encoded chunk by chunk as a generator, so memory stays constant however
+large the collection is. Each export is sorted by _id; passing the last
+exported _id as 'after' resumes an interrupted export.
+
+Usage:
+    spec = EXPORT_SPECS['global_recipes']
+    export_format, chunks = stream_export(db[Config.COLLECTION_GLOBAL_RECIPES], spec, request.args)
+    return Response(chunks, mimetype=EXPORT_FORMATS[export_format])
+"""
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+import csv
+import io
+import logging
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from bson.json_util import RELAXED_JSON_OPTIONS, dumps
+
+from utils.federated_search import user_visibility_filter
+from utils.query_compiler import (
+    ALLERGEN_SEARCH_FIELDS,
+    PRODUCT_SEARCH_FIELDS,
+    RECIPE_SEARCH_FIELDS,
+    FieldSpec,
+    compile_query
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+
+class ExportError(Exception):
+    """Custom exception for invalid export requests"""
+    def __init__(self, message: str, error_code: str = 'EXPORT_ERROR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+class ExportSpec:
+    """
+    Describes one exportable collection.
+
+    Args:
+        collection_setting: Config attribute holding the collection name
+        fields: Filter specifications understood by compile_query
+        columns: Default projection and CSV column order
+        viewer_scoped: Limit the export to documents the viewer may see
+            (user_visibility_filter, as in federated search)
+    """
+
+    def __init__(self, collection_setting: str, fields: Tuple[FieldSpec, ...], columns: Iterable[str],
+                 viewer_scoped: bool = False):
+        self.collection_setting = collection_setting
+        self.fields = fields
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.viewer_scoped = viewer_scoped
+
+_RECIPE_COLUMNS = ('_id', 'title', 'cuisine', 'cookery_method', 'dietary', 'ingredients',
+                   'portions', 'created_at', 'updated_at')
+
+EXPORT_SPECS: Dict[str, ExportSpec] = {
+    'global_recipes': ExportSpec('COLLECTION_GLOBAL_RECIPES', RECIPE_SEARCH_FIELDS, _RECIPE_COLUMNS),
+    'user_recipes': ExportSpec('COLLECTION_USER_RECIPES', RECIPE_SEARCH_FIELDS,
+                               _RECIPE_COLUMNS + ('payroll_id', 'business_id', 'visibility'),
+                               viewer_scoped=True),
+    'product_list': ExportSpec('COLLECTION_PRODUCT_LIST', PRODUCT_SEARCH_FIELDS,
+                               ('_id', 'INGREDIENT', 'SUPPLIER', 'CATEGORY', 'PU', 'PUC', 'RU', 'RUC')),
+    'allergens': ExportSpec('COLLECTION_ALLERGENS', ALLERGEN_SEARCH_FIELDS,
+                            ('_id', 'ingredient', 'severity', 'reaction_type', 'symptoms',
+                             'created_at', 'updated_at'))
+}
+
+#-------------------------------------------------------------------------------#
+#                              Request parsing                                  #
+#-------------------------------------------------------------------------------#
+def parse_fields(spec: ExportSpec, raw: Optional[str]) -> Tuple[str, ...]:
+    """Resolve the 'fields' parameter (comma separated) to the exported columns."""
+    if not raw:
+        return spec.columns
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    if not fields:
+        return spec.columns
+    for field in fields:
+        if field.startswith('$') or '..' in field:
+            raise ExportError(f"Invalid field: {field}", 'INVALID_FIELD')
+    return fields
+
+def parse_batch_size(raw: Optional[str]) -> int:
+    if not raw:
+        return DEFAULT_BATCH_SIZE
+    try:
+        batch_size = int(raw)
+    except ValueError:
+        raise ExportError("batch_size must be an integer", 'INVALID_BATCH_SIZE')
+    return max(1, min(batch_size, MAX_BATCH_SIZE))
+
+def build_query(spec: ExportSpec, args: Mapping) -> Tuple[Dict, Optional[Dict]]:
+    """Compile filters and the 'after' resume point into (filter, collation)."""
+    compiled = compile_query(spec.fields, args)
+    query = dict(compiled.filter)
+    after = args.get('after')
+    if after:
+        try:
+            query['_id'] = {'$gt': ObjectId(after)}
+        except (InvalidId, TypeError):
+            raise ExportError(f"Invalid resume id: {after}", 'INVALID_AFTER')
+    return query, compiled.collation
+
+#-------------------------------------------------------------------------------#
+#                                 Encoders                                      #
+#-------------------------------------------------------------------------------#
+def _csv_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        if all(not isinstance(v, (dict, list)) for v in value):
+            return '|'.join(str(v) for v in value)
+        return dumps(value, json_options=RELAXED_JSON_OPTIONS)
+    if isinstance(value, dict):
+        return dumps(value, json_options=RELAXED_JSON_OPTIONS)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def _lookup(document: Dict, field: str):
+    value = document
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def _ndjson_line(document: Dict) -> str:
+    if isinstance(document.get('_id'), ObjectId):
+        document['_id'] = str(document['_id'])
+    return dumps(document, json_options=RELAXED_JSON_OPTIONS) + '\n'
+
+def encode_ndjson(batches: Iterable[List[Dict]]) -> Iterator[str]:
+    for batch in batches:
+        yield ''.join(_ndjson_line(doc) for doc in batch)
+
+def encode_csv(batches: Iterable[List[Dict]], columns: Tuple[str, ...]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(_lookup(doc, column)) for column in columns] for doc in batch)
+        yield buffer.getvalue()
+
+#-------------------------------------------------------------------------------#
+#                                  Export                                       #
+#-------------------------------------------------------------------------------#
+def iter_batches(cursor, batch_size: int) -> Iterator[List[Dict]]:
+    """Group cursor documents into lists of at most batch_size; closes the cursor."""
+    batch: List[Dict] = []
+    try:
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        cursor.close()
+
+def stream_export(collection, spec: ExportSpec, args: Mapping,
+                  viewer: Optional[Dict] = None) -> Tuple[str, Iterator[str]]:
+    """
+    Validate an export request and return (format, chunk generator).
+
+    Args:
+        collection: Source collection
+        spec: Export specification for the collection
+        args: Request parameters: format, fields, batch_size, limit, after
+            and the collection's search filters
+        viewer: Token payload of the caller ('payroll_id', 'business_id');
+            required for viewer-scoped specs
+
+    Raises:
+        ExportError: For an unknown format or invalid parameter
+    """
+    export_format = (args.get('format') or 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported format: {export_format}", 'INVALID_FORMAT')
+    columns = parse_fields(spec, args.get('fields'))
+    batch_size = parse_batch_size(args.get('batch_size'))
+    query, collation = build_query(spec, args)
+    if spec.viewer_scoped:
+        if not (viewer and viewer.get('payroll_id')):
+            raise ExportError("This dataset can only be exported by a signed-in user", 'VIEWER_REQUIRED')
+        scope = user_visibility_filter(viewer)
+        query = {'$and': [query, scope]} if query else scope
+
+    projection = {field: 1 for field in columns}
+    if '_id' not in projection:
+        projection['_id'] = 0
+    cursor = collection.find(query, projection, batch_size=batch_size).sort('_id', 1)
+    if collation:
+        cursor = cursor.collation(collation)
+    limit = args.get('limit')
+    if limit:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ExportError("limit must be an integer", 'INVALID_LIMIT')
+        # Mongo treats limit(0) as no limit, so only positive values are accepted
+        if limit <= 0:
+            raise ExportError("limit must be a positive integer", 'INVALID_LIMIT')
+        cursor = cursor.limit(limit)
+
+    logger.info(f"Exporting {collection.name} as {export_format}: {query} (batch size {batch_size})")
+    batches = iter_batches(cursor, batch_size)
+    if export_format == 'csv':
+        return export_format, encode_csv(batches, columns)
+    return export_format, encode_ndjson(batches)
@@ -0,0 +1,193 @@
+#-------------------------------------------------------------------------------#
+#                         utils/federated_search.py                             #
+#-------------------------------------------------------------------------------#
+"""
+Federated recipe search across global_recipes and user_recipes.
+
+Both collections are queried concurrently with the same compiled filter,
+each sorted by (title, _id) under a case-insensitive collation, and merged
+into a single stream by title. Search filters are anchored prefixes, so title
+order is also relevance order: an exact title match is the shortest string
+with that prefix and sorts first, followed by the closest completions.
+
+Pagination is keyset based. The opaque cursor carries the last returned
+(title, _id) of every source separately and each collection resumes strictly
+after its own position, in the server's collation order. Pages therefore
+never skip or duplicate results, even where the merge key (title_sort_key,
+an approximation of the ICU order) and the server disagree on how two titles
+from different sources interleave.
+"""
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import heapq
+import json
+import logging
+import unicodedata
+
+from bson import ObjectId
+
+from .query_compiler import CASE_INSENSITIVE_COLLATION, RECIPE_SEARCH_FIELDS, compile_query
+
+logger = logging.getLogger(__name__)
+
+SOURCE_GLOBAL = 'global'
+SOURCE_USER = 'user'
+
+# Summary projection returned by the federated endpoint
+RECIPE_SUMMARY_PROJECTION = {
+    'title': 1, 'img_url': 1, 'display_url': 1, 'cuisine': 1,
+    'cookery_method': 1, 'dietary': 1, 'payroll_id': 1, 'visibility': 1
+}
+
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='recipe-search')
+
+class SearchCursorError(Exception):
+    """Custom exception for malformed pagination cursors"""
+    def __init__(self, message: str, error_code: str = 'INVALID_CURSOR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+#-------------------------------------------------------------------------------#
+#                                  Cursors                                      #
+#-------------------------------------------------------------------------------#
+Position = Tuple[Optional[str], ObjectId]
+
+def encode_cursor(positions: Dict[str, Position]) -> str:
+    """Encode the last returned (title, _id) of each source."""
+    payload = {source: [title, str(doc_id)] for source, (title, doc_id) in positions.items()}
+    raw = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Dict[str, Position]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        positions = {}
+        for source, (title, doc_id) in payload.items():
+            if source not in (SOURCE_GLOBAL, SOURCE_USER) or not (title is None or isinstance(title, str)):
+                raise ValueError(source)
+            positions[source] = (title, ObjectId(doc_id))
+        return positions
+    except Exception:
+        raise SearchCursorError("Malformed search cursor")
+
+def _after_cursor(position: Optional[Position]) -> Optional[Dict]:
+    """Mongo predicate selecting the documents that sort after a source's position."""
+    if position is None:
+        return None
+    title, doc_id = position
+    if title is None:
+        # Missing titles sort before every string
+        return {'$or': [
+            {'title': {'$exists': True, '$ne': None}},
+            {'title': None, '_id': {'$gt': doc_id}}
+        ]}
+    return {'$or': [
+        {'title': {'$gt': title}},
+        {'title': title, '_id': {'$gt': doc_id}}
+    ]}
+
+def _char_class(ch: str) -> int:
+    if ch.isspace():
+        return 0
+    if ch.isdigit():
+        return 2
+    if ch.isalpha():
+        return 3
+    return 1
+
+def title_sort_key(title) -> Tuple:
+    """
+    Approximation of the strength-2 ICU order used by the server sort:
+    accents only break ties between otherwise equal titles, case is ignored,
+    and whitespace < punctuation < digits < letters.
+    """
+    folded = unicodedata.normalize('NFC', str(title or '')).casefold()
+    base = ''.join(ch for ch in unicodedata.normalize('NFKD', folded) if not unicodedata.combining(ch))
+    return tuple((_char_class(ch), ch) for ch in base), folded
+
+#-------------------------------------------------------------------------------#
+#                                   Search                                      #
+#-------------------------------------------------------------------------------#
+def user_visibility_filter(viewer: Dict) -> Dict:
+    """Recipes a viewer may see in user_recipes: their own, or shared with their business."""
+    clauses = [{'payroll_id': viewer['payroll_id']}]
+    if viewer.get('business_id'):
+        clauses.append({'visibility': 'business', 'business_id': viewer['business_id']})
+    return {'$or': clauses}
+
+def _fetch(collection, source: str, base_filter: Dict, position: Optional[Position], limit: int) -> List[Dict]:
+    clauses = [clause for clause in (base_filter, _after_cursor(position)) if clause]
+    query = {'$and': clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+    docs = list(
+        collection.find(query, RECIPE_SUMMARY_PROJECTION)
+        .collation(CASE_INSENSITIVE_COLLATION)
+        .sort([('title', 1), ('_id', 1)])
+        .limit(limit)
+    )
+    for doc in docs:
+        doc['source'] = source
+    return docs
+
+def federated_recipe_search(
+    db,
+    config,
+    filters: Dict,
+    viewer: Optional[Dict] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None
+) -> Dict:
+    """
+    Search global and user recipes in one call.
+
+    Args:
+        db: MongoDB database instance
+        config: Config class providing the collection names
+        filters: Request filters understood by RECIPE_SEARCH_FIELDS
+        viewer: Token payload of the caller ('payroll_id', 'business_id');
+            user recipes are only searched for authenticated viewers
+        limit: Page size
+        cursor: Opaque cursor returned as 'next_cursor' by the previous page
+
+    Returns:
+        Dict with 'results' and 'next_cursor' (None on the last page)
+    """
+    positions = decode_cursor(cursor) if cursor else {}
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, filters)
+
+    jobs = [(SOURCE_GLOBAL, db[config.COLLECTION_GLOBAL_RECIPES], compiled.filter)]
+    if viewer and viewer.get('payroll_id'):
+        user_filter = {'$and': [compiled.filter, user_visibility_filter(viewer)]} \
+            if compiled.filter else user_visibility_filter(viewer)
+        jobs.append((SOURCE_USER, db[config.COLLECTION_USER_RECIPES], user_filter))
+
+    # Each source needs at most limit + 1 rows to fill the page and detect a next page
+    futures = [
+        _search_executor.submit(_fetch, collection, source, query, positions.get(source), limit + 1)
+        for source, collection, query in jobs
+    ]
+    streams = [future.result() for future in futures]
+
+    # Each stream keeps the server's order; the key only decides the interleaving
+    merged = heapq.merge(
+        *streams,
+        key=lambda doc: (title_sort_key(doc.get('title')), doc['source'], str(doc['_id']))
+    )
+    page: List[Dict] = []
+    has_more = False
+    for doc in merged:
+        if len(page) == limit:
+            has_more = True
+            break
+        page.append(doc)
+
+    next_cursor = None
+    if has_more and page:
+        for doc in page:
+            positions[doc['source']] = (doc.get('title'), doc['_id'])
+        next_cursor = encode_cursor(positions)
+
+    logger.debug(f"Federated search returned {len(page)} recipes (more: {has_more})")
+    return {'results': page, 'next_cursor': next_cursor}
@@ -0,0 +1,317 @@
+#-------------------------------------------------------------------------------#
+#                            utils/http_cache.py                                #
+#-------------------------------------------------------------------------------#
+"""
+HTTP caching for read-mostly GET endpoints.
+
+The @cached(policy) decorator
+  - computes a strong ETag from the response body (unless the view set one)
+  - answers If-None-Match / If-Modified-Since with 304 Not Modified
+  - sets Cache-Control and Vary from the endpoint's CachePolicy
+  - optionally serves repeat requests from a shared server-side response
+    cache keyed by endpoint, path and normalized query string, so identical
+    searches from different tablets skip the database entirely
+
+Response cache backends (RESPONSE_CACHE_URL):
+  - ''         : disabled (default), only client-side caching headers are emitted
+  - 'memory://': per-process LRU with TTL; an invalidation only reaches the
+                 process that made the write, so use it with a single worker
+  - 'mongo://[collection]': shared across workers; expired entries are
+                 removed by a TTL index declared in utils/index_registry.py
+
+Entries are grouped by data namespace (RECIPES_NAMESPACE, ...) and the write
+paths for that data drop the namespace after every write. product_list is
+loaded by supplier imports outside this app, so nothing here invalidates
+PRODUCTS_NAMESPACE; product endpoints use PRODUCT_POLICY, whose short TTLs
+bound how long a stale product can be served.
+
+Usage:
+    @products.route('/api/products/categories')
+    @cached(PRODUCT_POLICY, namespace=PRODUCTS_NAMESPACE)
+    def get_product_categories(): ...
+
+    response_cache.invalidate(RECIPES_NAMESPACE)    # after writes
+"""
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+import hashlib
+import logging
+import threading
+import time
+
+from bson.binary import Binary
+from flask import current_app, make_response, request
+
+logger = logging.getLogger(__name__)
+
+class CachePolicy:
+    """
+    Args:
+        max_age: Seconds clients may reuse a response without revalidating
+        public: Allow shared caches (proxies/CDN); False emits 'private'
+        stale_while_revalidate: Seconds a stale response may be served while revalidating
+        immutable: Content at this URL never changes
+        vary: Request headers that select between representations
+        shared_ttl: Seconds to keep the response in the server-side cache (0 = off)
+        ignore_args: Query parameters left out of the cache key (e.g. cache busters)
+    """
+
+    def __init__(
+        self,
+        max_age: int = 0,
+        public: bool = True,
+        stale_while_revalidate: int = 0,
+        immutable: bool = False,
+        vary: Iterable[str] = ('Accept-Encoding',),
+        shared_ttl: int = 0,
+        ignore_args: Iterable[str] = ('_',)
+    ):
+        self.max_age = max_age
+        self.public = public
+        self.stale_while_revalidate = stale_while_revalidate
+        self.immutable = immutable
+        self.vary = tuple(vary)
+        self.shared_ttl = shared_ttl
+        self.ignore_args = frozenset(ignore_args)
+        self.cache_control = self._build_cache_control()
+
+    def _build_cache_control(self) -> str:
+        directives = ['public' if self.public else 'private']
+        if self.max_age:
+            directives.append(f'max-age={self.max_age}')
+        else:
+            directives.append('no-cache')
+        if self.stale_while_revalidate:
+            directives.append(f'stale-while-revalidate={self.stale_while_revalidate}')
+        if self.immutable:
+            directives.append('immutable')
+        return ', '.join(directives)
+
+# Per-endpoint policies
+SEARCH_POLICY = CachePolicy(max_age=60, stale_while_revalidate=300, shared_ttl=60)
+CATALOG_POLICY = CachePolicy(max_age=3600, stale_while_revalidate=86400, shared_ttl=3600)
+DETAIL_POLICY = CachePolicy(max_age=300, stale_while_revalidate=3600, shared_ttl=300)
+# product_list changes outside the app (no invalidation), so only cache briefly
+PRODUCT_POLICY = CachePolicy(max_age=60, stale_while_revalidate=60, shared_ttl=60)
+# Uploaded images get a timestamped filename, so a URL never changes content
+IMAGE_POLICY = CachePolicy(max_age=31536000, immutable=True, vary=())
+
+# Data namespaces invalidated by the corresponding write paths
+RECIPES_NAMESPACE = 'recipes'
+PRODUCTS_NAMESPACE = 'products'
+ALLERGENS_NAMESPACE = 'allergens'
+
+#-------------------------------------------------------------------------------#
+#                                 Backends                                      #
+#-------------------------------------------------------------------------------#
+class MemoryResponseCacheBackend:
+    """Per-process LRU of key -> entry with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] <= time.time():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if namespace is None or e['namespace'] == namespace]
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class MongoResponseCacheBackend:
+    """Shared store: one document per key with the body as BSON binary."""
+
+    def __init__(self, get_collection: Callable):
+        self._get_collection = get_collection
+
+    def get(self, key: str) -> Optional[Dict]:
+        doc = self._get_collection().find_one({'_id': key})
+        # The TTL monitor runs once a minute, so check expiry here as well
+        if doc is None or doc['expires'] <= time.time():
+            return None
+        doc['body'] = bytes(doc['body'])
+        return doc
+
+    def set(self, key: str, entry: Dict) -> None:
+        document = dict(entry, body=Binary(entry['body']), expires_at=datetime.utcfromtimestamp(entry['expires']))
+        self._get_collection().replace_one({'_id': key}, document, upsert=True)
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        query = {} if namespace is None else {'namespace': namespace}
+        return self._get_collection().delete_many(query).deleted_count
+
+def create_response_cache_backend(cache_url: str, get_db: Optional[Callable] = None,
+                                  collection_name: str = 'response_cache', max_entries: int = 2048):
+    """
+    Build a backend from a RESPONSE_CACHE_URL value; returns None when disabled.
+    """
+    if not cache_url:
+        return None
+    if cache_url.startswith('memory://'):
+        return MemoryResponseCacheBackend(max_entries)
+    if cache_url.startswith('mongo://'):
+        if get_db is None:
+            raise ValueError("Mongo response cache requires a database")
+        collection_name = cache_url[len('mongo://'):] or collection_name
+        return MongoResponseCacheBackend(lambda: get_db()[collection_name])
+    raise ValueError(f"Unsupported response cache: {cache_url}")
+
+#-------------------------------------------------------------------------------#
+#                               ResponseCache                                   #
+#-------------------------------------------------------------------------------#
+class ResponseCache:
+    """Server-side cache of GET responses keyed by normalized request."""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    def init_app(self, app) -> None:
+        config = app.config
+        db_name = config.get('MONGO_DBNAME')
+        self.backend = create_response_cache_backend(
+            config.get('RESPONSE_CACHE_URL', 'memory://'),
+            get_db=lambda: app.config['MONGO_CLIENT'][db_name],
+            collection_name=config.get('COLLECTION_RESPONSE_CACHE', 'response_cache'),
+            max_entries=int(config.get('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+        )
+        app.extensions['response_cache'] = self
+        logger.info(f"Response cache using {type(self.backend).__name__ if self.backend else 'no backend'}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(namespace: str, path: str, args, vary_values: Tuple[str, ...] = (),
+                 ignore_args: Iterable[str] = ()) -> str:
+        """
+        Normalize the query (sorted keys, repeated values kept in order,
+        blank values and ignored params dropped) so equivalent requests
+        share an entry.
+        """
+        ignore = set(ignore_args)
+        items = sorted(
+            (k, v.strip()) for k in args.keys() if k not in ignore
+            for v in args.getlist(k) if v.strip()
+        )
+        raw = repr((namespace, path, items, tuple(vary_values)))
+        return f"{namespace}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            entry = None
+        self._stats['hits' if entry else 'misses'] += 1
+        return entry
+
+    def set(self, key: str, namespace: str, response, ttl: int) -> None:
+        try:
+            self.backend.set(key, {
+                'namespace': namespace,
+                'body': response.get_data(),
+                'status': response.status_code,
+                'mimetype': response.mimetype,
+                'etag': response.get_etag()[0],
+                'expires': time.time() + ttl
+            })
+            self._stats['stores'] += 1
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """Drop cached responses for one namespace (or all) after a write; never raises."""
+        if not self.enabled:
+            return 0
+        try:
+            return self.backend.invalidate(namespace)
+        except Exception as e:
+            logger.warning(f"Response cache invalidation of {namespace or 'all'} failed: {str(e)}")
+            return 0
+
+    def metrics(self) -> Dict:
+        return dict(self._stats)
+
+# Process-wide cache used by @cached
+response_cache = ResponseCache()
+
+#-------------------------------------------------------------------------------#
+#                                 Decorator                                     #
+#-------------------------------------------------------------------------------#
+def compute_etag(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def apply_cache_headers(response, policy: CachePolicy):
+    """Set Cache-Control/Vary and turn the response into a 304 when the client copy is current."""
+    response.headers['Cache-Control'] = policy.cache_control
+    for header in policy.vary:
+        response.vary.add(header)
+    return response.make_conditional(request)
+
+def cached(policy: CachePolicy, namespace: Optional[str] = None):
+    """
+    Apply an endpoint's cache policy: strong ETag, conditional 304 handling,
+    Cache-Control/Vary and (when policy.shared_ttl and a backend is
+    configured) the server-side response cache.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return fn(*args, **kwargs)
+
+            key = None
+            cache_namespace = namespace or request.endpoint
+            if policy.shared_ttl and response_cache.enabled:
+                vary_values = tuple(request.headers.get(h, '') for h in policy.vary if h != 'Accept-Encoding')
+                key = response_cache.make_key(cache_namespace, request.path, request.args,
+                                              vary_values, policy.ignore_args)
+                entry = response_cache.get(key)
+                if entry is not None:
+                    response = current_app.response_class(entry['body'], status=entry['status'],
+                                                          mimetype=entry['mimetype'])
+                    response.set_etag(entry['etag'])
+                    response.headers['X-Cache'] = 'HIT'
+                    return apply_cache_headers(response, policy)
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code != 200:
+                # Errors are never cached
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+
+            if not response.direct_passthrough:
+                if response.get_etag()[0] is None:
+                    response.set_etag(compute_etag(response.get_data()))
+                if key is not None:
+                    response_cache.set(key, cache_namespace, response, policy.shared_ttl)
+                    response.headers['X-Cache'] = 'MISS'
+            return apply_cache_headers(response, policy)
+        return wrapper
+    return decorator
@@ -0,0 +1,374 @@
+#-------------------------------------------------------------------------------#
+#                          utils/index_registry.py                              #
+#-------------------------------------------------------------------------------#
+"""
+Declarative index registry.
+
+Every collection the application queries declares its indexes here, next to
+each other, instead of relying on indexes someone created by hand. The
+registry is applied at deploy time (workers only apply it at startup when
+INDEX_AUTO_APPLY is set) and can be verified against the live database:
+  - missing:    declared but not present
+  - undeclared: present in Mongo but not declared here
+  - unused:     present but with zero accesses according to $indexStats
+Staging can additionally enable the profiler and report every query that
+fell back to a COLLSCAN.
+
+Prefix searches run on the normalized 'search_keys' copies maintained by
+utils/query_compiler.py; the backfill command fills them in, together with
+the ingredient -> recipe postings, for documents written outside this
+application.
+
+Usage:
+    python -m utils.index_registry apply
+    python -m utils.index_registry verify
+    python -m utils.index_registry backfill
+    python -m utils.index_registry collscans
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+import logging
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from .ingredient_index import INDEXED_AT_FIELD
+from .query_compiler import (
+    ALLERGEN_SEARCH_FIELDS,
+    CASE_INSENSITIVE_COLLATION,
+    PRODUCT_SEARCH_FIELDS,
+    RECIPE_SEARCH_FIELDS,
+    backfill_search_keys,
+    search_key_path
+)
+
+logger = logging.getLogger(__name__)
+
+class IndexSpec:
+    """
+    One declared index.
+
+    Args:
+        keys: List of (field, direction) pairs
+        unique: Enforce uniqueness
+        collation: Collation the index is built with; queries must use the
+            same collation to be able to use it
+        sparse: Skip documents that do not have the indexed field
+        expire_after_seconds: TTL for date fields
+        name: Explicit index name; defaults to Mongo's generated name
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[Tuple[str, int]],
+        unique: bool = False,
+        collation: Optional[Dict] = None,
+        sparse: bool = False,
+        expire_after_seconds: Optional[int] = None,
+        name: Optional[str] = None
+    ):
+        self.keys = list(keys)
+        self.unique = unique
+        self.collation = collation
+        self.sparse = sparse
+        self.expire_after_seconds = expire_after_seconds
+        self.name = name or '_'.join(f'{field}_{direction}' for field, direction in self.keys)
+
+    def __repr__(self) -> str:
+        return f"IndexSpec({self.name})"
+
+    def to_model(self) -> IndexModel:
+        options = {'name': self.name}
+        if self.unique:
+            options['unique'] = True
+        if self.collation:
+            options['collation'] = self.collation
+        if self.sparse:
+            options['sparse'] = True
+        if self.expire_after_seconds is not None:
+            options['expireAfterSeconds'] = self.expire_after_seconds
+        return IndexModel(self.keys, **options)
+
+def _ci(field: str) -> IndexSpec:
+    """Case-insensitive single-field index matching the query compiler's collation."""
+    return IndexSpec([(field, ASCENDING)], collation=CASE_INSENSITIVE_COLLATION, name=f'{field}_1_ci')
+
+def _search_key_indexes(fields) -> List[IndexSpec]:
+    """Simple-collation indexes on the normalized prefix-search keys."""
+    return [IndexSpec([(search_key_path(spec), ASCENDING)]) for spec in fields if spec.kind == 'prefix']
+
+def _recipe_indexes() -> List[IndexSpec]:
+    return _search_key_indexes(RECIPE_SEARCH_FIELDS) + [
+        IndexSpec([('title', ASCENDING)]),
+        IndexSpec([('title', ASCENDING), ('_id', ASCENDING)], collation=CASE_INSENSITIVE_COLLATION,
+                  name='title_1__id_1_ci'),
+        IndexSpec([('ingredients', ASCENDING)]),
+        _ci('cuisine'),
+        _ci('cookery_method'),
+        _ci('dietary'),
+        # Upsert key for utils/recipe_import.py
+        IndexSpec([('source_id', ASCENDING)], unique=True, sparse=True),
+        # Recipes still to be indexed by IngredientIndex.index_missing
+        IndexSpec([(INDEXED_AT_FIELD, ASCENDING)]),
+    ]
+
+def declared_indexes(config) -> Dict[str, List[IndexSpec]]:
+    """
+    Return the index declarations keyed by collection name.
+
+    Args:
+        config: Config class providing the collection names
+    """
+    return {
+        # ---------------------------------------#
+        #         Search collections             #
+        # ---------------------------------------#
+        config.COLLECTION_GLOBAL_RECIPES: _recipe_indexes(),
+        config.COLLECTION_USER_RECIPES: _recipe_indexes() + [
+            IndexSpec([('payroll_id', ASCENDING), ('title', ASCENDING)], collation=CASE_INSENSITIVE_COLLATION,
+                      name='payroll_id_1_title_1_ci'),
+            IndexSpec([('business_id', ASCENDING), ('visibility', ASCENDING)]),
+        ],
+        config.COLLECTION_PRODUCT_LIST: _search_key_indexes(PRODUCT_SEARCH_FIELDS) + [
+            IndexSpec([('INGREDIENT', ASCENDING)]),
+            IndexSpec([('SUPPLIER', ASCENDING)]),
+            IndexSpec([('CATEGORY', ASCENDING)]),
+        ],
+        config.COLLECTION_ALLERGENS: _search_key_indexes(ALLERGEN_SEARCH_FIELDS) + [
+            IndexSpec([('ingredient', ASCENDING)]),
+            IndexSpec([('severity', ASCENDING), ('reaction_type', ASCENDING)]),
+        ],
+        config.COLLECTION_TAGS: [_ci('name')],
+        config.COLLECTION_INGREDIENT_INDEX: [
+            IndexSpec([('source', ASCENDING), ('key', ASCENDING), ('title', ASCENDING)]),
+            IndexSpec([('source', ASCENDING), ('tokens', ASCENDING), ('title', ASCENDING)]),
+            IndexSpec([('source', ASCENDING), ('recipe_id', ASCENDING), ('key', ASCENDING)], unique=True),
+        ],
+        config.COLLECTION_ALLERGEN_IMPACT: [
+            IndexSpec([('created_at', ASCENDING)],
+                      expire_after_seconds=getattr(config, 'ALLERGEN_IMPACT_TTL_DAYS', 7) * 86400),
+            IndexSpec([('allergen_id', ASCENDING)]),
+            IndexSpec([('seq', ASCENDING)], unique=True),
+        ],
+        # ---------------------------------------#
+        #          Lookup collections            #
+        # ---------------------------------------#
+        'cuisine': [_ci('name')],
+        'method': [_ci('name')],
+        'dietary': [_ci('name')],
+        'mealtype': [_ci('name')],
+        # ---------------------------------------#
+        #          Operational collections       #
+        # ---------------------------------------#
+        config.COLLECTION_RATE_LIMITS: [
+            IndexSpec([('expires_at', ASCENDING)], expire_after_seconds=0),
+        ],
+        config.COLLECTION_TOKEN_REVOCATIONS: [
+            IndexSpec([('expires_at', ASCENDING)], expire_after_seconds=0),
+            IndexSpec([('revoked_at', ASCENDING)]),
+        ],
+        config.COLLECTION_RESPONSE_CACHE: [
+            IndexSpec([('expires_at', ASCENDING)], expire_after_seconds=0),
+            IndexSpec([('namespace', ASCENDING)]),
+        ],
+        # ---------------------------------------#
+        #         Business collections           #
+        # ---------------------------------------#
+        config.COLLECTION_BUSINESSES: [
+            IndexSpec([('business_id', ASCENDING)], unique=True),
+            IndexSpec([('admin_user_id', ASCENDING)]),
+            IndexSpec([('venues.venue_id', ASCENDING)]),
+            IndexSpec([('venues.work_areas.work_area_id', ASCENDING)]),
+        ],
+        config.COLLECTION_BUSINESS_USERS: [
+            IndexSpec([('business_id', ASCENDING), ('user_id', ASCENDING)], unique=True),
+            IndexSpec([('payroll_id', ASCENDING), ('business_id', ASCENDING)]),
+        ],
+        config.COLLECTION_BUSINESS_ROLES: [
+            IndexSpec([('business_id', ASCENDING), ('role_name', ASCENDING)], unique=True),
+        ],
+    }
+
+def search_collections(config) -> Dict[str, Tuple]:
+    """Collections searched through the query compiler, with their field specs."""
+    return {
+        config.COLLECTION_GLOBAL_RECIPES: RECIPE_SEARCH_FIELDS,
+        config.COLLECTION_USER_RECIPES: RECIPE_SEARCH_FIELDS,
+        config.COLLECTION_PRODUCT_LIST: PRODUCT_SEARCH_FIELDS,
+        config.COLLECTION_ALLERGENS: ALLERGEN_SEARCH_FIELDS,
+    }
+
+#-------------------------------------------------------------------------------#
+#                               Apply / verify                                  #
+#-------------------------------------------------------------------------------#
+def apply_indexes(db, config, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """
+    Create every declared index (idempotent).
+
+    Args:
+        db: MongoDB database instance
+        config: Config class providing the collection names
+        collections: Optional subset of collection names to apply
+
+    Returns:
+        Mapping of collection name to the index names ensured
+    """
+    registry = declared_indexes(config)
+    wanted = set(collections) if collections is not None else set(registry)
+    applied: Dict[str, List[str]] = {}
+    for name, specs in registry.items():
+        if name not in wanted or not specs:
+            continue
+        try:
+            applied[name] = db[name].create_indexes([spec.to_model() for spec in specs])
+            logger.info(f"Indexes ensured on {name}: {', '.join(applied[name])}")
+        except OperationFailure as e:
+            logger.error(f"Failed to create indexes on {name}: {str(e)}")
+            raise
+    return applied
+
+def apply_search_keys(db, config, force: bool = False) -> Dict[str, int]:
+    """
+    Backfill the normalized prefix-search keys of every search collection
+    (idempotent; only documents without keys are touched unless force=True).
+
+    Returns:
+        Mapping of collection name to the number of documents updated
+    """
+    return {name: backfill_search_keys(db[name], specs, force=force)
+            for name, specs in search_collections(config).items()}
+
+def verify_indexes(db, config, check_usage: bool = True) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Compare declared indexes with the live database.
+
+    Args:
+        db: MongoDB database instance
+        config: Config class providing the collection names
+        check_usage: Also report indexes with no accesses in $indexStats
+
+    Returns:
+        Mapping of collection name to {'missing', 'undeclared', 'unused'}
+    """
+    report: Dict[str, Dict[str, List[str]]] = {}
+    for name, specs in declared_indexes(config).items():
+        declared = {spec.name for spec in specs}
+        existing = set(db[name].index_information()) - {'_id_'}
+        unused: List[str] = []
+        if check_usage and existing:
+            try:
+                stats = db[name].aggregate([{'$indexStats': {}}])
+                unused = sorted(
+                    s['name'] for s in stats
+                    if s['name'] != '_id_' and s.get('accesses', {}).get('ops', 0) == 0
+                )
+            except OperationFailure as e:
+                logger.warning(f"$indexStats unavailable for {name}: {str(e)}")
+
+        report[name] = {
+            'missing': sorted(declared - existing),
+            'undeclared': sorted(existing - declared),
+            'unused': unused
+        }
+        if report[name]['missing']:
+            logger.warning(f"Missing indexes on {name}: {', '.join(report[name]['missing'])}")
+        if report[name]['undeclared']:
+            logger.info(f"Undeclared indexes on {name}: {', '.join(report[name]['undeclared'])}")
+        if report[name]['unused']:
+            logger.info(f"Unused indexes on {name}: {', '.join(report[name]['unused'])}")
+    return report
+
+#-------------------------------------------------------------------------------#
+#                          COLLSCAN detection (staging)                         #
+#-------------------------------------------------------------------------------#
+def enable_collscan_profiling(db, slow_ms: int = 0) -> None:
+    """
+    Turn on the database profiler so COLLSCANs are recorded in system.profile.
+    Intended for staging only: level 2 with slow_ms=0 records every operation.
+    """
+    level = 2 if slow_ms == 0 else 1
+    db.command('profile', level, slowms=slow_ms)
+    logger.info(f"Database profiler enabled (level {level}, slowms {slow_ms})")
+
+def find_collscans(db, since: Optional[datetime] = None, limit: int = 100) -> List[Dict]:
+    """
+    Summarise profiled operations that scanned a whole collection.
+
+    Args:
+        db: MongoDB database instance
+        since: Only consider operations after this time (default: last hour)
+        limit: Maximum number of query shapes to return
+
+    Returns:
+        List of {'ns', 'filter_fields', 'count', 'max_millis', 'docs_examined'}
+        ordered by count, one entry per namespace/filter-shape
+    """
+    since = since or datetime.utcnow() - timedelta(hours=1)
+    pipeline = [
+        {'$match': {'planSummary': 'COLLSCAN', 'ts': {'$gte': since}, 'ns': {'$not': {'$regex': r'\.system\.'}}}},
+        {'$project': {
+            'ns': 1,
+            'millis': 1,
+            'docsExamined': 1,
+            'filter_fields': {'$map': {
+                'input': {'$objectToArray': {'$ifNull': ['$command.filter', {}]}},
+                'as': 'f',
+                'in': '$$f.k'
+            }}
+        }},
+        {'$group': {
+            '_id': {'ns': '$ns', 'filter_fields': '$filter_fields'},
+            'count': {'$sum': 1},
+            'max_millis': {'$max': '$millis'},
+            'docs_examined': {'$max': '$docsExamined'}
+        }},
+        {'$sort': {'count': -1}},
+        {'$limit': limit}
+    ]
+    findings = [
+        {
+            'ns': row['_id']['ns'],
+            'filter_fields': row['_id']['filter_fields'],
+            'count': row['count'],
+            'max_millis': row['max_millis'],
+            'docs_examined': row['docs_examined']
+        }
+        for row in db['system.profile'].aggregate(pipeline)
+    ]
+    for finding in findings:
+        logger.warning(
+            f"COLLSCAN on {finding['ns']} filtering {finding['filter_fields']} "
+            f"({finding['count']}x, max {finding['max_millis']}ms)"
+        )
+    return findings
+
+if __name__ == "__main__":
+    # Deploy-time entry point
+    import json
+    import sys
+    from pymongo import MongoClient
+    from config import Config
+
+    logging.basicConfig(level=Config.LOG_LEVEL)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    database = MongoClient(Config.MONGO_URI)[Config.MONGO_DBNAME]
+
+    if command == 'apply':
+        result = apply_indexes(database, Config)
+    elif command == 'verify':
+        result = verify_indexes(database, Config)
+    elif command == 'backfill':
+        from .ingredient_index import ingredient_index
+        result = apply_search_keys(database, Config, force='--force' in sys.argv)
+        ingredient_index.collection_name = Config.COLLECTION_INGREDIENT_INDEX
+        result['ingredient_postings'] = {
+            source: ingredient_index.index_missing(database, source)
+            for source in (Config.COLLECTION_GLOBAL_RECIPES, Config.COLLECTION_USER_RECIPES)
+        }
+    elif command == 'collscans':
+        result = find_collscans(database)
+    else:
+        sys.exit(f"Unknown command: {command} (expected apply, verify, backfill or collscans)")
+    print(json.dumps(result, indent=2, default=str))
+    if command == 'verify' and any(r['missing'] for r in result.values()):
+        sys.exit(1)
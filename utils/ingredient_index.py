@@ -0,0 +1,266 @@
+#-------------------------------------------------------------------------------#
+#                          utils/ingredient_index.py                            #
+#-------------------------------------------------------------------------------#
+"""
+Materialized ingredient -> recipe inverted index.
+
+One posting document per (recipe, ingredient) pair:
+    {source, recipe_id, key, tokens, ingredient, title, cuisine, updated_at}
+where key is the normalized ingredient name (utils/ingredient_resolver.py)
+and tokens its words. Postings carry the recipe summary, so "which recipes
+use X?" is a single indexed query with no recipe fetch:
+  - exact:  the normalized name
+  - tokens: every word of the query is a word of the ingredient; words are
+            de-pluralized, so 'egg' finds 'eggs' and 'flour' 'plain flour'
+  - prefix: every word of the query starts a word of the ingredient
+            ('pea' finds 'peanuts', 'egg' finds 'eggplant'). Mid-word text
+            such as 'gg' matches in neither mode, unlike the old substring
+            regex.
+
+Indexed recipes are stamped with INDEXED_AT_FIELD. Recipes written outside
+the importer carry no stamp and are picked up by index_missing, which runs
+at startup with the index registry, or from the CLI:
+    python -m utils.ingredient_index sync [--collection global_recipes]
+    python -m utils.ingredient_index rebuild [--collection global_recipes]
+    python -m utils.ingredient_index lookup "plain flour"
+Recipes whose ingredients are edited by other services are only re-indexed
+by rebuild.
+"""
+from typing import Dict, Iterable, List, Optional, Set
+from datetime import datetime
+import argparse
+import json
+import logging
+
+import re
+
+from pymongo.errors import BulkWriteError
+
+from .ingredient_resolver import normalize_name
+
+logger = logging.getLogger(__name__)
+
+INDEX_PROJECTION = {'title': 1, 'cuisine': 1, 'ingredients': 1, 'ingredient_lines': 1}
+LOOKUP_MODES = ('exact', 'tokens', 'prefix')
+# Set on recipes whose postings have been written
+INDEXED_AT_FIELD = 'ingredients_indexed_at'
+DUPLICATE_KEY = 11000
+
+def recipe_ingredients(recipe: Dict) -> Dict[str, str]:
+    """Normalized key -> display name for every ingredient a recipe uses."""
+    names: List[str] = []
+    for value in recipe.get('ingredients') or []:
+        if isinstance(value, dict):
+            value = value.get('ingredient') or value.get('name')
+        if value:
+            names.append(str(value))
+    for line in recipe.get('ingredient_lines') or []:
+        for value in (line.get('ingredient'), line.get('name')):
+            if value:
+                names.append(str(value))
+
+    keys: Dict[str, str] = {}
+    for name in names:
+        key = normalize_name(name)
+        if key:
+            keys.setdefault(key, name)
+    return keys
+
+class IngredientIndex:
+    """
+    Args:
+        collection_name: Collection holding the postings
+    """
+
+    def __init__(self, collection_name: str = 'ingredient_recipe_index'):
+        self.collection_name = collection_name
+
+    def init_app(self, app) -> None:
+        self.collection_name = app.config.get('COLLECTION_INGREDIENT_INDEX', self.collection_name)
+        app.extensions['ingredient_index'] = self
+
+    def _postings(self, source: str, recipe: Dict, now: datetime) -> List[Dict]:
+        cuisine = recipe.get('cuisine')
+        return [{
+            'source': source,
+            'recipe_id': recipe['_id'],
+            'key': key,
+            'tokens': sorted(set(key.split())),
+            'ingredient': name,
+            'title': recipe.get('title'),
+            'cuisine': cuisine if isinstance(cuisine, list) else ([cuisine] if cuisine else []),
+            'updated_at': now
+        } for key, name in recipe_ingredients(recipe).items()]
+
+    #-------------------------------------------------------------------------------#
+    #                                  Writes                                       #
+    #-------------------------------------------------------------------------------#
+    def index_recipes(self, db, source: str, recipes: Iterable[Dict]) -> int:
+        """
+        Replace the postings of the given recipes (documents must include _id
+        and the INDEX_PROJECTION fields) and stamp the recipes as indexed.
+
+        Returns:
+            Number of postings written
+        """
+        now = datetime.utcnow()
+        recipe_ids = []
+        postings = []
+        for recipe in recipes:
+            recipe_ids.append(recipe['_id'])
+            postings.extend(self._postings(source, recipe, now))
+        if not recipe_ids:
+            return 0
+        collection = db[self.collection_name]
+        collection.delete_many({'source': source, 'recipe_id': {'$in': recipe_ids}})
+        written = len(postings)
+        if postings:
+            try:
+                collection.insert_many(postings, ordered=False)
+            except BulkWriteError as e:
+                # Another worker indexing the same recipes wrote these postings first
+                errors = e.details.get('writeErrors', [])
+                if any(error.get('code') != DUPLICATE_KEY for error in errors):
+                    raise
+                written -= len(errors)
+        db[source].update_many({'_id': {'$in': recipe_ids}}, {'$set': {INDEXED_AT_FIELD: now}})
+        return written
+
+    def index_recipe(self, db, source: str, recipe: Dict) -> int:
+        return self.index_recipes(db, source, [recipe])
+
+    def remove_recipes(self, db, source: str, recipe_ids: Iterable) -> int:
+        result = db[self.collection_name].delete_many({'source': source, 'recipe_id': {'$in': list(recipe_ids)}})
+        return result.deleted_count
+
+    def _index_query(self, db, source: str, query: Dict, batch_size: int) -> Dict[str, int]:
+        recipes = postings = 0
+        batch: List[Dict] = []
+        for recipe in db[source].find(query, INDEX_PROJECTION, batch_size=batch_size):
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                postings += self.index_recipes(db, source, batch)
+                recipes += len(batch)
+                batch = []
+        if batch:
+            postings += self.index_recipes(db, source, batch)
+            recipes += len(batch)
+        return {'recipes': recipes, 'postings': postings}
+
+    def rebuild(self, db, source: str, batch_size: int = 1000) -> Dict[str, int]:
+        """Drop and rebuild every posting of one recipe collection."""
+        db[self.collection_name].delete_many({'source': source})
+        result = self._index_query(db, source, {}, batch_size)
+        logger.info(f"Rebuilt ingredient index for {source}: {result['recipes']} recipes, "
+                    f"{result['postings']} postings")
+        return result
+
+    def index_missing(self, db, source: str, batch_size: int = 1000) -> Dict[str, int]:
+        """Index the recipes that have never been indexed (idempotent)."""
+        result = self._index_query(db, source, {INDEXED_AT_FIELD: None}, batch_size)
+        if result['recipes']:
+            logger.info(f"Indexed {result['recipes']} unindexed recipes in {source} "
+                        f"({result['postings']} postings)")
+        return result
+
+    def has_postings(self, db, source: str) -> bool:
+        return db[self.collection_name].find_one({'source': source}, {'_id': 1}) is not None
+
+    #-------------------------------------------------------------------------------#
+    #                                  Reads                                        #
+    #-------------------------------------------------------------------------------#
+    def _query(self, source: str, ingredient_name: str, mode: str) -> Optional[Dict]:
+        key = normalize_name(ingredient_name)
+        if not key:
+            return None
+        tokens = sorted(set(key.split()))
+        if mode == 'tokens':
+            return {'source': source, 'tokens': tokens[0] if len(tokens) == 1 else {'$all': tokens}}
+        if mode == 'prefix':
+            # Anchored, case-sensitive regexes on the normalized tokens use index bounds
+            clauses = [{'tokens': {'$regex': f'^{re.escape(token)}'}} for token in tokens]
+            return dict(clauses[0], source=source) if len(clauses) == 1 else {'source': source, '$and': clauses}
+        return {'source': source, 'key': key}
+
+    def recipe_ids(self, db, ingredient_name: str, source: str = 'global_recipes', mode: str = 'exact') -> List:
+        """Distinct recipe ids using an ingredient."""
+        query = self._query(source, ingredient_name, mode)
+        if query is None:
+            return []
+        seen: Set = set()
+        ids = []
+        for posting in db[self.collection_name].find(query, {'_id': 0, 'recipe_id': 1}):
+            if posting['recipe_id'] not in seen:
+                seen.add(posting['recipe_id'])
+                ids.append(posting['recipe_id'])
+        return ids
+
+    def lookup(self, db, ingredient_name: str, source: str = 'global_recipes', mode: str = 'exact',
+               limit: Optional[int] = None) -> Dict:
+        """
+        Recipes using an ingredient, from one indexed query.
+
+        Args:
+            db: MongoDB database instance
+            ingredient_name: Ingredient or product name
+            source: Recipe collection the postings were built from
+            mode: 'exact' normalized name, 'tokens' (every word must appear) or
+                'prefix' (every word must start a word of the ingredient)
+            limit: Maximum number of recipe summaries returned (count is always complete)
+
+        Returns:
+            Dict with 'ingredient', 'key', 'count', 'ingredients' (matched
+            names with their recipe counts) and 'recipes' summaries
+        """
+        query = self._query(source, ingredient_name, mode)
+        result = {'ingredient': ingredient_name, 'key': normalize_name(ingredient_name),
+                  'count': 0, 'ingredients': {}, 'recipes': []}
+        if query is None:
+            return result
+
+        projection = {'_id': 0, 'recipe_id': 1, 'ingredient': 1, 'title': 1, 'cuisine': 1}
+        recipes: Dict = {}
+        matched: Dict[str, int] = {}
+        for posting in db[self.collection_name].find(query, projection).sort('title', 1):
+            matched[posting['ingredient']] = matched.get(posting['ingredient'], 0) + 1
+            summary = recipes.get(posting['recipe_id'])
+            if summary is None:
+                recipes[posting['recipe_id']] = {
+                    'recipe_id': str(posting['recipe_id']),
+                    'title': posting.get('title'),
+                    'cuisine': posting.get('cuisine', []),
+                    'matched': [posting['ingredient']]
+                }
+            elif posting['ingredient'] not in summary['matched']:
+                summary['matched'].append(posting['ingredient'])
+
+        summaries = list(recipes.values())
+        result.update(count=len(summaries), ingredients=matched,
+                      recipes=summaries[:limit] if limit is not None else summaries)
+        return result
+
+# Process-wide index registered in app.create_app
+ingredient_index = IngredientIndex()
+
+if __name__ == "__main__":
+    from pymongo import MongoClient
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Maintain the ingredient -> recipe index")
+    parser.add_argument('command', choices=['sync', 'rebuild', 'lookup'])
+    parser.add_argument('ingredient', nargs='?')
+    parser.add_argument('--collection', default=Config.COLLECTION_GLOBAL_RECIPES)
+    parser.add_argument('--mode', choices=LOOKUP_MODES, default='exact')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    database = MongoClient(Config.MONGO_URI)[Config.MONGO_DBNAME]
+    ingredient_index.collection_name = Config.COLLECTION_INGREDIENT_INDEX
+    if args.command == 'sync':
+        print(json.dumps(ingredient_index.index_missing(database, args.collection)))
+    elif args.command == 'rebuild':
+        print(json.dumps(ingredient_index.rebuild(database, args.collection)))
+    else:
+        if not args.ingredient:
+            parser.error("lookup requires an ingredient")
+        print(json.dumps(ingredient_index.lookup(database, args.ingredient, args.collection, args.mode), indent=2))
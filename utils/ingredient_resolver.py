@@ -0,0 +1,235 @@
+#-------------------------------------------------------------------------------#
+#                        utils/ingredient_resolver.py                           #
+#-------------------------------------------------------------------------------#
+"""
+Fuzzy ingredient matching against product_list.
+
+The resolver loads every product name once, normalises it (lowercase, strip
+punctuation, de-pluralise each token) and indexes it three ways:
+  - exact normalized name -> rows
+  - token set key (sorted unique tokens) -> rows
+  - character trigram -> rows
+Lookups never touch Mongo and never compile user text into a regex, so a
+recipe import resolves every line against the in-memory index.
+
+Usage:
+    resolver = get_ingredient_resolver(db)
+    resolver.resolve('Tomatoes')            # ranked candidates
+    resolver.resolve_many(['tomato', 'basil leaves'])
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from collections import defaultdict
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r'[^a-z0-9 ]+')
+_SPACES = re.compile(r'\s+')
+# Each candidate token the query does not mention costs this much, so a more
+# specific product ('tomato paste') never clears the best_match threshold for
+# a generic query ('tomato') on trigram overlap alone
+EXTRA_TOKEN_PENALTY = 0.25
+
+#-------------------------------------------------------------------------------#
+#                              Normalization                                    #
+#-------------------------------------------------------------------------------#
+def singularize(token: str) -> str:
+    """Cheap English de-pluralization for ingredient tokens."""
+    if len(token) <= 3 or token.endswith('ss'):
+        return token
+    if token.endswith('ies'):
+        return token[:-3] + 'y'
+    if token.endswith('oes') or token.endswith('ches') or token.endswith('shes') or token.endswith('xes'):
+        return token[:-2]
+    if token.endswith('s') and not token.endswith('us'):
+        return token[:-1]
+    return token
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip punctuation and de-pluralize every token."""
+    cleaned = _SPACES.sub(' ', _NON_WORD.sub(' ', str(name or '').lower())).strip()
+    return ' '.join(singularize(token) for token in cleaned.split(' ') if token)
+
+def token_key(normalized: str) -> str:
+    """Order-insensitive key: 'paste tomato' and 'tomato paste' collide."""
+    return ' '.join(sorted(set(normalized.split())))
+
+def trigrams(normalized: str) -> Set[str]:
+    """Character trigrams of a normalized name, padded at word boundaries."""
+    padded = f'  {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance that gives up once max_distance is exceeded.
+
+    Returns:
+        The distance, or max_distance + 1 if it is larger than the bound
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+#-------------------------------------------------------------------------------#
+#                                 Resolver                                      #
+#-------------------------------------------------------------------------------#
+class IngredientResolver:
+    """
+    In-memory normalized-name index over product_list documents.
+    """
+
+    def __init__(self, products: Iterable[Dict]):
+        self.products: List[Dict] = []
+        self.normalized: List[str] = []
+        self.exact: Dict[str, List[int]] = defaultdict(list)
+        self.by_tokens: Dict[str, List[int]] = defaultdict(list)
+        self.by_trigram: Dict[str, List[int]] = defaultdict(list)
+        self.built_at = time.time()
+
+        for product in products:
+            name = product.get('INGREDIENT')
+            if not name:
+                continue
+            row = len(self.products)
+            normalized = normalize_name(name)
+            self.products.append(product)
+            self.normalized.append(normalized)
+            self.exact[normalized].append(row)
+            self.by_tokens[token_key(normalized)].append(row)
+            for gram in trigrams(normalized):
+                self.by_trigram[gram].append(row)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _candidate(self, row: int, score: float, match: str) -> Dict:
+        product = self.products[row]
+        return {
+            'INGREDIENT': product.get('INGREDIENT'),
+            'SUPPLIER': product.get('SUPPLIER', '-'),
+            'score': round(score, 4),
+            'match': match,
+            'product': product
+        }
+
+    def resolve(
+        self,
+        ingredient_name: str,
+        limit: int = 5,
+        min_score: float = 0.35,
+        max_edit_distance: int = 2
+    ) -> List[Dict]:
+        """
+        Rank product candidates for a free-text ingredient name.
+
+        Exact normalized matches score 1.0, token-set matches 0.95, and the
+        rest blend trigram Jaccard similarity with containment in both
+        directions (the smaller of query-in-candidate and candidate-in-query),
+        minus EXTRA_TOKEN_PENALTY for every token the candidate adds
+        ('tomato' vs 'tomato paste'), and boost those within a small edit
+        distance (typos).
+
+        Args:
+            ingredient_name: User-entered ingredient text
+            limit: Maximum number of candidates to return
+            min_score: Candidates scoring below this are dropped
+            max_edit_distance: Upper bound for the typo-tolerance check, scaled
+                down for short names (one edit per five characters)
+
+        Returns:
+            List of candidate dicts ordered best first
+        """
+        normalized = normalize_name(ingredient_name)
+        if not normalized:
+            return []
+
+        scored: Dict[int, Tuple[float, str]] = {}
+        for row in self.exact.get(normalized, ()):
+            scored[row] = (1.0, 'exact')
+        for row in self.by_tokens.get(token_key(normalized), ()):
+            scored.setdefault(row, (0.95, 'tokens'))
+
+        if len(scored) < limit:
+            query_grams = trigrams(normalized)
+            overlap: Dict[int, int] = defaultdict(int)
+            for gram in query_grams:
+                for row in self.by_trigram.get(gram, ()):
+                    overlap[row] += 1
+
+            query_tokens = set(normalized.split())
+            typo_bound = min(max_edit_distance, len(normalized) // 5)
+            for row, shared in overlap.items():
+                if row in scored:
+                    continue
+                candidate = self.normalized[row]
+                candidate_grams = len(trigrams(candidate))
+                jaccard = shared / (len(query_grams) + candidate_grams - shared)
+                containment = min(shared / len(query_grams), shared / candidate_grams)
+                extra_tokens = set(candidate.split()) - query_tokens
+                score = 0.5 * jaccard + 0.5 * containment - EXTRA_TOKEN_PENALTY * len(extra_tokens)
+                if typo_bound and bounded_edit_distance(normalized, candidate, typo_bound) <= typo_bound:
+                    score = max(score, 0.9)
+                if score >= min_score:
+                    scored[row] = (min(score, 0.9), 'fuzzy')
+
+        ranked = sorted(
+            scored.items(),
+            key=lambda item: (-item[1][0], len(self.normalized[item[0]]))
+        )[:limit]
+        return [self._candidate(row, score, match) for row, (score, match) in ranked]
+
+    def best_match(self, ingredient_name: str, min_score: float = 0.6) -> Optional[Dict]:
+        """Return the top candidate if it clears min_score, otherwise None."""
+        candidates = self.resolve(ingredient_name, limit=1, min_score=min_score)
+        return candidates[0] if candidates else None
+
+    def resolve_many(self, ingredient_names: Iterable[str], limit: int = 3) -> Dict[str, List[Dict]]:
+        """Resolve a batch of names (e.g. every line of an imported recipe)."""
+        results: Dict[str, List[Dict]] = {}
+        for name in ingredient_names:
+            if name not in results:
+                results[name] = self.resolve(name, limit=limit)
+        return results
+
+    @classmethod
+    def from_db(cls, db) -> 'IngredientResolver':
+        """Build a resolver from product_list with a single projected query."""
+        projection = {'INGREDIENT': 1, 'SUPPLIER': 1, 'PU': 1, 'PUC': 1, 'RU': 1, 'RUC': 1}
+        resolver = cls(db.product_list.find({}, projection))
+        logger.info(f"Ingredient resolver indexed {len(resolver)} products")
+        return resolver
+
+_resolver_lock = threading.Lock()
+_resolvers: Dict[object, IngredientResolver] = {}
+
+def get_ingredient_resolver(db, max_age_seconds: int = 600, refresh: bool = False) -> IngredientResolver:
+    """
+    Return the cached resolver for a database, rebuilding it when stale.
+
+    Args:
+        db: MongoDB database instance (the cache key)
+        max_age_seconds: Rebuild the index after this many seconds
+        refresh: Force a rebuild (e.g. after a product_list import)
+    """
+    with _resolver_lock:
+        resolver = _resolvers.get(db)
+        if refresh or resolver is None or time.time() - resolver.built_at > max_age_seconds:
+            resolver = _resolvers[db] = IngredientResolver.from_db(db)
+        return resolver
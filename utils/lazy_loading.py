@@ -0,0 +1,237 @@
+#-------------------------------------------------------------------------------#
+#                          utils/lazy_loading.py                                #
+#-------------------------------------------------------------------------------#
+"""
+Lazy loading mode (LAZY_LOADING=true) for faster worker boot and test startup.
+
+  - utils/__init__.py resolves its re-exports on first attribute access
+    instead of importing every utils submodule up front (lazy_exports)
+  - rarely used blueprints listed in LAZY_BLUEPRINTS are mounted with
+    LazyBlueprints and imported on the first request under their URL prefix
+
+Only the standard library is imported here so utils/__init__.py can use it
+without defeating the point.
+"""
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+import ast
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Characters url_for leaves unquoted in an _anchor
+_ANCHOR_SAFE = "%!#$&'()*+,/:;=?@"
+
+def lazy_loading_enabled(app=None) -> bool:
+    """
+    Whether lazy loading is on for app (its LAZY_LOADING setting). Without an
+    app, e.g. from utils/__init__.py at import time, the environment is read.
+    """
+    if app is not None:
+        return bool(app.config.get('LAZY_LOADING', False))
+    return os.getenv('LAZY_LOADING', 'False').lower() in ['true', '1']
+
+#-------------------------------------------------------------------------------#
+#                          Lazy package re-exports                              #
+#-------------------------------------------------------------------------------#
+def lazy_exports(package: str, init_file: str) -> Tuple[Callable, Callable]:
+    """
+    Build module-level __getattr__/__dir__ for a package whose __init__ holds
+    its re-exports as `from .submodule import name` statements. The statements
+    are read from the source instead of executed, and each submodule is only
+    imported when one of its names is first accessed.
+    """
+    with open(init_file, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    exports: Dict[str, str] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 1 and node.module:
+            for alias in node.names:
+                exports[alias.asname or alias.name] = node.module
+    module = sys.modules[package]
+
+    def __getattr__(name: str):
+        submodule = exports.get(name)
+        if submodule is None:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+        value = getattr(importlib.import_module(f'.{submodule}', package), name)
+        setattr(module, name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(module)) | set(exports))
+
+    return __getattr__, __dir__
+
+#-------------------------------------------------------------------------------#
+#                             Lazy blueprints                                   #
+#-------------------------------------------------------------------------------#
+def parse_lazy_blueprints(raw: str) -> Dict[str, str]:
+    """Parse LAZY_BLUEPRINTS ('/finance=routes.finance_routes:finance,...')."""
+    mounts = {}
+    for item in (raw or '').split(','):
+        if '=' in item:
+            prefix, target = item.split('=', 1)
+            if prefix.strip() and ':' in target:
+                mounts['/' + prefix.strip().strip('/')] = target.strip()
+    return mounts
+
+def load_blueprint(target: str):
+    """Import and return the blueprint named by '<module>:<attribute>'."""
+    module_name, attr = target.split(':', 1)
+    return getattr(importlib.import_module(module_name), attr)
+
+def _module_exists(module_name: str) -> bool:
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ImportError:
+        return False
+
+def _build_url(url_map, script_name: str, endpoint: str, values: Dict) -> Optional[str]:
+    """
+    Build endpoint against another app's url_map, as url_for would for the
+    current request (or for SERVER_NAME outside one). Returns None when there
+    is no request and no SERVER_NAME to build against.
+    """
+    from flask import current_app, has_request_context, request
+
+    values = dict(values)
+    anchor = values.pop('_anchor', None)
+    method = values.pop('_method', None)
+    scheme = values.pop('_scheme', None)
+    external = values.pop('_external', None)
+    if has_request_context():
+        server_name, url_scheme = request.host, request.scheme
+        if external is None:
+            external = scheme is not None
+    else:
+        server_name = current_app.config.get('SERVER_NAME')
+        if not server_name:
+            return None
+        url_scheme = current_app.config.get('PREFERRED_URL_SCHEME', 'http')
+        if external is None:
+            external = True
+    adapter = url_map.bind(server_name, script_name=script_name or '/', url_scheme=url_scheme)
+    rv = adapter.build(endpoint, values, method=method, url_scheme=scheme, force_external=external)
+    if anchor is not None:
+        rv = f"{rv}#{quote(anchor, safe=_ANCHOR_SAFE)}"
+    return rv
+
+class LazyBlueprints:
+    """
+    WSGI middleware that defers importing blueprints until the first request
+    under their URL prefix.
+
+    Each deferred blueprint is registered on a child Flask app that shares the
+    parent's config object (settings added later, e.g. MONGO_CLIENT from the
+    post-fork hook, are seen by both), extensions and request hooks (CSRF,
+    CSP, request ids), so handlers behave as if registered on the main app. url_for works across the
+    boundary in both directions: each side falls back to the other's url_map
+    when an endpoint is not its own. The mount prefix must match the
+    blueprint's own url_prefix; mounts whose module cannot be found are
+    skipped with a warning.
+
+    Usage:
+        app.wsgi_app = LazyBlueprints(app, {'/finance': 'routes.finance_routes:finance'})
+    """
+
+    def __init__(self, app, mounts: Dict[str, str]):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        available = {}
+        for prefix, target in mounts.items():
+            if _module_exists(target.split(':', 1)[0]):
+                available[prefix] = target
+            else:
+                logger.warning(f"Lazy blueprint {target} not found, {prefix} not mounted")
+        self.mounts = dict(sorted(available.items(), key=lambda item: len(item[0]), reverse=True))
+        self._loaded: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        app.url_build_error_handlers.append(self._build_deferred_url)
+
+    def _build(self, prefix: str):
+        from flask import Flask
+
+        started = time.perf_counter()
+        blueprint = load_blueprint(self.mounts[prefix])
+        if blueprint.url_prefix and blueprint.url_prefix.rstrip('/') != prefix:
+            logger.warning(f"Lazy blueprint {self.mounts[prefix]} has url_prefix {blueprint.url_prefix} "
+                           f"but is mounted at {prefix}")
+
+        parent = self.app
+        child = Flask(parent.import_name, static_folder=None, template_folder=parent.template_folder,
+                      root_path=parent.root_path)
+        child.config = parent.config
+        child.extensions = parent.extensions
+        child.json = parent.json
+        for registry in ('before_request_funcs', 'after_request_funcs', 'teardown_request_funcs'):
+            getattr(child, registry)[None] = list(getattr(parent, registry).get(None, []))
+        child.teardown_appcontext_funcs = list(parent.teardown_appcontext_funcs)
+        for code, handlers in parent.error_handler_spec[None].items():
+            child.error_handler_spec[None][code].update(handlers)
+        # Mounted under the prefix, so routes are relative to it
+        child.register_blueprint(blueprint, url_prefix='')
+        child.url_build_error_handlers.append(
+            lambda error, endpoint, values: self._build_parent_url(prefix, endpoint, values))
+
+        logger.info(f"Lazy blueprint {self.mounts[prefix]} loaded in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        return child
+
+    def _child(self, prefix: str):
+        child = self._loaded.get(prefix)
+        if child is None:
+            with self._lock:
+                child = self._loaded.get(prefix)
+                if child is None:
+                    child = self._loaded[prefix] = self._build(prefix)
+        return child
+
+    def _resolve(self, path: str) -> Tuple[Optional[str], Optional[Callable]]:
+        for prefix in self.mounts:
+            if path == prefix or path.startswith(prefix + '/'):
+                return prefix, self._child(prefix).wsgi_app
+        return None, None
+
+    def _script_root(self) -> str:
+        from flask import has_request_context, request
+
+        if has_request_context():
+            return request.script_root
+        return (self.app.config.get('APPLICATION_ROOT') or '/').rstrip('/')
+
+    def _build_parent_url(self, prefix: str, endpoint: str, values: Dict) -> Optional[str]:
+        """url_for from a deferred blueprint to a route of the main app."""
+        script_root = self._script_root()
+        if script_root.endswith(prefix):
+            script_root = script_root[:-len(prefix)]
+        return _build_url(self.app.url_map, script_root, endpoint, values)
+
+    def _build_deferred_url(self, error, endpoint: str, values: Dict) -> Optional[str]:
+        """url_for from the main app to a deferred blueprint, loading it if needed."""
+        for prefix in self.mounts:
+            child = self._child(prefix)
+            if endpoint in child.view_functions:
+                return _build_url(child.url_map, self._script_root() + prefix, endpoint, values)
+        return None
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        prefix, handler = self._resolve(path)
+        if handler is None:
+            return self.wsgi_app(environ, start_response)
+        environ = dict(environ)
+        environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + prefix
+        environ['PATH_INFO'] = path[len(prefix):] or '/'
+        return handler(environ, start_response)
+
+    def preload(self) -> None:
+        """Import every deferred blueprint now (e.g. before forking workers)."""
+        for prefix in self.mounts:
+            self._child(prefix)
@@ -0,0 +1,160 @@
+#-------------------------------------------------------------------------------#
+#                             utils/middleware.py                               #
+#-------------------------------------------------------------------------------#
+"""
+Request pipeline pieces that run outside (or at the very end of) the Flask
+application stack.
+
+  - SecurityHeaders: response headers (CSP, nosniff, ...) built once at
+    startup and copied onto every response in a single after_request hook.
+  - StaticFastPath: WSGI middleware serving /static/... and /favicon.ico
+    straight from disk. Static hits are most of the request volume and need
+    none of before_request, CSRF, CORS, compression or the session, so they
+    never enter the Flask app. Files under /static/dist/ (see
+    utils/static_assets.py) get their pre-compressed variant and immutable
+    cache headers; anything not found on disk falls through to the app so
+    the normal 404 page is rendered.
+
+Usage (app.create_app):
+    security_headers.init_app(app)
+    app.wsgi_app = StaticFastPath(app, security_headers.headers)
+"""
+from typing import Iterable, List, Optional, Tuple
+import logging
+import mimetypes
+import os
+
+from werkzeug.datastructures import Headers
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+from werkzeug.wrappers import Request
+
+from utils.static_assets import DIST_DIR, HASHED_EXTENSIONS, IMMUTABLE_CACHE_CONTROL, MIMETYPES, pick_precompressed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_SECURITY_POLICY = (
+    "default-src 'self'; "
+    "style-src 'self' 'https://cdnjs.cloudflare.com' 'https://fonts.googleapis.com'; "
+    "font-src 'https://fonts.gstatic.com'; "
+    "script-src 'self';"
+)
+FAVICON_PATH = '/favicon.ico'
+FAVICON_MIMETYPE = 'image/vnd.microsoft.icon'
+
+HeaderList = List[Tuple[str, str]]
+
+def build_security_headers(config) -> HeaderList:
+    """Build the headers added to every response from app config."""
+    headers = [
+        ('Content-Security-Policy', config.get('CONTENT_SECURITY_POLICY') or DEFAULT_CONTENT_SECURITY_POLICY),
+        ('X-Content-Type-Options', 'nosniff')
+    ]
+    return headers
+
+class SecurityHeaders:
+    """Copies a precomputed header set onto every application response."""
+
+    def __init__(self):
+        self.headers: HeaderList = []
+
+    def init_app(self, app) -> None:
+        self.headers = build_security_headers(app.config)
+        app.after_request(self.apply)
+        app.extensions['security_headers'] = self
+
+    def apply(self, response):
+        headers = response.headers
+        for name, value in self.headers:
+            headers[name] = value
+        return response
+
+# Process-wide instance registered in app.create_app
+security_headers = SecurityHeaders()
+
+class StaticFastPath:
+    """
+    WSGI middleware answering static GET/HEAD requests without the Flask stack.
+
+    Args:
+        app: Flask app; its wsgi_app is wrapped and its static folder served
+        headers: Extra headers for every static response (e.g. security headers)
+        max_age: Cache-Control max-age for unhashed static files
+        cors_origins: Allowed origins (CORS_ORIGINS). '*' allows any origin;
+            otherwise a request Origin in the list is echoed back, as the
+            CORS extension does for application routes
+    """
+
+    def __init__(self, app, headers: Iterable[Tuple[str, str]] = (), max_age: Optional[int] = None,
+                 cors_origins: Iterable[str] = ()):
+        self.wsgi_app = app.wsgi_app
+        self.static_dir = app.static_folder
+        self.prefix = f"{app.static_url_path.rstrip('/')}/"
+        self.dist_prefix = f'{self.prefix}{DIST_DIR}/'
+        self.max_age = max_age if max_age is not None else app.config.get('STATIC_MAX_AGE', 3600)
+
+        origins = {origin.strip() for origin in cors_origins if origin.strip()}
+        self.any_origin = '*' in origins
+        self.cors_origins = frozenset(origins - {'*'})
+
+        static_headers = list(headers)
+        if self.any_origin:
+            static_headers.append(('Access-Control-Allow-Origin', '*'))
+        self.headers: HeaderList = static_headers
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            if path.startswith(self.dist_prefix):
+                response = self._serve_hashed(environ, path[len(self.dist_prefix):])
+            elif path.startswith(self.prefix):
+                response = self._serve(environ, path[len(self.prefix):])
+            elif path == FAVICON_PATH:
+                response = self._serve(environ, 'favicon.ico', FAVICON_MIMETYPE)
+            else:
+                response = None
+            if response is not None:
+                return response(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+    def _resolve(self, directory: str, filename: str) -> Optional[str]:
+        path = safe_join(directory, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        return path
+
+    def _finish(self, environ, response):
+        headers: Headers = response.headers
+        for name, value in self.headers:
+            headers[name] = value
+        if self.cors_origins and not self.any_origin:
+            response.vary.add('Origin')
+            origin = environ.get('HTTP_ORIGIN')
+            if origin in self.cors_origins:
+                headers['Access-Control-Allow-Origin'] = origin
+        return response
+
+    def _serve(self, environ, filename: str, mimetype: Optional[str] = None):
+        path = self._resolve(self.static_dir, filename)
+        if path is None:
+            return None
+        response = send_file(path, environ, mimetype=mimetype or mimetypes.guess_type(filename)[0],
+                             max_age=self.max_age)
+        return self._finish(environ, response)
+
+    def _serve_hashed(self, environ, filename: str):
+        ext = os.path.splitext(filename)[1]
+        if ext not in HASHED_EXTENSIONS:
+            return None
+        dist_dir = os.path.join(self.static_dir, DIST_DIR)
+        if self._resolve(dist_dir, filename) is None:
+            return None
+        served, encoding = pick_precompressed(dist_dir, filename, Request(environ).accept_encodings)
+
+        response = send_file(self._resolve(dist_dir, served), environ, mimetype=MIMETYPES.get(ext),
+                             max_age=31536000)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return self._finish(environ, response)
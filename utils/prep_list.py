@@ -0,0 +1,256 @@
+#-------------------------------------------------------------------------------#
+#                             utils/prep_list.py                                #
+#-------------------------------------------------------------------------------#
+"""
+Batch-prep calculator.
+
+Takes (recipe, portions) pairs, fetches every recipe in one query, scales
+each ingredient line by portions / recipe portions and aggregates the whole
+batch into one order list per SUPPLIER.
+
+Products come from the per-database CostingTable cache in unit_utils (the
+same dimension, pack size, yield and wastage columns used for costing), so a
+prep list of any size is scaled, converted and summed in a few vectorized
+passes instead of a Python loop per line.
+
+Usage:
+    prep = build_prep_list(db, [{'recipe_id': '...', 'portions': 40},
+                                {'title': 'Crepes', 'portions': 12}])
+    prep['suppliers']['Brake']['items']
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from functools import lru_cache
+import logging
+import math
+
+import numpy as np
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from .ingredient_resolver import get_ingredient_resolver
+from .unit_utils import (
+    DIMENSION_COUNT,
+    DIMENSION_MASS,
+    DIMENSION_VOLUME,
+    CostingTable,
+    UnitConversionError,
+    get_costing_table,
+    parse_unit
+)
+
+logger = logging.getLogger(__name__)
+
+BASE_UNITS = {DIMENSION_MASS: 'g', DIMENSION_VOLUME: 'ml', DIMENSION_COUNT: 'ea'}
+MAX_PREP_ITEMS = 500
+MAX_PORTIONS = 100000
+_INVALID_UNIT = (-2, np.nan)
+
+class PrepListError(Exception):
+    """Custom exception for prep list errors"""
+    def __init__(self, message: str, error_code: str = 'PREP_LIST_ERROR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+#-------------------------------------------------------------------------------#
+#                               Unit edges                                      #
+#-------------------------------------------------------------------------------#
+@lru_cache(maxsize=4096)
+def unit_edge(unit: Optional[str]) -> Tuple[int, float]:
+    """(dimension, factor to base unit) for a unit string; (-2, nan) if unknown."""
+    try:
+        return parse_unit(unit)
+    except UnitConversionError:
+        return _INVALID_UNIT
+
+#-------------------------------------------------------------------------------#
+#                                Prep list                                      #
+#-------------------------------------------------------------------------------#
+def _parse_requests(items: Sequence[Dict]) -> Tuple[List[Tuple[str, str, float]], List[Dict]]:
+    """Validate request items into (kind, key, portions) with duplicates merged."""
+    if not isinstance(items, (list, tuple)) or not items:
+        raise PrepListError("items must be a non-empty list", 'INVALID_ITEMS')
+    if len(items) > MAX_PREP_ITEMS:
+        raise PrepListError(f"At most {MAX_PREP_ITEMS} items per prep list", 'TOO_MANY_ITEMS')
+
+    merged: Dict[Tuple[str, str], float] = {}
+    invalid: List[Dict] = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            invalid.append({'index': position, 'error': 'Item must be an object'})
+            continue
+        try:
+            portions = float(item.get('portions'))
+        except (TypeError, ValueError):
+            portions = 0
+        if not (math.isfinite(portions) and 0 < portions <= MAX_PORTIONS):
+            invalid.append({'index': position,
+                            'error': f"portions must be a positive number up to {MAX_PORTIONS}"})
+            continue
+        if item.get('recipe_id'):
+            key = ('id', str(item['recipe_id']))
+        elif item.get('title'):
+            key = ('title', str(item['title']).strip())
+        else:
+            invalid.append({'index': position, 'error': 'recipe_id or title is required'})
+            continue
+        merged[key] = merged.get(key, 0.0) + portions
+    return [(kind, value, portions) for (kind, value), portions in merged.items()], invalid
+
+def _fetch_recipes(collection, requests: List[Tuple[str, str, float]]) -> Dict[Tuple[str, str], Dict]:
+    """Fetch every requested recipe with a single query."""
+    ids, titles = [], []
+    for kind, value, _ in requests:
+        if kind == 'id':
+            try:
+                ids.append(ObjectId(value))
+            except (InvalidId, TypeError):
+                continue
+        else:
+            titles.append(value)
+
+    clauses = []
+    if ids:
+        clauses.append({'_id': {'$in': ids}})
+    if titles:
+        clauses.append({'title': {'$in': titles}})
+    if not clauses:
+        return {}
+
+    projection = {'title': 1, 'portions': 1, 'ingredient_lines': 1, 'ingredients': 1}
+    found: Dict[Tuple[str, str], Dict] = {}
+    for recipe in collection.find({'$or': clauses} if len(clauses) > 1 else clauses[0], projection):
+        found[('id', str(recipe['_id']))] = recipe
+        found.setdefault(('title', recipe.get('title')), recipe)
+    return found
+
+def build_prep_list(db, items: Sequence[Dict], collection_name: str = 'global_recipes',
+                    table: Optional[CostingTable] = None) -> Dict:
+    """
+    Scale and aggregate a batch of recipes into per-supplier order lists.
+
+    Args:
+        db: MongoDB database instance
+        items: [{'recipe_id' | 'title', 'portions'}, ...]
+        collection_name: Recipe collection
+        table: Costing table (defaults to the cached table for db)
+
+    Returns:
+        Dict with 'recipes' (resolved requests and scale factors),
+        'suppliers' (SUPPLIER -> items and total cost), 'unresolved' lines,
+        'missing' recipes and 'invalid' request items
+
+    Raises:
+        PrepListError: If the request itself is malformed
+    """
+    requests, invalid = _parse_requests(items)
+    recipes = _fetch_recipes(db[collection_name], requests)
+    table = table or get_costing_table(db)
+
+    # Flatten every line of every requested recipe
+    rows: List[int] = []
+    quantities: List[float] = []
+    scales: List[float] = []
+    units: List[Tuple[int, float]] = []
+    owners: List[str] = []
+    summary: List[Dict] = []
+    missing: List[Dict] = []
+    unresolved: List[Dict] = []
+    unmatched_names: Dict[str, Optional[int]] = {}
+
+    for kind, value, portions in requests:
+        recipe = recipes.get((kind, value))
+        if recipe is None:
+            missing.append({kind if kind == 'title' else 'recipe_id': value, 'portions': portions})
+            continue
+        yields = recipe.get('portions') or 1
+        scale = portions / float(yields)
+        title = recipe.get('title')
+        summary.append({
+            'recipe_id': str(recipe['_id']), 'title': title, 'portions': portions,
+            'recipe_portions': recipe.get('portions'), 'scale': round(scale, 4)
+        })
+
+        for line in recipe.get('ingredient_lines') or []:
+            name = line.get('ingredient') or line.get('name')
+            if line.get('quantity') is None:
+                unresolved.append({'recipe': title, 'ingredient': name, 'reason': 'no quantity'})
+                continue
+            try:
+                quantity = float(line['quantity'])
+            except (TypeError, ValueError):
+                quantity = math.nan
+            if not math.isfinite(quantity):
+                unresolved.append({'recipe': title, 'ingredient': name, 'reason': 'invalid quantity'})
+                continue
+            row = table.index.get(str(name).lower())
+            if row is None:
+                if name not in unmatched_names:
+                    match = get_ingredient_resolver(db).best_match(line.get('name') or name)
+                    unmatched_names[name] = table.index.get(match['INGREDIENT'].lower()) if match else None
+                row = unmatched_names[name]
+            if row is None:
+                unresolved.append({'recipe': title, 'ingredient': name, 'reason': 'unknown product'})
+                continue
+            rows.append(row)
+            quantities.append(quantity)
+            scales.append(scale)
+            units.append(unit_edge(line.get('unit') or 'ea'))
+            owners.append(title)
+        if not recipe.get('ingredient_lines') and recipe.get('ingredients'):
+            unresolved.extend({'recipe': title, 'ingredient': name, 'reason': 'no quantity'}
+                              for name in recipe['ingredients'])
+
+    suppliers: Dict[str, Dict] = {}
+    if rows:
+        row_idx = np.asarray(rows, dtype=np.int64)
+        line_dim = np.fromiter((u[0] for u in units), dtype=np.int8, count=len(units))
+        line_factor = np.fromiter((u[1] for u in units), dtype=np.float64, count=len(units))
+        compatible = table.dimension[row_idx] == line_dim
+
+        base_qty = np.asarray(quantities) * np.asarray(scales) * line_factor
+        as_purchased = base_qty / (table.yield_factor[row_idx] * (1.0 - table.wastage[row_idx]))
+
+        for i in np.flatnonzero(~compatible):
+            unresolved.append({'recipe': owners[i], 'ingredient': table.names[rows[i]],
+                               'reason': 'unit not convertible to purchase unit'})
+
+        # Sum per product across all recipes
+        products, inverse = np.unique(row_idx[compatible], return_inverse=True)
+        totals = np.bincount(inverse, weights=as_purchased[compatible], minlength=len(products))
+        pack_size = table.pack_size[products]
+        packs = np.where(pack_size > 0, np.ceil(np.round(totals / pack_size, 6)), np.nan)
+        costs = packs * table.pack_size[products] * table.base_cost[products]
+
+        used_by: Dict[int, List[str]] = {}
+        for row, owner in zip(row_idx[compatible].tolist(), (o for o, ok in zip(owners, compatible) if ok)):
+            used_by.setdefault(row, [])
+            if owner not in used_by[row]:
+                used_by[row].append(owner)
+
+        for position, row in enumerate(products.tolist()):
+            supplier = suppliers.setdefault(table.suppliers[row], {'items': [], 'total_cost': 0.0})
+            cost = None if np.isnan(costs[position]) else round(float(costs[position]), 2)
+            supplier['items'].append({
+                'INGREDIENT': table.names[row],
+                'quantity': round(float(totals[position]), 3),
+                'unit': BASE_UNITS.get(int(table.dimension[row])),
+                'PU': table.purchase_units[row],
+                'packs': None if np.isnan(packs[position]) else int(packs[position]),
+                'cost': cost,
+                'recipes': used_by[row]
+            })
+            if cost is not None:
+                supplier['total_cost'] = round(supplier['total_cost'] + cost, 2)
+
+        for supplier in suppliers.values():
+            supplier['items'].sort(key=lambda item: item['INGREDIENT'].lower())
+
+    return {
+        'recipes': summary,
+        'suppliers': dict(sorted(suppliers.items())),
+        'total_cost': round(sum(s['total_cost'] for s in suppliers.values()), 2),
+        'unresolved': unresolved,
+        'missing': missing,
+        'invalid': invalid
+    }
@@ -0,0 +1,263 @@
+#-------------------------------------------------------------------------------#
+#                          utils/query_compiler.py                              #
+#-------------------------------------------------------------------------------#
+"""
+Shared search-query compiler.
+
+Turns request filters into index-friendly MongoDB predicates so that every
+search endpoint builds its query the same way:
+  - prefix: anchored, escaped, case-sensitive regex ('^chick') on the
+            normalized copy of the field under 'search_keys' (see
+            search_key), which a simple-collation index can bound.
+            A case-insensitive regex on the raw field cannot use index bounds.
+  - tags:   '$in' over comma-separated values, matched case-insensitively
+            through a strength-2 collation instead of a regex
+  - enum:   equality against a fixed, lowercase set of allowed values
+
+Writers store the normalized copies with search_keys(doc, specs); documents
+written elsewhere are filled in by backfill_search_keys (run with the index
+registry at startup, or 'python -m utils.index_registry backfill').
+
+Field aliases collapse the historical naming drift ('method' vs
+'cookery_method', 'dietary' vs 'dietaryRequirement') onto one canonical
+document field per filter.
+
+Usage:
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, request.args)
+    cursor = compiled.find(db[Config.COLLECTION_GLOBAL_RECIPES])
+    compiled.explain(db[Config.COLLECTION_GLOBAL_RECIPES])   # which index?
+"""
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+import logging
+import re
+import unicodedata
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Case-insensitive comparison for '$in'/equality; indexes must be built with
+# the same collation to be used (see utils/index_registry.py).
+CASE_INSENSITIVE_COLLATION = {'locale': 'en', 'strength': 2}
+
+# Subdocument holding the normalized copy of every prefix-searched field
+SEARCH_KEYS_FIELD = 'search_keys'
+
+class QueryCompileError(Exception):
+    """Custom exception for invalid search filters"""
+    def __init__(self, message: str, error_code: str = 'QUERY_ERROR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+class FieldSpec:
+    """
+    Describes how one request filter maps onto a document field.
+
+    Args:
+        field: Canonical document field the predicate is applied to
+        kind: 'prefix', 'tags' or 'enum'
+        params: Request parameter names accepted for this filter, in priority order
+        allowed: Allowed values for 'enum' filters
+    """
+    KINDS = ('prefix', 'tags', 'enum')
+
+    def __init__(self, field: str, kind: str, params: Iterable[str], allowed: Optional[Iterable[str]] = None):
+        if kind not in self.KINDS:
+            raise QueryCompileError(f"Unknown filter kind: {kind}")
+        self.field = field
+        self.kind = kind
+        self.params: Tuple[str, ...] = tuple(params)
+        self.allowed: Optional[FrozenSet[str]] = frozenset(v.lower() for v in allowed) if allowed else None
+
+#-------------------------------------------------------------------------------#
+#                    Field specifications per collection                        #
+#-------------------------------------------------------------------------------#
+RECIPE_SEARCH_FIELDS: Tuple[FieldSpec, ...] = (
+    FieldSpec('title', 'prefix', ('search_query', 'query', 'title')),
+    FieldSpec('ingredients', 'prefix', ('ingredient', 'ingredients')),
+    FieldSpec('cuisine', 'tags', ('cuisine',)),
+    FieldSpec('cookery_method', 'tags', ('method', 'cookery_method')),
+    FieldSpec('dietary', 'tags', ('dietary', 'dietaryRequirement')),
+)
+
+PRODUCT_SEARCH_FIELDS: Tuple[FieldSpec, ...] = (
+    FieldSpec('INGREDIENT', 'prefix', ('query', 'ingredient')),
+    FieldSpec('SUPPLIER', 'prefix', ('supplier',)),
+)
+
+ALLERGEN_SEVERITIES = ('low', 'medium', 'high', 'severe')
+ALLERGEN_REACTION_TYPES = ('digestive', 'skin', 'respiratory', 'anaphylactic')
+
+ALLERGEN_SEARCH_FIELDS: Tuple[FieldSpec, ...] = (
+    FieldSpec('ingredient', 'prefix', ('query', 'search_query', 'ingredient')),
+    FieldSpec('severity', 'enum', ('severity',), allowed=ALLERGEN_SEVERITIES),
+    FieldSpec('reaction_type', 'enum', ('reaction_type', 'reactionType'), allowed=ALLERGEN_REACTION_TYPES),
+)
+
+#-------------------------------------------------------------------------------#
+#                               Search keys                                     #
+#-------------------------------------------------------------------------------#
+def search_key(value) -> str:
+    """Normalized form used for prefix search: accents stripped, casefolded, single-spaced."""
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return ' '.join(text.split())
+
+def search_key_path(spec: FieldSpec) -> str:
+    return f'{SEARCH_KEYS_FIELD}.{spec.field}'
+
+def search_keys(document: Mapping, specs: Iterable[FieldSpec]) -> Dict:
+    """
+    The 'search_keys' subdocument for a document: the normalized copy of each
+    prefix field (a list of keys for array fields).
+    """
+    keys = {}
+    for spec in specs:
+        if spec.kind != 'prefix':
+            continue
+        value = document.get(spec.field)
+        if isinstance(value, (list, tuple)):
+            keys[spec.field] = [search_key(item) for item in value if item]
+        else:
+            keys[spec.field] = search_key(value)
+    return keys
+
+def backfill_search_keys(collection, specs: Iterable[FieldSpec], batch_size: int = 1000,
+                         force: bool = False) -> int:
+    """
+    Store search_keys on documents that do not have them yet (or on every
+    document with force=True, e.g. after the normalization changed).
+
+    Returns:
+        Number of documents updated
+    """
+    prefix_specs = [spec for spec in specs if spec.kind == 'prefix']
+    if not prefix_specs:
+        return 0
+    # Missing and null share the index bounds of the first key path
+    query = {} if force else {search_key_path(prefix_specs[0]): None}
+    projection = {spec.field: 1 for spec in prefix_specs}
+    updated = 0
+    operations = []
+    for document in collection.find(query, projection, batch_size=batch_size):
+        operations.append(UpdateOne({'_id': document['_id']},
+                                    {'$set': {SEARCH_KEYS_FIELD: search_keys(document, prefix_specs)}}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    if updated:
+        logger.info(f"Backfilled search keys on {updated} documents in {collection.name}")
+    return updated
+
+#-------------------------------------------------------------------------------#
+#                              Compiled query                                   #
+#-------------------------------------------------------------------------------#
+class CompiledQuery:
+    """Filter plus the collation it must run under."""
+
+    def __init__(self, filter: Dict, collation: Optional[Dict] = None):
+        self.filter = filter
+        self.collation = collation
+
+    def __repr__(self) -> str:
+        return f"CompiledQuery(filter={self.filter!r}, collation={self.collation!r})"
+
+    def find(self, collection, projection: Optional[Dict] = None, **kwargs):
+        """Run the query against a collection and return the cursor."""
+        cursor = collection.find(self.filter, projection, **kwargs)
+        if self.collation:
+            cursor = cursor.collation(self.collation)
+        return cursor
+
+    def explain(self, collection) -> Dict:
+        """
+        Report which index the query planner picks.
+
+        Returns:
+            Dict with the winning plan's access 'stage' (IXSCAN, COLLSCAN, ...),
+            the 'index' name if any, and the raw 'winning_plan'
+        """
+        plan = self.find(collection).explain()
+        winning = plan.get('queryPlanner', {}).get('winningPlan', {})
+        stage, index = _access_stage(winning)
+        if stage == 'COLLSCAN':
+            logger.warning(f"Query on {collection.name} uses COLLSCAN: {self.filter}")
+        return {'stage': stage, 'index': index, 'winning_plan': winning}
+
+def _access_stage(plan: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """Walk a winning plan down to its leaf access stage."""
+    while plan:
+        stage = plan.get('stage')
+        if stage in ('IXSCAN', 'COLLSCAN', 'IDHACK', 'COUNT_SCAN', 'DISTINCT_SCAN'):
+            return stage, plan.get('indexName')
+        if 'queryPlan' in plan:
+            plan = plan['queryPlan']
+        elif 'inputStage' in plan:
+            plan = plan['inputStage']
+        elif plan.get('inputStages'):
+            plan = plan['inputStages'][0]
+        else:
+            return stage, plan.get('indexName')
+    return None, None
+
+#-------------------------------------------------------------------------------#
+#                                 Compiler                                      #
+#-------------------------------------------------------------------------------#
+def split_tags(value: str) -> List[str]:
+    """Split a comma separated filter value into trimmed, de-duplicated tags."""
+    seen = []
+    for part in str(value).split(','):
+        tag = part.strip()
+        if tag and tag.lower() not in (s.lower() for s in seen):
+            seen.append(tag)
+    return seen
+
+def compile_query(specs: Iterable[FieldSpec], filters: Mapping, strict: bool = False) -> CompiledQuery:
+    """
+    Compile request filters into an index-friendly MongoDB query.
+
+    Args:
+        specs: Field specifications for the target collection
+        filters: Request filters (e.g. request.args or a plain dict)
+        strict: Raise QueryCompileError on invalid enum values instead of
+            matching nothing
+
+    Returns:
+        CompiledQuery
+    """
+    query: Dict = {}
+    collation = None
+
+    for spec in specs:
+        value = next((filters.get(p) for p in spec.params if filters.get(p)), None)
+        if value is None:
+            continue
+        value = str(value).strip()
+        if not value:
+            continue
+
+        if spec.kind == 'prefix':
+            key = search_key(value)
+            if key:
+                query[search_key_path(spec)] = {'$regex': f'^{re.escape(key)}'}
+        elif spec.kind == 'tags':
+            query[spec.field] = {'$in': split_tags(value)}
+            collation = CASE_INSENSITIVE_COLLATION
+        elif spec.kind == 'enum':
+            normalized = value.lower()
+            if spec.allowed is not None and normalized not in spec.allowed:
+                if strict:
+                    raise QueryCompileError(
+                        f"Invalid {spec.field}. Must be one of: {', '.join(sorted(spec.allowed))}",
+                        'INVALID_FILTER'
+                    )
+                logger.debug(f"Ignoring invalid {spec.field} filter value: {value}")
+                query[spec.field] = {'$in': []}
+                continue
+            query[spec.field] = normalized
+
+    logger.debug(f"Compiled search query: {query} (collation: {collation})")
+    return CompiledQuery(query, collation)
@@ -0,0 +1,243 @@
+#-------------------------------------------------------------------------------#
+#                           utils/rate_limiter.py                               #
+#-------------------------------------------------------------------------------#
+"""
+Sliding-window rate limiter with pluggable storage backends.
+
+The limiter keeps two fixed-window counters per key (current and previous)
+and estimates the sliding-window count as
+    previous * (1 - elapsed / window) + current
+so each key needs O(1) state regardless of how many attempts it records.
+
+Backends:
+  - MemoryRateLimitBackend: per-process, expires idle keys in LRU order
+  - MongoRateLimitBackend:  shared across workers; one document per key and
+                            window bucket, removed by a TTL index
+
+Usage:
+    login_limiter = RateLimiter(max_attempts=5, window_seconds=300, block_seconds=900)
+    login_limiter.init_app(app)       # picks the backend from RATELIMIT_STORAGE_URL
+    if login_limiter.is_blocked(payroll_id): ...
+    login_limiter.record_attempt(payroll_id, success=False)
+"""
+from typing import Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------#
+#                                 Backends                                      #
+#-------------------------------------------------------------------------------#
+class MemoryRateLimitBackend:
+    """
+    In-process store: key -> [bucket, current, previous, blocked_until, last_seen].
+    Keys are kept in access order so expired ones are evicted from the front
+    in amortized O(1).
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._state: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float, idle_seconds: float) -> None:
+        while self._state:
+            key, entry = next(iter(self._state.items()))
+            expired = now - entry[4] > idle_seconds and entry[3] <= now
+            if not expired and len(self._state) <= self.max_keys:
+                break
+            self._state.popitem(last=False)
+
+    def _roll(self, entry: list, bucket: int) -> None:
+        if entry[0] == bucket:
+            return
+        entry[2] = entry[1] if entry[0] == bucket - 1 else 0
+        entry[1] = 0
+        entry[0] = bucket
+
+    def hit(self, key: str, bucket: int, window_seconds: int, now: float) -> Tuple[int, int]:
+        with self._lock:
+            entry = self._state.get(key)
+            if entry is None:
+                entry = self._state[key] = [bucket, 0, 0, 0.0, now]
+            else:
+                self._state.move_to_end(key)
+            self._roll(entry, bucket)
+            entry[1] += 1
+            entry[4] = now
+            self._evict(now, 2 * window_seconds)
+            return entry[1], entry[2]
+
+    def peek(self, key: str, bucket: int) -> Tuple[int, int, float]:
+        with self._lock:
+            entry = self._state.get(key)
+            if entry is None:
+                return 0, 0, 0.0
+            self._roll(entry, bucket)
+            return entry[1], entry[2], entry[3]
+
+    def block(self, key: str, until: float, block_seconds: int) -> None:
+        with self._lock:
+            entry = self._state.setdefault(key, [0, 0, 0, 0.0, time.time()])
+            self._state.move_to_end(key)
+            entry[3] = until
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._state.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+class MongoRateLimitBackend:
+    """
+    Shared store for multi-worker deployments.
+
+    Each key/bucket pair is one document {_id: '<key>:<bucket>', count, expires_at}
+    incremented atomically with an upsert; blocks are '<key>:block' documents.
+    A TTL index on expires_at (declared in utils/index_registry.py) removes them.
+    """
+
+    def __init__(self, get_collection: Callable):
+        self._get_collection = get_collection
+
+    def hit(self, key: str, bucket: int, window_seconds: int, now: float) -> Tuple[int, int]:
+        collection = self._get_collection()
+        expires_at = datetime.utcfromtimestamp((bucket + 2) * window_seconds)
+        current = collection.find_one_and_update(
+            {'_id': f'{key}:{bucket}'},
+            {'$inc': {'count': 1}, '$setOnInsert': {'expires_at': expires_at}},
+            upsert=True,
+            return_document=True
+        )
+        previous = collection.find_one({'_id': f'{key}:{bucket - 1}'}, {'count': 1})
+        return current['count'], previous['count'] if previous else 0
+
+    def peek(self, key: str, bucket: int) -> Tuple[int, int, float]:
+        counts = {'current': 0, 'previous': 0, 'block': 0.0}
+        ids = {f'{key}:{bucket}': 'current', f'{key}:{bucket - 1}': 'previous', f'{key}:block': 'block'}
+        for doc in self._get_collection().find({'_id': {'$in': list(ids)}}):
+            slot = ids[doc['_id']]
+            counts[slot] = doc.get('blocked_until', 0.0) if slot == 'block' else doc.get('count', 0)
+        return counts['current'], counts['previous'], counts['block']
+
+    def block(self, key: str, until: float, block_seconds: int) -> None:
+        self._get_collection().update_one(
+            {'_id': f'{key}:block'},
+            {'$set': {'blocked_until': until, 'expires_at': datetime.utcfromtimestamp(until)}},
+            upsert=True
+        )
+
+    def clear(self, key: str) -> None:
+        self._get_collection().delete_many({'_id': {'$regex': f'^{re.escape(key)}:'}})
+
+def create_rate_limit_backend(storage_url: str, get_db: Optional[Callable] = None, collection_name: str = 'rate_limits'):
+    """
+    Build a backend from a RATELIMIT_STORAGE_URL value.
+
+    Args:
+        storage_url: 'memory://' or 'mongo://' (optionally 'mongo://<collection>')
+        get_db: Callable returning the database, required for Mongo
+        collection_name: Default collection for the Mongo backend
+    """
+    if not storage_url or storage_url.startswith('memory://'):
+        return MemoryRateLimitBackend()
+    if storage_url.startswith('mongo://'):
+        if get_db is None:
+            raise ValueError("Mongo rate limit backend requires a database")
+        collection_name = storage_url[len('mongo://'):] or collection_name
+        return MongoRateLimitBackend(lambda: get_db()[collection_name])
+    raise ValueError(f"Unsupported rate limit storage: {storage_url}")
+
+#-------------------------------------------------------------------------------#
+#                                 RateLimiter                                   #
+#-------------------------------------------------------------------------------#
+class RateLimiter:
+    """
+    Block a key after max_attempts failures within a sliding window.
+
+    Args:
+        max_attempts: Failures allowed within the window
+        window_seconds: Sliding window length
+        block_seconds: How long a key stays blocked once the limit is hit
+        backend: Storage backend; defaults to an in-process store
+    """
+
+    def __init__(self, max_attempts: int, window_seconds: int, block_seconds: int, backend=None):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.block_seconds = block_seconds
+        self.backend = backend or MemoryRateLimitBackend()
+
+    def init_app(self, app) -> None:
+        """Select the backend from RATELIMIT_STORAGE_URL."""
+        config = app.config
+        storage_url = config.get('RATELIMIT_STORAGE_URL', 'memory://')
+        db_name = config.get('MONGO_DBNAME')
+        self.backend = create_rate_limit_backend(
+            storage_url,
+            get_db=lambda: app.config['MONGO_CLIENT'][db_name],
+            collection_name=config.get('COLLECTION_RATE_LIMITS', 'rate_limits')
+        )
+        logger.info(f"Rate limiter using {type(self.backend).__name__}")
+
+    def _estimate(self, current: int, previous: int, now: float) -> float:
+        elapsed = (now % self.window_seconds) / self.window_seconds
+        return previous * (1.0 - elapsed) + current
+
+    def is_blocked(self, key: str) -> bool:
+        now = time.time()
+        current, previous, blocked_until = self.backend.peek(key, int(now // self.window_seconds))
+        return blocked_until > now
+
+    def attempts(self, key: str) -> float:
+        """Estimated failures for key within the sliding window."""
+        now = time.time()
+        current, previous, _ = self.backend.peek(key, int(now // self.window_seconds))
+        return self._estimate(current, previous, now)
+
+    def record_attempt(self, key: str, success: bool = False) -> None:
+        if success:
+            self.clear_attempts(key)
+            return
+        now = time.time()
+        current, previous = self.backend.hit(key, int(now // self.window_seconds), self.window_seconds, now)
+        if self._estimate(current, previous, now) >= self.max_attempts:
+            self.backend.block(key, now + self.block_seconds, self.block_seconds)
+            logger.warning(f"Rate limit reached for key: {key}")
+
+    def clear_attempts(self, key: str) -> None:
+        self.backend.clear(key)
+
+def benchmark_rate_limiter(checks: int = 200000, keys: int = 5000) -> Dict[str, float]:
+    """
+    Measure per-check overhead of the in-process backend
+    (is_blocked + record_attempt per iteration).
+    """
+    limiter = RateLimiter(max_attempts=5, window_seconds=300, block_seconds=900)
+    names = [f'DK-{i:06d}' for i in range(keys)]
+    previous_level = logger.level
+    logger.setLevel(logging.ERROR)
+    started = time.perf_counter()
+    for i in range(checks):
+        key = names[i % keys]
+        if not limiter.is_blocked(key):
+            limiter.record_attempt(key, success=False)
+    elapsed = time.perf_counter() - started
+    logger.setLevel(previous_level)
+    return {
+        'checks': checks,
+        'keys_tracked': len(limiter.backend),
+        'total_seconds': elapsed,
+        'microseconds_per_check': elapsed / checks * 1e6
+    }
+
+if __name__ == "__main__":
+    # For local benchmarking only
+    for name, value in benchmark_rate_limiter().items():
+        print(f"- {name}: {value}")
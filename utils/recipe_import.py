@@ -0,0 +1,501 @@
+#-------------------------------------------------------------------------------#
+#                            utils/recipe_import.py                             #
+#-------------------------------------------------------------------------------#
+"""
+Bulk recipe import.
+
+Pipeline:
+  1. parse   - JSON arrays, NDJSON and CSV are read as a stream, one record
+               at a time, and grouped into batches
+  2. validate- batches are normalized and validated in a process pool
+               (pure Python, no database access); a bounded number of
+               batches is in flight so memory stays flat
+  3. resolve - per batch, every distinct ingredient name is matched against
+               the in-memory ingredient resolver and every distinct
+               cuisine/method/dietary/mealtype/tag value is looked up with one
+               '$in' query per vocabulary collection (cached across batches)
+  4. write   - one unordered bulk_write of upserts per batch, keyed on
+               source_id when the record has one and on title otherwise;
+               the batch's postings in utils/ingredient_index.py are replaced
+
+Accepted record shape (JSON) or columns (CSV; list cells separated by '|'):
+    title, source_id, portions, cuisine, cookery_method, dietary, mealtype,
+    tags, method/instructions, ingredients
+Ingredient lines are either strings ('200 g plain flour', '2 eggs') or
+objects {'name', 'quantity', 'unit'}.
+
+Usage:
+    python -m utils.recipe_import recipes.ndjson [--format ndjson] [--workers 4]
+    report = RecipeImporter(db).run(open('recipes.csv', newline=''), 'csv')
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .http_cache import RECIPES_NAMESPACE, create_response_cache_backend, response_cache
+from .ingredient_index import INDEX_PROJECTION, ingredient_index
+from .ingredient_resolver import get_ingredient_resolver
+from .query_compiler import CASE_INSENSITIVE_COLLATION, RECIPE_SEARCH_FIELDS, SEARCH_KEYS_FIELD, search_keys
+from .unit_utils import UnitConversionError, parse_unit
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('json', 'ndjson', 'csv')
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 200
+
+# Recipe field -> vocabulary collection used by lookup_cuisine/lookup_method/...
+VOCABULARY_FIELDS = {
+    'cuisine': 'cuisine',
+    'cookery_method': 'method',
+    'dietary': 'dietary',
+    'mealtype': 'mealtype',
+    'tags': 'tags'
+}
+FIELD_ALIASES = {
+    'method': 'cookery_method',
+    'dietaryRequirement': 'dietary',
+    'instructions': 'steps'
+}
+
+class RecipeImportError(Exception):
+    """Custom exception for recipe import errors"""
+    def __init__(self, message: str, error_code: str = 'IMPORT_ERROR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+#-------------------------------------------------------------------------------#
+#                              Streaming parsers                                #
+#-------------------------------------------------------------------------------#
+def iter_ndjson(fp) -> Iterator[Dict]:
+    for line_number, line in enumerate(fp, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'_parse_error': f"line {line_number}: {e.msg}"}
+
+def iter_json_array(fp, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer and not eof:
+                chunk = fp.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            if not buffer.startswith('['):
+                raise RecipeImportError("JSON import must be an array of recipes", 'INVALID_JSON')
+            buffer = buffer[1:]
+            started = True
+            continue
+
+        if buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith(']'):
+            return
+        try:
+            value, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise RecipeImportError("Truncated or invalid JSON array", 'INVALID_JSON')
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if end == len(buffer) and not eof:
+            # A number may continue in the next chunk; decode it again with more input
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            if chunk:
+                buffer += chunk
+                continue
+        buffer = buffer[end:]
+        yield value
+
+def _csv_cell(value: str):
+    value = value.strip()
+    if value[:1] in ('[', '{'):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            pass
+    return value
+
+def iter_csv(fp) -> Iterator[Dict]:
+    for row in csv.DictReader(fp):
+        yield {key: _csv_cell(value) for key, value in row.items() if key and value not in (None, '')}
+
+def iter_records(fp, fmt: str) -> Iterator[Dict]:
+    """Stream records from an open text file in one of IMPORT_FORMATS."""
+    if fmt == 'csv':
+        return iter_csv(fp)
+    if fmt == 'ndjson':
+        return iter_ndjson(fp)
+    if fmt == 'json':
+        return iter_json_array(fp)
+    raise RecipeImportError(f"Unsupported import format: {fmt}", 'INVALID_FORMAT')
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'ndjson'
+    if extension in IMPORT_FORMATS:
+        return extension
+    raise RecipeImportError(f"Cannot infer import format from {path}", 'INVALID_FORMAT')
+
+#-------------------------------------------------------------------------------#
+#                          Validation (worker processes)                        #
+#-------------------------------------------------------------------------------#
+_QUANTITY = re.compile(r'^(\d+(?:[.,]\d+)?|\d+/\d+)([a-zA-Z]*)$')
+
+def _to_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split('|') if '|' in value else value.split(',')
+    return list(dict.fromkeys(str(v).strip() for v in value if str(v).strip()))
+
+def _parse_quantity(text: str) -> float:
+    if '/' in text:
+        numerator, denominator = text.split('/', 1)
+        return float(numerator) / float(denominator)
+    return float(text.replace(',', '.'))
+
+def _is_unit(text: str) -> bool:
+    try:
+        parse_unit(text)
+        return True
+    except UnitConversionError:
+        return False
+
+def parse_ingredient_line(line) -> Dict:
+    """
+    Normalize one ingredient line to {'name', 'quantity', 'unit'}.
+
+    Raises:
+        RecipeImportError: If the line has no ingredient name
+    """
+    if isinstance(line, dict):
+        name = str(line.get('name') or line.get('ingredient') or '').strip()
+        quantity = line.get('quantity', line.get('qty'))
+        unit = str(line.get('unit') or '').strip() or None
+        try:
+            quantity = float(quantity) if quantity not in (None, '') else None
+        except (TypeError, ValueError):
+            raise RecipeImportError(f"Invalid quantity for {name or 'ingredient'}: {quantity}", 'INVALID_QUANTITY')
+    else:
+        tokens = str(line).split()
+        quantity = unit = None
+        if tokens:
+            match = _QUANTITY.match(tokens[0])
+            if match:
+                quantity = _parse_quantity(match.group(1))
+                if match.group(2) and _is_unit(match.group(2)):
+                    unit = match.group(2)
+                    tokens = tokens[1:]
+                elif not match.group(2):
+                    tokens = tokens[1:]
+                    if len(tokens) > 1 and _is_unit(tokens[0]):
+                        unit = tokens.pop(0)
+                else:
+                    quantity = None
+        name = ' '.join(tokens).strip()
+
+    if not name:
+        raise RecipeImportError(f"Ingredient line without a name: {line}", 'INVALID_INGREDIENT')
+    if unit is not None and not _is_unit(unit):
+        raise RecipeImportError(f"Unrecognised unit for {name}: {unit}", 'INVALID_UNIT')
+    if quantity is not None and unit is None:
+        unit = 'ea'  # '2 eggs'
+    return {'name': name, 'quantity': quantity, 'unit': unit}
+
+def validate_recipe(record: Dict) -> Dict:
+    """
+    Normalize and validate one raw record.
+
+    Returns:
+        The normalized recipe (without resolved ingredients)
+
+    Raises:
+        RecipeImportError: If the record is invalid
+    """
+    if '_parse_error' in record:
+        raise RecipeImportError(record['_parse_error'], 'PARSE_ERROR')
+    record = {FIELD_ALIASES.get(key, key): value for key, value in record.items()}
+
+    title = str(record.get('title') or '').strip()
+    if not title:
+        raise RecipeImportError("Recipe title is required", 'MISSING_TITLE')
+
+    lines = record.get('ingredients')
+    if isinstance(lines, str):
+        lines = [part for part in lines.split('|') if part.strip()]
+    if not lines:
+        raise RecipeImportError(f"Recipe '{title}' has no ingredients", 'MISSING_INGREDIENTS')
+
+    portions = record.get('portions')
+    if portions not in (None, ''):
+        try:
+            portions = int(float(portions))
+        except (TypeError, ValueError):
+            raise RecipeImportError(f"Invalid portions for '{title}': {portions}", 'INVALID_PORTIONS')
+        if portions <= 0:
+            raise RecipeImportError(f"Invalid portions for '{title}': {portions}", 'INVALID_PORTIONS')
+    else:
+        portions = None
+
+    recipe = {
+        'title': title,
+        'portions': portions,
+        'ingredient_lines': [parse_ingredient_line(line) for line in lines]
+    }
+    for field in VOCABULARY_FIELDS:
+        recipe[field] = _to_list(record.get(field))
+    if record.get('source_id') not in (None, ''):
+        recipe['source_id'] = str(record['source_id'])
+    steps = record.get('steps')
+    if steps:
+        recipe['steps'] = steps if isinstance(steps, list) else [s.strip() for s in str(steps).split('|') if s.strip()]
+    return recipe
+
+def validate_batch(batch: Sequence[Tuple[int, Dict]]) -> List[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Validate (row number, record) pairs; runs in a worker process."""
+    results = []
+    for row, record in batch:
+        try:
+            results.append((row, validate_recipe(record), None))
+        except RecipeImportError as e:
+            results.append((row, None, e.message))
+        except Exception as e:
+            results.append((row, None, f"Unexpected error: {str(e)}"))
+    return results
+
+#-------------------------------------------------------------------------------#
+#                                  Importer                                     #
+#-------------------------------------------------------------------------------#
+class ImportReport:
+    """Counters and throughput for one import run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.invalid = 0
+        self.failed = 0
+        self.unresolved_ingredients = 0
+        self.errors: List[Dict] = []
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def error(self, row: int, message: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'invalid': self.invalid,
+            'failed': self.failed,
+            'unresolved_ingredients': self.unresolved_ingredients,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors
+        }
+
+class RecipeImporter:
+    """
+    Args:
+        db: MongoDB database instance
+        collection_name: Target recipe collection
+        batch_size: Records per validation batch and per bulk write
+        workers: Validation processes; 0 validates in this process
+        dry_run: Validate and resolve without writing
+        on_batch: Optional callback(report) after every written batch
+    """
+
+    def __init__(self, db, collection_name: str = 'global_recipes', batch_size: int = DEFAULT_BATCH_SIZE,
+                 workers: Optional[int] = None, dry_run: bool = False,
+                 on_batch: Optional[Callable[[ImportReport], None]] = None):
+        self.db = db
+        self.collection = db[collection_name]
+        self.batch_size = max(1, batch_size)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.dry_run = dry_run
+        self.on_batch = on_batch
+        self._vocabulary: Dict[str, Dict[str, Optional[str]]] = {field: {} for field in VOCABULARY_FIELDS}
+
+    @staticmethod
+    def _batches(records: Iterable[Dict], batch_size: int) -> Iterator[List[Tuple[int, Dict]]]:
+        batch: List[Tuple[int, Dict]] = []
+        for row, record in enumerate(records, 1):
+            batch.append((row, record))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _validated(self, records: Iterable[Dict]) -> Iterator[List[Tuple[int, Optional[Dict], Optional[str]]]]:
+        batches = self._batches(records, self.batch_size)
+        if self.workers <= 0:
+            for batch in batches:
+                yield validate_batch(batch)
+            return
+
+        # Keep a bounded window of batches in flight, yielding results in input order
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(validate_batch, batch))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _resolve_vocabulary(self, recipes: List[Dict]) -> None:
+        """Replace vocabulary values with their canonical names, one query per collection."""
+        for field, collection_name in VOCABULARY_FIELDS.items():
+            known = self._vocabulary[field]
+            missing = {v.lower(): v for recipe in recipes for v in recipe[field] if v.lower() not in known}
+            if missing:
+                for key in missing:
+                    known[key] = None
+                cursor = self.db[collection_name].find(
+                    {'name': {'$in': list(missing.values())}}, {'_id': 0, 'name': 1}
+                ).collation(CASE_INSENSITIVE_COLLATION)
+                for doc in cursor:
+                    known[str(doc['name']).lower()] = doc['name']
+            for recipe in recipes:
+                recipe[field] = [known.get(v.lower()) or v for v in recipe[field]]
+
+    def _resolve_ingredients(self, recipes: List[Dict], report: ImportReport) -> None:
+        resolver = get_ingredient_resolver(self.db)
+        names = {line['name'] for recipe in recipes for line in recipe['ingredient_lines']}
+        matches = {name: resolver.best_match(name) for name in names}
+        for recipe in recipes:
+            for line in recipe['ingredient_lines']:
+                match = matches[line['name']]
+                line['ingredient'] = match['INGREDIENT'] if match else None
+                line['supplier'] = match['SUPPLIER'] if match else None
+                if match is None:
+                    report.unresolved_ingredients += 1
+            # Plain names keep the existing ingredient search and index working
+            recipe['ingredients'] = list(dict.fromkeys(
+                line['ingredient'] or line['name'] for line in recipe['ingredient_lines']
+            ))
+
+    def _write(self, rows: List[Tuple[int, Dict]], report: ImportReport) -> None:
+        now = datetime.utcnow()
+        operations = []
+        keys = []
+        for _, recipe in rows:
+            key = {'source_id': recipe['source_id']} if 'source_id' in recipe else {'title': recipe['title']}
+            keys.append(key)
+            document = dict(recipe, updated_at=now)
+            document[SEARCH_KEYS_FIELD] = search_keys(recipe, RECIPE_SEARCH_FIELDS)
+            operations.append(UpdateOne(
+                key,
+                {'$set': document, '$setOnInsert': {'created_at': now}},
+                upsert=True
+            ))
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get('writeErrors', []):
+                row = rows[error['index']][0]
+                report.failed += 1
+                report.error(row, error.get('errmsg', 'Write failed'))
+        report.inserted += details.get('nUpserted', 0)
+        report.updated += details.get('nMatched', 0)
+
+        # Keep the ingredient -> recipe index in step with the written batch
+        written = self.collection.find({'$or': keys}, INDEX_PROJECTION)
+        ingredient_index.index_recipes(self.db, self.collection.name, written)
+        response_cache.invalidate(RECIPES_NAMESPACE)
+
+    def run(self, fp, fmt: str) -> ImportReport:
+        """Import every record from an open text file; returns the report."""
+        report = ImportReport()
+        for results in self._validated(iter_records(fp, fmt)):
+            valid: List[Tuple[int, Dict]] = []
+            for row, recipe, error in results:
+                report.rows += 1
+                if error is not None:
+                    report.invalid += 1
+                    report.error(row, error)
+                else:
+                    valid.append((row, recipe))
+            if valid:
+                recipes = [recipe for _, recipe in valid]
+                self._resolve_vocabulary(recipes)
+                self._resolve_ingredients(recipes, report)
+                if not self.dry_run:
+                    self._write(valid, report)
+            if self.on_batch:
+                self.on_batch(report)
+
+        report.finished = time.perf_counter()
+        logger.info(f"Imported {report.rows} rows into {self.collection.name} "
+                    f"({report.rows_per_second:.0f} rows/s, {report.invalid} invalid, {report.failed} failed)")
+        return report
+
+if __name__ == "__main__":
+    from pymongo import MongoClient
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Bulk import recipes from JSON, NDJSON or CSV")
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=IMPORT_FORMATS)
+    parser.add_argument('--collection', default=Config.COLLECTION_GLOBAL_RECIPES)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    database = MongoClient(Config.MONGO_URI)[Config.MONGO_DBNAME]
+    ingredient_index.collection_name = Config.COLLECTION_INGREDIENT_INDEX
+    if Config.RESPONSE_CACHE_URL.startswith('mongo://'):
+        # Drop the cached recipe searches the running app shares through Mongo
+        response_cache.backend = create_response_cache_backend(
+            Config.RESPONSE_CACHE_URL, get_db=lambda: database, collection_name=Config.COLLECTION_RESPONSE_CACHE)
+    importer = RecipeImporter(
+        database, args.collection, batch_size=args.batch_size, workers=args.workers, dry_run=args.dry_run,
+        on_batch=lambda r: print(f"{r.rows} rows, {r.rows_per_second:.0f} rows/s", flush=True)
+    )
+    with open(args.path, newline='', encoding='utf-8') as f:
+        final = importer.run(f, args.format or detect_format(args.path))
+    print(json.dumps(final.to_dict(), indent=2))
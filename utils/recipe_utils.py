@@ -3,17 +3,24 @@
 # ------------------------------------------------------------
 from datetime import datetime
 import logging
+import re
+
+from .ingredient_index import ingredient_index
+from .ingredient_resolver import get_ingredient_resolver
+from .query_compiler import compile_query, RECIPE_SEARCH_FIELDS
 
 logger = logging.getLogger(__name__)
 
 def lookup_ingredient(db, ingredient_name):
     """
-    Look up an ingredient in the product_list collection using partial matches.
-    Now returns PU, PUC, RU, RUC, along with SUPPLIER and INGREDIENT.
+    Look up an ingredient in the product_list collection.
+    Resolves the name against the in-memory normalized-name index (see
+    utils/ingredient_resolver.py) and returns the best ranked match with
+    PU, PUC, RU, RUC, along with SUPPLIER and INGREDIENT.
     """
-    # partial match on INGREDIENT field
-    result = db.product_list.find_one({'INGREDIENT': {'$regex': f'{ingredient_name}', '$options': 'i'}})
-    if result:
+    match = get_ingredient_resolver(db).best_match(ingredient_name)
+    if match:
+        result = match['product']
         print(f"Lookup result for ingredient '{ingredient_name}': {result}")  # Debug log
         return {
             'SUPPLIER':  result.get('SUPPLIER', '-'),
@@ -28,15 +35,19 @@ def lookup_ingredient(db, ingredient_name):
 
 def lookup_recipeIngredient(db, recipeIngredient_name):
     """
-    Look up a recipe ingredient in the global_recipes collection using partial matches.
-    Returns the recipe details such as ingredients, quantities, etc.
-    """
-    # partial match on ingredient name within global recipe ingredients
-    query = {'ingredients': {'$regex': f'{recipeIngredient_name}', '$options': 'i'}}
-    recipes = db.global_recipes.find(query)
-    
-    # Convert MongoDB cursor to list and return the recipe details
-    recipes_list = list(recipes)
+    Look up the global recipes that use an ingredient.
+    Resolves recipe ids from the ingredient -> recipe index (every word of the
+    name must start a word of the ingredient, so 'egg' finds 'eggs'; see
+    utils/ingredient_index.py) and returns the recipe details such as
+    ingredients, quantities, etc. Until the index has been built it falls back
+    to a substring match on the ingredient names.
+    """
+    if ingredient_index.has_postings(db, 'global_recipes'):
+        recipe_ids = ingredient_index.recipe_ids(db, recipeIngredient_name, 'global_recipes', mode='prefix')
+        recipes_list = list(db.global_recipes.find({'_id': {'$in': recipe_ids}})) if recipe_ids else []
+    else:
+        query = {'ingredients': {'$regex': re.escape(recipeIngredient_name), '$options': 'i'}}
+        recipes_list = list(db.global_recipes.find(query))
     if recipes_list:
         print(f"Lookup result for recipe ingredient '{recipeIngredient_name}': {recipes_list}")  # Debug log
         return recipes_list
@@ -45,23 +56,13 @@ def lookup_recipeIngredient(db, recipeIngredient_name):
 
 def lookup_globalRecipe(db, globalRecipe_name, filters=None):
     """
-    Look up a recipe in the global_recipes collection using partial matches on the recipe name.
-    Supports additional filters for ingredients, cuisine, method, and dietary requirements.
+    Look up a recipe in the global_recipes collection by recipe name prefix.
+    Supports additional filters for ingredients, cuisine, method, and dietary requirements,
+    compiled by utils/query_compiler.py.
     """
-    query = {'title': {'$regex': f'{globalRecipe_name}', '$options': 'i'}} if globalRecipe_name else {}
-
-    # Apply additional filters
-    if filters:
-        if 'ingredient' in filters:
-            query['ingredients'] = {'$regex': filters['ingredient'], '$options': 'i'}
-        if 'cuisine' in filters:
-            query['cuisine'] = {'$regex': filters['cuisine'], '$options': 'i'}
-        if 'method' in filters:
-            query['method'] = {'$regex': filters['method'], '$options': 'i'}
-        if 'dietary' in filters:
-            query['dietaryRequirement'] = {'$regex': filters['dietary'], '$options': 'i'}
+    compiled = compile_query(RECIPE_SEARCH_FIELDS, dict(filters or {}, title=globalRecipe_name))
 
-    recipes = db.global_recipes.find(query)
+    recipes = compiled.find(db.global_recipes)
     recipes_list = list(recipes)
     if recipes_list:
         print(f"Lookup result for global recipe '{globalRecipe_name}' with filters: {recipes_list}")  # Debug log
@@ -0,0 +1,135 @@
+#-------------------------------------------------------------------------------#
+#                         utils/startup_profile.py                              #
+#-------------------------------------------------------------------------------#
+"""
+Startup profiler.
+
+    python -m utils.startup_profile [target] [--top N] [--json] [--compare]
+
+imports `target` (default: app) in a fresh interpreter with -X importtime and
+reports per-module import time alongside the init phases (Mongo ping, GridFS,
+blueprint registration, ...) recorded with startup_profile.phase().
+--compare profiles both the eager and the LAZY_LOADING mode.
+"""
+from typing import Dict, List, Optional
+from contextlib import contextmanager
+import json
+import os
+import subprocess
+import sys
+import time
+
+#-------------------------------------------------------------------------------#
+#                               Phase timing                                    #
+#-------------------------------------------------------------------------------#
+class StartupProfile:
+    """Records wall-clock time of named init phases."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Dict] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({'phase': name, 'ms': (time.perf_counter() - started) * 1000})
+
+    def report(self) -> Dict:
+        return {
+            'phases': list(self.phases),
+            'total_ms': (time.perf_counter() - self.started) * 1000
+        }
+
+# Process-wide profile used by app.py
+startup_profile = StartupProfile()
+
+#-------------------------------------------------------------------------------#
+#                             Import profiling                                  #
+#-------------------------------------------------------------------------------#
+def parse_importtime(output: str) -> List[Dict]:
+    """
+    Parse `python -X importtime` output
+    ('import time: self [us] | cumulative | imported package').
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            modules.append({
+                'module': name.strip(),
+                'depth': (len(name) - len(name.lstrip())) // 2,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000
+            })
+        except ValueError:
+            continue
+    return modules
+
+def profile_startup(target: str = 'app', lazy: bool = False, cwd: Optional[str] = None) -> Dict:
+    """
+    Import target in a child interpreter and collect import and phase timings.
+
+    Returns:
+        {'target', 'lazy', 'wall_ms', 'modules': [...], 'phases': [...], 'error'}
+    """
+    code = (
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {target}\n"
+        "wall = (time.perf_counter() - t) * 1000\n"
+        "from utils.startup_profile import startup_profile\n"
+        "print('STARTUP_PROFILE ' + json.dumps(dict(startup_profile.report(), wall_ms=wall)))\n"
+    )
+    env = dict(os.environ, LAZY_LOADING='true' if lazy else 'false', PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env, cwd=cwd or os.getcwd()
+    )
+    result = {'target': target, 'lazy': lazy, 'wall_ms': None, 'phases': [],
+              'modules': parse_importtime(proc.stderr), 'error': None}
+    for line in proc.stdout.splitlines():
+        if line.startswith('STARTUP_PROFILE '):
+            report = json.loads(line[len('STARTUP_PROFILE '):])
+            result['wall_ms'] = report['wall_ms']
+            result['phases'] = report['phases']
+    if proc.returncode != 0:
+        result['error'] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed'
+    return result
+
+def format_profile(result: Dict, top: int = 25) -> str:
+    lines = [f"Startup profile for '{result['target']}' (lazy={result['lazy']})"]
+    if result['error']:
+        lines.append(f"  ERROR: {result['error']}")
+    if result['wall_ms'] is not None:
+        lines.append(f"  wall time: {result['wall_ms']:.1f} ms")
+    if result['phases']:
+        lines.append("  init phases:")
+        for phase in result['phases']:
+            lines.append(f"    {phase['ms']:9.1f} ms  {phase['phase']}")
+    lines.append(f"  slowest imports (cumulative, top {top}):")
+    for module in sorted(result['modules'], key=lambda m: m['cumulative_ms'], reverse=True)[:top]:
+        lines.append(f"    {module['cumulative_ms']:9.1f} ms  (self {module['self_ms']:7.1f})  {module['module']}")
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report import and init time per module")
+    parser.add_argument('target', nargs='?', default='app', help="Module to import (default: app)")
+    parser.add_argument('--top', type=int, default=25, help="Number of modules to list")
+    parser.add_argument('--json', action='store_true', help="Print machine-readable JSON")
+    parser.add_argument('--compare', action='store_true', help="Profile eager and lazy modes")
+    args = parser.parse_args()
+
+    results = [profile_startup(args.target, lazy=False)]
+    if args.compare:
+        results.append(profile_startup(args.target, lazy=True))
+    if args.json:
+        print(json.dumps(results if args.compare else results[0], indent=2))
+    else:
+        print('\n\n'.join(format_profile(result, args.top) for result in results))
@@ -0,0 +1,169 @@
+#-------------------------------------------------------------------------------#
+#                           utils/static_assets.py                              #
+#-------------------------------------------------------------------------------#
+"""
+Content-hashed, pre-compressed static assets.
+
+Build step (run at deploy time):
+    python -m utils.static_assets build [--static-dir static]
+
+copies every CSS/JS/SVG/JSON file under static/ to
+static/dist/<path>/<name>.<hash>.<ext> together with .gz and (when brotli
+is installed) .br variants, and writes static/dist/manifest.json mapping the
+original path to the hashed one.
+
+At runtime templates call asset_url('css/output.css'). With a manifest it
+returns the hashed URL, served from /static/dist/ with the best
+pre-compressed variant for the client and 'immutable' cache headers. A
+content change produces a new URL, so clients never need to revalidate.
+Without a manifest asset_url falls back to url_for('static', ...).
+"""
+from typing import Dict, Optional, Tuple
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+from flask import abort, request, send_from_directory, url_for
+
+from utils.compression import brotli, negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASHED_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.map')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MIMETYPES = {
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.svg': 'image/svg+xml',
+    '.json': 'application/json',
+    '.map': 'application/json'
+}
+
+#-------------------------------------------------------------------------------#
+#                                Build step                                     #
+#-------------------------------------------------------------------------------#
+def content_hash(data: bytes, length: int = 12) -> str:
+    return hashlib.sha256(data).hexdigest()[:length]
+
+def build_assets(static_dir: str = 'static', min_compress_size: int = 256) -> Dict[str, str]:
+    """
+    Write hashed and pre-compressed copies of static assets and the manifest.
+
+    Returns:
+        The manifest: original relative path -> hashed relative path
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest: Dict[str, str] = {}
+    stats = {'files': 0, 'bytes': 0, 'gzip_bytes': 0, 'br_bytes': 0}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for name in sorted(files):
+            stem, ext = os.path.splitext(name)
+            if ext not in HASHED_EXTENSIONS:
+                continue
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            hashed = f"{os.path.dirname(relative) + '/' if os.path.dirname(relative) else ''}{stem}.{content_hash(data)}{ext}"
+            target = os.path.join(dist_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            stats['files'] += 1
+            stats['bytes'] += len(data)
+
+            if len(data) >= min_compress_size:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                with open(target + '.gz', 'wb') as f:
+                    f.write(compressed)
+                stats['gzip_bytes'] += len(compressed)
+                if brotli is not None:
+                    compressed = brotli.compress(data, quality=11)
+                    with open(target + '.br', 'wb') as f:
+                        f.write(compressed)
+                    stats['br_bytes'] += len(compressed)
+
+            manifest[relative] = f'{DIST_DIR}/{hashed}'
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logger.info(f"Built {stats['files']} assets: {stats['bytes']} bytes, "
+                f"{stats['gzip_bytes']} gzip, {stats['br_bytes']} brotli")
+    return manifest
+
+#-------------------------------------------------------------------------------#
+#                                 Runtime                                       #
+#-------------------------------------------------------------------------------#
+def pick_precompressed(dist_dir: str, filename: str, accept_encodings) -> Tuple[str, Optional[str]]:
+    """Return (file to serve, Content-Encoding) for the client's Accept-Encoding."""
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is not None:
+        variant = f"{filename}.{'br' if encoding == 'br' else 'gz'}"
+        if os.path.exists(os.path.join(dist_dir, variant)):
+            return variant, encoding
+    return filename, None
+
+class StaticAssets:
+    """Resolves asset URLs through the manifest and serves the hashed files."""
+
+    def __init__(self):
+        self.manifest: Dict[str, str] = {}
+        self.static_dir: Optional[str] = None
+
+    def init_app(self, app) -> None:
+        self.static_dir = app.static_folder
+        manifest_path = os.path.join(self.static_dir, DIST_DIR, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+            logger.info(f"Loaded static asset manifest with {len(self.manifest)} entries")
+        else:
+            logger.info("No static asset manifest; serving unhashed assets")
+
+        app.add_url_rule(f'{app.static_url_path}/{DIST_DIR}/<path:filename>',
+                         'hashed_static', self.serve_hashed)
+        app.add_template_global(self.asset_url, 'asset_url')
+        app.extensions['static_assets'] = self
+
+    def asset_url(self, filename: str) -> str:
+        hashed = self.manifest.get(filename)
+        return url_for('static', filename=hashed or filename)
+
+    def serve_hashed(self, filename: str):
+        ext = os.path.splitext(filename)[1]
+        if ext not in HASHED_EXTENSIONS:
+            abort(404)
+        dist_dir = os.path.join(self.static_dir, DIST_DIR)
+        served, encoding = pick_precompressed(dist_dir, filename, request.accept_encodings)
+
+        response = send_from_directory(dist_dir, served, mimetype=MIMETYPES.get(ext), max_age=31536000)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+# Process-wide instance registered in app.create_app
+static_assets = StaticAssets()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build content-hashed, pre-compressed static assets")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--static-dir', default='static')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = build_assets(args.static_dir)
+    print(f"Wrote {len(result)} assets to {os.path.join(args.static_dir, DIST_DIR)}")
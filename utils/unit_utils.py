@@ -0,0 +1,433 @@
+#-------------------------------------------------------------------------------#
+#                            utils/unit_utils.py                                #
+#-------------------------------------------------------------------------------#
+"""
+Unit conversion and costing utilities.
+
+Products in product_list carry a purchase unit (PU) with its cost (PUC) and a
+recipe unit (RU) with its cost (RUC). This module normalises every unit to a
+base unit per dimension (g, ml, ea) and keeps the per-product conversion and
+cost factors in NumPy arrays, so a whole recipe or a whole menu is costed in a
+single vectorized pass instead of a Python loop per ingredient.
+
+Usage:
+    table = load_costing_table(db)
+    table.cost_recipe([('Tomato', 250, 'g'), ('Olive Oil', 30, 'ml')])
+    table.cost_menu({'Bruschetta': [...], 'Soup': [...]})
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+import math
+import re
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class UnitConversionError(Exception):
+    """Custom exception for unit conversion errors"""
+    def __init__(self, message: str, error_code: str = 'UNIT_ERROR'):
+        self.message = message
+        self.error_code = error_code
+        super().__init__(self.message)
+
+#-------------------------------------------------------------------------------#
+#                  Dimensions and factors to their base unit                    #
+#-------------------------------------------------------------------------------#
+DIMENSION_MASS = 0
+DIMENSION_VOLUME = 1
+DIMENSION_COUNT = 2
+
+UNIT_FACTORS: Dict[str, Tuple[int, float]] = {
+    # Mass (base: g)
+    'mg': (DIMENSION_MASS, 0.001),
+    'g': (DIMENSION_MASS, 1.0),
+    'gm': (DIMENSION_MASS, 1.0),
+    'gram': (DIMENSION_MASS, 1.0),
+    'kg': (DIMENSION_MASS, 1000.0),
+    'oz': (DIMENSION_MASS, 28.349523125),
+    'lb': (DIMENSION_MASS, 453.59237),
+    # Volume (base: ml)
+    'ml': (DIMENSION_VOLUME, 1.0),
+    'cl': (DIMENSION_VOLUME, 10.0),
+    'dl': (DIMENSION_VOLUME, 100.0),
+    'l': (DIMENSION_VOLUME, 1000.0),
+    'lt': (DIMENSION_VOLUME, 1000.0),
+    'ltr': (DIMENSION_VOLUME, 1000.0),
+    'litre': (DIMENSION_VOLUME, 1000.0),
+    'tsp': (DIMENSION_VOLUME, 5.0),
+    'tbsp': (DIMENSION_VOLUME, 20.0),
+    'cup': (DIMENSION_VOLUME, 250.0),
+    # Count (base: ea)
+    'ea': (DIMENSION_COUNT, 1.0),
+    'each': (DIMENSION_COUNT, 1.0),
+    'pc': (DIMENSION_COUNT, 1.0),
+    'pcs': (DIMENSION_COUNT, 1.0),
+    'portion': (DIMENSION_COUNT, 1.0),
+    'doz': (DIMENSION_COUNT, 12.0),
+    'dozen': (DIMENSION_COUNT, 12.0),
+}
+
+_UNIT_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)?\s*[x*]?\s*([a-zA-Z]+)\.?\s*$')
+
+def parse_unit(unit: str) -> Tuple[int, float]:
+    """
+    Parse a unit string such as 'kg', '5kg' or '10 L' into its dimension and
+    the number of base units it represents.
+
+    Args:
+        unit: Unit string as stored in PU/RU or entered on a recipe line
+
+    Returns:
+        tuple of (dimension, factor to base unit)
+
+    Raises:
+        UnitConversionError: If the unit is not recognised
+    """
+    match = _UNIT_PATTERN.match(str(unit or ''))
+    if not match:
+        raise UnitConversionError(f"Unrecognised unit: {unit}")
+
+    quantity, symbol = match.groups()
+    symbol = symbol.lower()
+    if symbol not in UNIT_FACTORS and symbol.endswith('s'):
+        symbol = symbol[:-1]
+    if symbol not in UNIT_FACTORS:
+        raise UnitConversionError(f"Unrecognised unit: {unit}")
+
+    dimension, factor = UNIT_FACTORS[symbol]
+    return dimension, factor * (float(quantity) if quantity else 1.0)
+
+def convert_quantity(quantity: float, from_unit: str, to_unit: str) -> float:
+    """
+    Convert a single quantity between two units of the same dimension.
+
+    Raises:
+        UnitConversionError: If the units are unknown or incompatible
+    """
+    from_dim, from_factor = parse_unit(from_unit)
+    to_dim, to_factor = parse_unit(to_unit)
+    if from_dim != to_dim:
+        raise UnitConversionError(f"Cannot convert {from_unit} to {to_unit}", 'UNIT_DIMENSION_MISMATCH')
+    return quantity * from_factor / to_factor
+
+def finite_float(value, default: float) -> float:
+    """float(value), or default when the value is missing, malformed or not finite."""
+    try:
+        number = float(value or default)
+    except (TypeError, ValueError):
+        return default
+    return number if math.isfinite(number) else default
+
+def _product_factor(product: Dict, key: str, default: float) -> Tuple[float, bool]:
+    """(YIELD/WASTAGE value, whether it was usable) for a product document."""
+    value = product.get(key)
+    if value in (None, '', 0):
+        return default, True
+    number = finite_float(value, math.nan)
+    return (default, False) if math.isnan(number) else (number, True)
+
+#-------------------------------------------------------------------------------#
+#                               Costing table                                   #
+#-------------------------------------------------------------------------------#
+class CostingTable:
+    """
+    Column-oriented view of product_list used for vectorized costing.
+
+    Each product occupies one row. `base_cost` is the cost of one base unit
+    (g, ml or ea) derived from PUC/PU, falling back to RUC/RU when the purchase
+    unit cannot be parsed; `pack_size` is that unit in base units and
+    `purchase_units` its original string, so pack_size * base_cost is the
+    price of one pack. `yield_factor` is the usable fraction after trim and
+    `wastage` the fraction lost in prep, so the as-purchased quantity of a line
+    is quantity / (yield_factor * (1 - wastage)). A malformed YIELD or
+    WASTAGE ('n/a', 'inf') falls back to 1 / 0 and the product is listed in
+    `flagged` instead of failing the whole table.
+    """
+
+    def __init__(self, products: Iterable[Dict]):
+        names: List[str] = []
+        suppliers: List[str] = []
+        dimension: List[int] = []
+        base_cost: List[float] = []
+        pack_size: List[float] = []
+        purchase_units: List[str] = []
+        yield_factor: List[float] = []
+        wastage: List[float] = []
+        flagged: List[str] = []
+
+        for product in products:
+            name = product.get('INGREDIENT')
+            if not name:
+                continue
+            dim, cost, unit, size = self._pricing(product)
+            product_yield, yield_ok = _product_factor(product, 'YIELD', 1.0)
+            product_wastage, wastage_ok = _product_factor(product, 'WASTAGE', 0.0)
+            if not (yield_ok and wastage_ok):
+                flagged.append(name)
+            names.append(name)
+            suppliers.append(product.get('SUPPLIER') or '-')
+            dimension.append(dim)
+            base_cost.append(cost)
+            pack_size.append(size)
+            purchase_units.append(unit)
+            yield_factor.append(product_yield)
+            wastage.append(product_wastage)
+
+        if flagged:
+            logger.warning(f"{len(flagged)} products with malformed YIELD/WASTAGE costed with defaults: "
+                           f"{', '.join(flagged[:10])}")
+        self.flagged = flagged
+        self.names = names
+        self.suppliers = suppliers
+        self.index = {name.lower(): row for row, name in enumerate(names)}
+        self.dimension = np.asarray(dimension, dtype=np.int8)
+        self.base_cost = np.asarray(base_cost, dtype=np.float64)
+        self.pack_size = np.asarray(pack_size, dtype=np.float64)
+        self.purchase_units = purchase_units
+        self.yield_factor = np.clip(np.asarray(yield_factor, dtype=np.float64), 1e-6, 1.0)
+        self.wastage = np.clip(np.asarray(wastage, dtype=np.float64), 0.0, 0.999)
+        self.built_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _pricing(product: Dict) -> Tuple[int, float, str, float]:
+        """Return (dimension, cost per base unit, pricing unit, its size in base units)."""
+        for unit_key, cost_key in (('PU', 'PUC'), ('RU', 'RUC')):
+            try:
+                dim, factor = parse_unit(product.get(unit_key))
+                cost = float(product.get(cost_key, 0) or 0) / factor
+            except (UnitConversionError, TypeError, ValueError, ZeroDivisionError):
+                continue
+            if math.isfinite(cost):
+                return dim, cost, str(product.get(unit_key)), factor
+        return -1, np.nan, '', np.nan
+
+    @staticmethod
+    def _base_cost(product: Dict) -> Tuple[int, float]:
+        """Return (dimension, cost per base unit) for a product document."""
+        return CostingTable._pricing(product)[:2]
+
+    def rows_for(self, ingredients: Sequence[str]) -> np.ndarray:
+        """Map ingredient names to table rows; unknown names map to -1."""
+        index = self.index
+        return np.fromiter(
+            (index.get(str(name).lower(), -1) for name in ingredients),
+            dtype=np.int64,
+            count=len(ingredients)
+        )
+
+    def cost_lines(
+        self,
+        ingredients: Sequence[str],
+        quantities: Sequence[float],
+        units: Sequence[str]
+    ) -> np.ndarray:
+        """
+        Cost a batch of recipe lines in one pass.
+
+        Args:
+            ingredients: Ingredient names matching product_list INGREDIENT
+            quantities: Recipe quantities
+            units: Recipe units for each quantity
+
+        Returns:
+            Array of line costs; NaN where the ingredient is unknown or the
+            recipe unit is incompatible with the purchase unit
+        """
+        rows = self.rows_for(ingredients)
+        unit_cache: Dict[str, Tuple[int, float]] = {}
+        line_dim = np.empty(len(units), dtype=np.int8)
+        line_factor = np.empty(len(units), dtype=np.float64)
+        for i, unit in enumerate(units):
+            parsed = unit_cache.get(unit)
+            if parsed is None:
+                try:
+                    parsed = parse_unit(unit)
+                except UnitConversionError:
+                    parsed = (-2, np.nan)
+                unit_cache[unit] = parsed
+            line_dim[i], line_factor[i] = parsed
+
+        if not len(self):
+            return np.full(len(rows), np.nan)
+
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+        compatible = known & (self.dimension[safe_rows] == line_dim)
+
+        base_qty = np.asarray(quantities, dtype=np.float64) * line_factor
+        as_purchased = base_qty / (self.yield_factor[safe_rows] * (1.0 - self.wastage[safe_rows]))
+        costs = as_purchased * self.base_cost[safe_rows]
+        return np.where(compatible, costs, np.nan)
+
+    def cost_recipe(self, lines: Sequence[Tuple[str, float, str]]) -> Dict:
+        """
+        Cost a single recipe given (ingredient, quantity, unit) lines.
+
+        Returns:
+            Dict with 'total', per-line 'lines' costs and 'unresolved' names
+        """
+        return self.cost_menu({None: lines})[None]
+
+    def cost_menu(self, recipes: Dict[str, Sequence[Tuple[str, float, str]]]) -> Dict[str, Dict]:
+        """
+        Cost many recipes at once by flattening all lines into one batch and
+        summing per recipe with np.bincount.
+
+        Args:
+            recipes: Mapping of recipe name to (ingredient, quantity, unit) lines
+
+        Returns:
+            Mapping of recipe name to {'total', 'lines', 'unresolved'}
+        """
+        keys = list(recipes)
+        ingredients: List[str] = []
+        quantities: List[float] = []
+        units: List[str] = []
+        owners: List[int] = []
+        for position, key in enumerate(keys):
+            for ingredient, quantity, unit in recipes[key]:
+                ingredients.append(ingredient)
+                quantities.append(quantity)
+                units.append(unit)
+                owners.append(position)
+
+        costs = self.cost_lines(ingredients, quantities, units)
+        owner_idx = np.asarray(owners, dtype=np.int64)
+        resolved = ~np.isnan(costs)
+        totals = np.bincount(owner_idx, weights=np.where(resolved, costs, 0.0), minlength=len(keys))
+
+        results: Dict[str, Dict] = {}
+        start = 0
+        for position, key in enumerate(keys):
+            end = start + len(recipes[key])
+            results[key] = {
+                'total': round(float(totals[position]), 4),
+                'lines': [None if np.isnan(c) else round(float(c), 4) for c in costs[start:end]],
+                'unresolved': [ingredients[i] for i in range(start, end) if not resolved[i]]
+            }
+            start = end
+        return results
+
+def load_costing_table(db, ingredient_names: Optional[Iterable[str]] = None) -> CostingTable:
+    """
+    Build a CostingTable from product_list with a single projected query.
+
+    Args:
+        db: MongoDB database instance
+        ingredient_names: Optional names to restrict the load to
+
+    Returns:
+        CostingTable
+    """
+    query = {}
+    if ingredient_names is not None:
+        query['INGREDIENT'] = {'$in': list(ingredient_names)}
+    projection = {
+        '_id': 0, 'INGREDIENT': 1, 'SUPPLIER': 1,
+        'PU': 1, 'PUC': 1, 'RU': 1, 'RUC': 1, 'YIELD': 1, 'WASTAGE': 1
+    }
+    table = CostingTable(db.product_list.find(query, projection))
+    logger.debug(f"Loaded costing table with {len(table)} products")
+    return table
+
+_table_lock = threading.Lock()
+_tables: Dict[object, CostingTable] = {}
+
+def get_costing_table(db, max_age_seconds: int = 600, refresh: bool = False) -> CostingTable:
+    """
+    Return the cached full CostingTable for a database, rebuilding it when stale.
+
+    Args:
+        db: MongoDB database instance (the cache key)
+        max_age_seconds: Rebuild the table after this many seconds
+        refresh: Force a rebuild (e.g. after a product_list import)
+    """
+    with _table_lock:
+        table = _tables.get(db)
+        if refresh or table is None or time.time() - table.built_at > max_age_seconds:
+            table = _tables[db] = load_costing_table(db)
+        return table
+
+def cost_lines_loop(products: Dict[str, Dict], lines: Sequence[Tuple[str, float, str]]) -> List[Optional[float]]:
+    """
+    Reference per-row implementation of CostingTable.cost_lines, kept for the
+    benchmark and for cross-checking results.
+    """
+    costs: List[Optional[float]] = []
+    for ingredient, quantity, unit in lines:
+        product = products.get(str(ingredient).lower())
+        if not product:
+            costs.append(None)
+            continue
+        dim, cost = CostingTable._base_cost(product)
+        try:
+            line_dim, factor = parse_unit(unit)
+        except UnitConversionError:
+            costs.append(None)
+            continue
+        if dim != line_dim:
+            costs.append(None)
+            continue
+        yield_factor = min(max(_product_factor(product, 'YIELD', 1.0)[0], 1e-6), 1.0)
+        wastage = min(max(_product_factor(product, 'WASTAGE', 0.0)[0], 0.0), 0.999)
+        costs.append(quantity * factor / (yield_factor * (1.0 - wastage)) * cost)
+    return costs
+
+def benchmark_costing(n_products: int = 2000, n_lines: int = 100000, seed: int = 7) -> Dict[str, float]:
+    """
+    Compare the vectorized CostingTable against the per-row loop on synthetic data.
+
+    Returns:
+        Dict with timings in seconds and the speedup factor
+    """
+    rng = np.random.default_rng(seed)
+    purchase_units = ['kg', '5kg', 'l', '10l', 'ea', 'doz']
+    recipe_units = {DIMENSION_MASS: 'g', DIMENSION_VOLUME: 'ml', DIMENSION_COUNT: 'ea'}
+    products = []
+    for i in range(n_products):
+        pu = purchase_units[i % len(purchase_units)]
+        products.append({
+            'INGREDIENT': f'Ingredient {i}',
+            'SUPPLIER': f'Supplier {i % 20}',
+            'PU': pu,
+            'PUC': float(rng.uniform(1, 80)),
+            'YIELD': float(rng.uniform(0.6, 1.0)),
+            'WASTAGE': float(rng.uniform(0.0, 0.1))
+        })
+    picks = rng.integers(0, n_products, size=n_lines)
+    lines = [
+        (products[p]['INGREDIENT'], float(q), recipe_units[parse_unit(products[p]['PU'])[0]])
+        for p, q in zip(picks, rng.uniform(1, 500, size=n_lines))
+    ]
+    by_name = {p['INGREDIENT'].lower(): p for p in products}
+
+    started = time.perf_counter()
+    looped = cost_lines_loop(by_name, lines)
+    loop_seconds = time.perf_counter() - started
+
+    table = CostingTable(products)
+    ingredients, quantities, units = zip(*lines)
+    started = time.perf_counter()
+    vectorized = table.cost_lines(ingredients, quantities, units)
+    vector_seconds = time.perf_counter() - started
+
+    if not np.allclose(vectorized, np.asarray(looped, dtype=np.float64)):
+        raise UnitConversionError("Vectorized and loop costing disagree", 'BENCHMARK_MISMATCH')
+
+    return {
+        'lines': n_lines,
+        'loop_seconds': loop_seconds,
+        'vectorized_seconds': vector_seconds,
+        'speedup': loop_seconds / vector_seconds if vector_seconds else float('inf')
+    }
+
+if __name__ == "__main__":
+    # For local benchmarking only
+    for key, value in benchmark_costing().items():
+        print(f"- {key}: {value}")